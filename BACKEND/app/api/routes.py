@@ -1,21 +1,28 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+import os
+import json
+import asyncio
+import logging
+from fastapi import APIRouter, HTTPException, Query, Depends, Header
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
-from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
-from app.core import nasa_data_handler, statistical_engine
-from app.core.reasoning_agent import get_reasoning_agent
-from app.core.verification_agent import get_verification_agent
-from app.services import firestore_service
+from typing import Optional, List
+from app.core import nasa_data_handler
+from app.core.llm_client import get_llm_client
+from app.core.prompt_templates import get_prompt_stats
+from app.services import firestore_service, cache_refresher, cache_warmup, insight_cache, popularity_log, prediction_service
 from app.services.current_weather_service import CurrentWeatherService
 from app.api.auth_routes import get_current_user
-from datetime import datetime, timedelta
-import re
+from app.utils import metrics
+from app.utils.responses import FastJSONResponse, cacheable_response, parse_fields, project_fields
 
 router = APIRouter()
 
-# Initialize AI agents
-reasoning_agent = get_reasoning_agent()
-verification_agent_instance = get_verification_agent()
+logger = logging.getLogger(__name__)
+
+# Cache-Control of complete prediction / current weather responses (both also carry an ETag).
+# private: the routes require a bearer token and predictions carry per-user fields (already_passed)
+PREDICT_CACHE_CONTROL = os.getenv("PREDICT_CACHE_CONTROL", "private, max-age=3600")
+WEATHER_CACHE_CONTROL = os.getenv("WEATHER_CACHE_CONTROL", "private, max-age=600")
 
 @router.get("/", tags=["Health Check"])
 async def health_check():
@@ -25,10 +32,61 @@ async def health_check():
     return {"status": "ok", "message": "Will It Rain API is running!"}
 
 
+@router.get("/ready", tags=["Health Check"])
+async def readiness_check():
+    """
+    Readiness probe: 503 until startup cache warm-up has finished.
+    """
+    ready = cache_warmup.is_ready()
+    status = cache_warmup.get_warmup_status()
+    if not ready:
+        raise HTTPException(status_code=503, detail=status)
+    return status
+
+
+@router.get("/cache/refresh/status", tags=["Cache"])
+async def cache_refresh_status():
+    """
+    Reports progress, throughput and error metrics of the background cache refresher.
+    """
+    return cache_refresher.get_refresh_metrics()
+
+
+@router.get("/cache/stats", tags=["Cache"])
+async def cache_stats():
+    """
+    Reports in-process prediction, AI insight and negative (rejected location) cache metrics.
+    """
+    return {
+        "prediction_memory_cache": firestore_service.get_memory_cache_stats(),
+        "insight_memory_cache": insight_cache.get_insight_cache_stats(),
+        "negative_cache": nasa_data_handler.get_negative_cache_metrics(),
+    }
+
+
+@router.get("/llm/stats", tags=["AI"])
+async def llm_stats():
+    """
+    Reports the shared Gemini client's queue depth, in-flight calls and shed/timeout counts,
+    plus prompt/response token usage per prompt template.
+    """
+    return {**get_llm_client().get_metrics(), "prompts": get_prompt_stats()}
+
+
+@router.get("/metrics", tags=["Health Check"], include_in_schema=False)
+async def prometheus_metrics():
+    """
+    Prometheus scrape endpoint: request, cache, NASA POWER, statistics and
+    LLM metrics (summed over all worker processes when METRICS_DIR is set).
+    """
+    return Response(await asyncio.to_thread(metrics.render), media_type=metrics.CONTENT_TYPE)
+
+
 @router.get("/weather/current", tags=["Weather"])
 async def get_current_weather(
     lat: float = Query(..., description="Latitude of the location"),
     lon: float = Query(..., description="Longitude of the location"),
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -44,14 +102,17 @@ async def get_current_weather(
     - Wind speed
     - Cloud cover
     - Atmospheric pressure
+    
+    Carries an ETag (the fetch timestamp is not part of it) and answers a
+    matching If-None-Match with 304.
     """
-    print(f"🌤️ Current weather request from user: {current_user['email']} for ({lat}, {lon})")
+    logger.info("Current weather request", extra={"user_id": current_user.get("user_id"), "lat": lat, "lon": lon})
     
     try:
-        weather_data = CurrentWeatherService.get_current_weather(lat, lon)
-        return weather_data
+        weather_data = await CurrentWeatherService.get_current_weather_async(lat, lon)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch current weather: {str(e)}")
+    return cacheable_response(weather_data, if_none_match, WEATHER_CACHE_CONTROL, etag_exclude=("timestamp",))
 
 
 @router.get("/predict", tags=["Prediction"])
@@ -60,6 +121,12 @@ async def predict_weather(
     lon: float = Query(..., description="Longitude of the location"),
     date: str = Query(..., description="Date in YYYY-MM-DD format", regex=r"\d{4}-\d{2}-\d{2}"),
     activity: str = Query(None, description="Planned activity (e.g., 'picnic', 'trekking', 'wedding')"),
+    part_of_day: Optional[str] = Query(None, description="morning, noon, evening, night or all_day"),
+    timezone: Optional[str] = Query(None, description="IANA timezone used to decide whether the date has passed"),
+    debug: Optional[str] = Query(None, description="'timing' adds a per-stage timing breakdown"),
+    defer_insight: bool = Query(False, description="Return statistics without waiting for the AI insight"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. 'statistics,ai_insight.reasoning'"),
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -73,295 +140,29 @@ async def predict_weather(
     - Missing data alerts: Warns when recent data is unavailable
     - Confidence scoring: Indicates prediction reliability
     - AI-powered insights: Natural language recommendations tailored to your activity
+    - defer_insight=true: returns right after the statistics with an `insight_pending`
+      token; fetch the insight from `/predict/insight/{token}`
+    - fields=...: returns only the listed (dotted) fields, e.g. to drop verification detail
+    - ETag / If-None-Match: complete responses carry an ETag and Cache-Control;
+      a matching If-None-Match gets an empty 304
     
     The weather_predictions cache is universal (shared by all users).
     """
-    
-    # Log the authenticated user making the request
-    activity_text = f" for activity: {activity}" if activity else ""
-    print(f"📊 Prediction request from user: {current_user['email']} ({current_user['name']}){activity_text}")
-    try:
-        # ============================================================
-        # PHASE 3: SMART CACHING LOGIC
-        # ============================================================
-        
-        # Step 1: Check if we have cached data
-        cached_data = firestore_service.get_prediction_from_cache(lat, lon, date)
-        
-        if cached_data:
-            # We have cached data! Now check if it needs updating
-            needs_update, years_to_fetch = firestore_service.should_update_cache(cached_data, date)
-            
-            if needs_update:
-                # ============================================================
-                # INCREMENTAL UPDATE: Fetch only new years
-                # ============================================================
-                print(f"🔄 Incremental update needed. Fetching {len(years_to_fetch)} new year(s): {years_to_fetch}")
-                
-                try:
-                    # Fetch only the new years
-                    new_data = nasa_data_handler.get_historical_data(lat, lon, date, specific_years=years_to_fetch)
-                    
-                    # Combine with existing cached data (we'll recalculate statistics)
-                    # For now, we'll do a full recalculation since we need all data
-                    # In a more advanced version, we could store raw data and append
-                    all_historical_data = nasa_data_handler.get_historical_data(lat, lon, date)
-                    
-                    # Recalculate statistics with updated data
-                    statistics = statistical_engine.calculate_statistics(all_historical_data)
-                    
-                    if "error" in statistics:
-                        raise HTTPException(status_code=404, detail=statistics["error"])
-                    
-                    # STAGE 1: Verify updated statistics
-                    print("🔍 Stage 1: Verifying updated statistical calculations...")
-                    verification_result = verification_agent_instance.verify_statistics(
-                        statistics=statistics,
-                        location={"lat": lat, "lon": lon},
-                        date=date
-                    )
-                    
-                    # Calculate metadata
-                    current_year = datetime.now().year
-                    target_year = datetime.strptime(date, "%Y-%m-%d").year
-                    latest_year = int(statistics['years_analyzed'].split('-')[1])
-                    
-                    # Determine missing years between latest available data and target year
-                    if target_year > latest_year:
-                        # Future prediction - calculate all missing years up to target year
-                        missing_years = list(range(latest_year + 1, target_year + 1))
-                    else:
-                        # Past or current year prediction
-                        missing_years = []
-                    
-                    # Calculate confidence score
-                    confidence_score = firestore_service.calculate_confidence_score(
-                        statistics['data_years_count'], 
-                        len(missing_years)
-                    )
-                    
-                    # Update cache
-                    firestore_service.update_cache_with_new_data(
-                        lat, lon, date,
-                        statistics,
-                        statistics['years_analyzed'],
-                        statistics['data_years_count'],
-                        latest_year,
-                        missing_years,
-                        confidence_score
-                    )
-                    
-                    # Generate missing data alert if needed
-                    missing_data_alert = firestore_service.get_missing_data_alert(
-                        missing_years, 
-                        statistics['data_years_count']
-                    )
-                    
-                    # STAGE 2: Generate AI reasoning with verified data
-                    print("🤖 Stage 2: Generating insight with verified updated data...")
-                    ai_insight = reasoning_agent.generate_insight(
-                        lat, lon, date,
-                        statistics,
-                        confidence_score,
-                        missing_data_alert,
-                        activity
-                    )
-                    
-                    response = {
-                        "query": {"lat": lat, "lon": lon, "date": date},
-                        "statistics": statistics,
-                        "confidence_score": round(confidence_score, 2),
-                        "cache_status": "updated",
-                        "missing_data_alert": missing_data_alert,
-                        "verification": {
-                            "status": verification_result['status'],
-                            "confidence": verification_result['confidence'],
-                            "summary": verification_agent_instance.get_verification_summary(verification_result)
-                        }
-                    }
-                    
-                    if verification_result.get('anomalies'):
-                        response["verification"]["anomalies"] = verification_result['anomalies']
-
-                    if ai_insight:
-                        response["ai_insight"] = ai_insight
-
-                    return response
-                    
-                except Exception as e:
-                    print(f"⚠️ Incremental update failed: {e}. Returning cached data.")
-                    # If update fails, return cached data with warning
-                    missing_data_alert = firestore_service.get_missing_data_alert(
-                        cached_data['metadata']['missing_years'],
-                        cached_data['metadata']['total_years']
-                    )
-                    
-                    resp = {
-                        "query": {"lat": lat, "lon": lon, "date": date},
-                        "statistics": cached_data['statistics'],
-                        "confidence_score": round(cached_data['confidence_score'], 2),
-                        "cache_status": "hit_stale",
-                        "missing_data_alert": missing_data_alert,
-                        "warning": "Could not update with latest data. Returning cached version."
-                    }
-                    return resp
-            
-            else:
-                # ============================================================
-                # CACHE HIT: Data is up-to-date, return from cache
-                # ============================================================
-                print(f"✅ Cache hit! Data is current. No update needed.")
-                
-                missing_data_alert = firestore_service.get_missing_data_alert(
-                    cached_data['metadata']['missing_years'],
-                    cached_data['metadata']['total_years']
-                )
-                
-                # Check if AI insight is cached
-                ai_insight = cached_data.get('ai_insight')
-                
-                # If no cached AI insight, generate a new one
-                if not ai_insight and reasoning_agent.enabled:
-                    ai_insight = reasoning_agent.generate_insight(
-                        lat, lon, date,
-                        cached_data['statistics'],
-                        cached_data['confidence_score'],
-                        missing_data_alert,
-                        activity
-                    )
-                    
-                    # Update cache with AI insight
-                    if ai_insight:
-                        firestore_service.update_cache_with_ai_insight(lat, lon, date, ai_insight)
-                
-                response = {
-                    "query": {"lat": lat, "lon": lon, "date": date},
-                    "statistics": cached_data['statistics'],
-                    "confidence_score": round(cached_data['confidence_score'], 2),
-                    "cache_status": "hit",
-                    "missing_data_alert": missing_data_alert
-                }
-                
-                if ai_insight:
-                    response["ai_insight"] = ai_insight
-
-                return response
-        
-        # ============================================================
-        # CACHE MISS: Fetch all data and create cache entry
-        # ============================================================
-        print(f"❌ Cache miss. Fetching full historical data...")
-        
-        # Fetch all historical data
-        historical_data = nasa_data_handler.get_historical_data(lat, lon, date)
-        
-        # Calculate statistics
-        statistics = statistical_engine.calculate_statistics(historical_data)
-        
-        if "error" in statistics:
-            raise HTTPException(status_code=404, detail=statistics["error"])
-        
-        # ============================================================
-        # STAGE 1: AI VERIFICATION OF STATISTICS
-        # ============================================================
-        print("🔍 Stage 1: Verifying statistical calculations with AI...")
-        verification_result = verification_agent_instance.verify_statistics(
-            statistics=statistics,
-            location={"lat": lat, "lon": lon},
-            date=date
-        )
-        
-        # Check if verification flagged any issues
-        if not verification_result.get('is_valid', True):
-            print(f"⚠️ Verification flagged anomalies: {verification_result.get('anomalies', [])}")
-            # Log warning but proceed (you can change this to raise exception if desired)
-        
-        # Calculate metadata for caching
-        current_year = datetime.now().year
-        target_year = datetime.strptime(date, "%Y-%m-%d").year
-        latest_year = int(statistics['years_analyzed'].split('-')[1])
-        
-        # Determine missing years between latest available data and target year
-        # For future predictions: missing years = years between latest_year and target_year
-        # For past predictions: no missing years if target_year <= latest_year
-        if target_year > latest_year:
-            # Future prediction - calculate all missing years up to target year
-            # But only count years that could have happened (up to current year)
-            missing_years = list(range(latest_year + 1, target_year + 1))
-        else:
-            # Past or current year prediction - data should exist
-            missing_years = []
-        
-        # Calculate confidence score
-        confidence_score = firestore_service.calculate_confidence_score(
-            statistics['data_years_count'],
-            len(missing_years)
-        )
-        
-        # Generate missing data alert if needed
-        missing_data_alert = firestore_service.get_missing_data_alert(
-            missing_years,
-            statistics['data_years_count']
-        )
-        
-        # ============================================================
-        # STAGE 2: AI INSIGHT GENERATION (with verified data)
-        # ============================================================
-        print("🤖 Stage 2: Generating human-readable insight with verified data...")
-        ai_insight = reasoning_agent.generate_insight(
-            lat, lon, date,
-            statistics,
-            confidence_score,
-            missing_data_alert,
-            activity
-        )
-        
-        # Save to cache with AI insight and verification status
-        firestore_service.save_prediction_to_cache(
-            lat, lon, date,
-            statistics,
-            statistics['years_analyzed'],
-            statistics['data_years_count'],
-            latest_year,
-            missing_years,
-            confidence_score,
-            ai_insight=ai_insight,
-            verification_result=verification_result  # Save verification metadata
-        )
-        
-        response = {
-            "query": {"lat": lat, "lon": lon, "date": date},
-            "statistics": statistics,
-            "confidence_score": round(confidence_score, 2),
-            "cache_status": "miss",
-            "missing_data_alert": missing_data_alert,
-            "verification": {
-                "status": verification_result['status'],
-                "confidence": verification_result['confidence'],
-                "summary": verification_agent_instance.get_verification_summary(verification_result)
-            }
-        }
-        
-        # Add detailed verification info if there are anomalies
-        if verification_result.get('anomalies'):
-            response["verification"]["anomalies"] = verification_result['anomalies']
-            response["verification"]["notes"] = verification_result.get('validation_notes', '')
-        
-        if ai_insight:
-            response["ai_insight"] = ai_insight
-
-        if already_passed is not None:
-            response["server_already_passed"] = bool(already_passed)
-
-        return response
-
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except FileNotFoundError:
-        raise HTTPException(status_code=500, detail="Server configuration error: Data file not found.")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+    server_already_passed = prediction_service.compute_already_passed(date, timezone, part_of_day)
 
+    return await _predict_core(
+        current_user=current_user,
+        lat=lat,
+        lon=lon,
+        date=date,
+        activity=activity,
+        part_of_day=part_of_day,
+        already_passed=server_already_passed,
+        debug=debug,
+        defer_insight=defer_insight,
+        fields=fields,
+        if_none_match=if_none_match
+    )
 
 
 class PredictRequest(BaseModel):
@@ -372,6 +173,9 @@ class PredictRequest(BaseModel):
     timezone: Optional[str] = None
     part_of_day: Optional[str] = None
     already_passed: Optional[bool] = None
+    debug: Optional[str] = None
+    defer_insight: bool = False
+    fields: Optional[str] = None
     # Support frontend sending location as nested object
     location: Optional[dict] = None
     troe_location: Optional[dict] = None
@@ -401,6 +205,7 @@ class PredictRequest(BaseModel):
         return values
 
 
+
 async def _predict_core(
     current_user: dict,
     lat: float,
@@ -409,124 +214,75 @@ async def _predict_core(
     activity: Optional[str] = None,
     part_of_day: Optional[str] = None,
     already_passed: Optional[bool] = None,
+    debug: Optional[str] = None,
+    defer_insight: bool = False,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = None,
 ):
     """
-    Core predict logic factored out so both GET and POST endpoints can reuse it.
+    Runs the shared prediction pipeline (cache lookup, incremental refresh,
+    verification, AI insight) and maps its errors to HTTP responses.
+    Used by both the GET and POST endpoints.
     """
-    try:
-        # Log the authenticated user making the request
-        activity_text = f" for activity: {activity}" if activity else ""
-        print(f"📊 Prediction request from user: {current_user['email']} ({current_user['name']}){activity_text}")
-
-        # Fetch all historical data
-        historical_data = nasa_data_handler.get_historical_data(lat, lon, date)
-
-        # Calculate statistics
-        statistics = statistical_engine.calculate_statistics(historical_data)
-
-        if "error" in statistics:
-            raise HTTPException(status_code=404, detail=statistics["error"])
-
-        # ============================================================
-        # STAGE 1: AI VERIFICATION OF STATISTICS
-        # ============================================================
-        print("🔍 Stage 1: Verifying statistical calculations with AI...")
-        verification_result = verification_agent_instance.verify_statistics(
-            statistics=statistics,
-            location={"lat": lat, "lon": lon},
-            date=date
-        )
-
-        # Note: server_already_passed will be attached to responses after
-        # those response dicts are constructed further below.
-
-        # Check if verification flagged any issues
-        if not verification_result.get('is_valid', True):
-            print(f"⚠️ Verification flagged anomalies: {verification_result.get('anomalies', [])}")
+    # Log the authenticated user making the request (by ID: e-mail addresses stay out of the logs)
+    logger.info("Prediction request", extra={
+        "user_id": current_user.get("user_id"), "lat": lat, "lon": lon, "date": date, "activity": activity
+    })
+    popularity_log.record_hit(lat, lon, date)
 
-        # Calculate metadata for caching
-        current_year = datetime.now().year
-        target_year = datetime.strptime(date, "%Y-%m-%d").year
-        latest_year = int(statistics['years_analyzed'].split('-')[1])
-
-        # Determine missing years between latest available data and target year
-        if target_year > latest_year:
-            missing_years = list(range(latest_year + 1, target_year + 1))
-        else:
-            missing_years = []
-
-        # Calculate confidence score
-        confidence_score = firestore_service.calculate_confidence_score(
-            statistics['data_years_count'],
-            len(missing_years)
-        )
-
-        # Generate missing data alert if needed
-        missing_data_alert = firestore_service.get_missing_data_alert(
-            missing_years,
-            statistics['data_years_count']
-        )
-
-        # ============================================================
-        # STAGE 2: AI INSIGHT GENERATION (with verified data)
-        # ============================================================
-        print("🤖 Stage 2: Generating human-readable insight with verified data...")
-        ai_insight = reasoning_agent.generate_insight(
+    try:
+        response = await prediction_service.run_prediction(
             lat, lon, date,
-            statistics,
-            confidence_score,
-            missing_data_alert,
-            activity,
+            activity=activity,
             part_of_day=part_of_day,
-            already_passed=already_passed
+            already_passed=already_passed,
+            debug=debug,
+            defer_insight=defer_insight
         )
+    except Exception as e:
+        raise _to_http_exception(e)
 
-        # Save to cache with AI insight and verification status
-        firestore_service.save_prediction_to_cache(
-            lat, lon, date,
-            statistics,
-            statistics['years_analyzed'],
-            statistics['data_years_count'],
-            latest_year,
-            missing_years,
-            confidence_score,
-            ai_insight=ai_insight,
-            verification_result=verification_result  # Save verification metadata
-        )
+    content = project_fields(response, parse_fields(fields))
+    if not _is_complete_prediction(response, debug):
+        return FastJSONResponse(content, headers={"Cache-Control": "no-store"})
+    # cache_status only says how this request was served, the content is the same
+    return cacheable_response(content, if_none_match, PREDICT_CACHE_CONTROL, etag_exclude=("cache_status",))
 
-        response = {
-            "query": {"lat": lat, "lon": lon, "date": date},
-            "statistics": statistics,
-            "confidence_score": round(confidence_score, 2),
-            "cache_status": "miss",
-            "missing_data_alert": missing_data_alert,
-            "verification": {
-                "status": verification_result['status'],
-                "confidence": verification_result['confidence'],
-                "summary": verification_agent_instance.get_verification_summary(verification_result)
-            }
-        }
-
-        # Add detailed verification info if there are anomalies
-        if verification_result.get('anomalies'):
-            response["verification"]["anomalies"] = verification_result['anomalies']
-            response["verification"]["notes"] = verification_result.get('validation_notes', '')
-
-        if ai_insight:
-            response["ai_insight"] = ai_insight
-
-        return response
-
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except FileNotFoundError:
-        raise HTTPException(status_code=500, detail="Server configuration error: Data file not found.")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+def _is_complete_prediction(response: dict, debug: Optional[str]) -> bool:
+    """
+    Whether a prediction response may be cached: not while the insight is
+    pending, stages were cut by the deadline or stale data was returned.
+    """
+    return not (
+        debug
+        or response.get("insight_pending")
+        or response.get("pipeline_status") == "partial"
+        or response.get("warning")
+    )
+
+
+def _to_http_exception(error: Exception) -> HTTPException:
+    """Maps prediction pipeline errors to HTTP responses"""
+    if isinstance(error, HTTPException):
+        return error
+    if isinstance(error, ValueError):
+        return HTTPException(status_code=400, detail=str(error))
+    if isinstance(error, nasa_data_handler.UpstreamUnavailable):
+        return HTTPException(status_code=502, detail=str(error))
+    if isinstance(error, LookupError):
+        return HTTPException(status_code=404, detail=str(error))
+    if isinstance(error, FileNotFoundError):
+        return HTTPException(status_code=500, detail="Server configuration error: Data file not found.")
+    return HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(error)}")
 
 
 @router.post('/predict', tags=["Prediction"])
-async def predict_weather_post(payload: PredictRequest, current_user: dict = Depends(get_current_user)):
+async def predict_weather_post(
+    payload: PredictRequest,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
     """
     Accepts a JSON body for prediction requests. Server will recompute 'already_passed'
     using the provided IANA timezone (if any) and will use that authoritative value
@@ -543,72 +299,12 @@ async def predict_weather_post(payload: PredictRequest, current_user: dict = Dep
         raise HTTPException(status_code=422, detail="lat and lon are required")
 
     # Compute authoritative already_passed using server timezone data
-    tz_name = payload.timezone or 'UTC'
-    server_already_passed = None
-    try:
-        tzinfo = ZoneInfo(tz_name)
-        now = datetime.now(tzinfo)
-
-        # Determine end time for the requested part_of_day
-        part = payload.part_of_day or 'all_day'
-        # parse date parts once
-        year, month, day = [int(p) for p in payload.date.split('-')]
-        if part == 'morning':
-            part_end = datetime(year, month, day, 12, 0, tzinfo=tzinfo)
-        elif part == 'noon':
-            part_end = datetime(year, month, day, 16, 0, tzinfo=tzinfo)
-        elif part == 'evening':
-            part_end = datetime(year, month, day, 19, 0, tzinfo=tzinfo)
-        elif part == 'night':
-            # night: 19:00 selected day to 04:00 next day
-            base = datetime(year, month, day, 19, 0, tzinfo=tzinfo)
-            part_end = base + timedelta(hours=9)
-        else:
-            part_end = datetime(year, month, day, 23, 59, 59, tzinfo=tzinfo)
-
-        # Compare dates (day-based) first
-        today = datetime(now.year, now.month, now.day, tzinfo=tzinfo)
-        selected_day = datetime(int(payload.date.split('-')[0]), int(payload.date.split('-')[1]), int(payload.date.split('-')[2]), tzinfo=tzinfo)
-
-        if selected_day < today:
-            server_already_passed = True
-        elif selected_day > today:
-            server_already_passed = False
-        else:
-            server_already_passed = part_end < now
-
-    except ZoneInfoNotFoundError:
-        print(f"⚠️ Timezone not found on server: {tz_name}. Falling back to UTC for already_passed computation.")
-        try:
-            now = datetime.utcnow()
-            # simple fallback: similar to previous logic but naive
-            part = payload.part_of_day or 'all_day'
-            year, month, day = [int(p) for p in payload.date.split('-')]
-            if part == 'morning':
-                part_end = datetime(year, month, day, 12, 0)
-            elif part == 'noon':
-                part_end = datetime(year, month, day, 16, 0)
-            elif part == 'evening':
-                part_end = datetime(year, month, day, 19, 0)
-            elif part == 'night':
-                part_end = datetime(year, month, day, 19, 0) + timedelta(hours=9)
-            else:
-                part_end = datetime(year, month, day, 23, 59, 59)
-
-            today = datetime(now.year, now.month, now.day)
-            selected_day = datetime(year, month, day)
-            if selected_day < today:
-                server_already_passed = True
-            elif selected_day > today:
-                server_already_passed = False
-            else:
-                server_already_passed = part_end < now
-        except Exception:
-            server_already_passed = payload.already_passed if payload.already_passed is not None else False
-
-    # Log if client and server disagree
-    if payload.already_passed is not None and payload.already_passed != server_already_passed:
-        print(f"⚠️ Client sent already_passed={payload.already_passed} but server computed {server_already_passed}. Using server value.")
+    server_already_passed = prediction_service.compute_already_passed(
+        payload.date,
+        timezone=payload.timezone,
+        part_of_day=payload.part_of_day,
+        client_value=payload.already_passed
+    )
 
     # Call core predict logic with authoritative already_passed and part_of_day
     return await _predict_core(
@@ -618,5 +314,187 @@ async def predict_weather_post(payload: PredictRequest, current_user: dict = Dep
         date=payload.date,
         activity=payload.activity,
         part_of_day=payload.part_of_day,
-        already_passed=server_already_passed
-    )
\ No newline at end of file
+        already_passed=server_already_passed,
+        debug=payload.debug,
+        defer_insight=payload.defer_insight,
+        fields=payload.fields,
+        if_none_match=if_none_match
+    )
+
+
+class PredictRangeRequest(BaseModel):
+    lat: float
+    lon: float
+    start_date: str
+    end_date: str
+    activity: Optional[str] = None
+    timezone: Optional[str] = None
+    part_of_day: Optional[str] = None
+    fields: Optional[str] = None
+
+
+@router.post("/predict/range", tags=["Prediction"])
+async def predict_weather_range(payload: PredictRangeRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Predicts every date from start_date to end_date (inclusive) for one location.
+    
+    **Requires Authentication**: Include `Authorization: Bearer <token>` header
+    
+    Statistics come from the shared cache per date; AI insights for all dates
+    not yet in the insight cache are generated with a single Gemini call.
+    `fields` projects each entry of `days` (see GET /predict).
+    """
+    logger.info("Range prediction request", extra={
+        "user_id": current_user.get("user_id"), "lat": payload.lat, "lon": payload.lon,
+        "start_date": payload.start_date, "end_date": payload.end_date, "activity": payload.activity
+    })
+
+    try:
+        dates = prediction_service.expand_date_range(payload.start_date, payload.end_date)
+        for date in dates:
+            popularity_log.record_hit(payload.lat, payload.lon, date)
+        response = await prediction_service.run_range_prediction(
+            payload.lat, payload.lon, dates,
+            activity=payload.activity,
+            part_of_day=payload.part_of_day,
+            timezone=payload.timezone
+        )
+    except Exception as e:
+        raise _to_http_exception(e)
+
+    paths = parse_fields(payload.fields)
+    response["days"] = [project_fields(day, paths) for day in response["days"]]
+    return FastJSONResponse(response)
+
+
+class PredictBatchItem(BaseModel):
+    lat: float
+    lon: float
+    date: str
+
+
+class PredictBatchRequest(BaseModel):
+    items: List[PredictBatchItem]
+    activity: Optional[str] = None
+    timezone: Optional[str] = None
+    part_of_day: Optional[str] = None
+    skip_llm: bool = False
+    fields: Optional[str] = None
+
+
+@router.post("/predict/batch", tags=["Prediction"])
+async def predict_weather_batch(payload: PredictBatchRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Predicts many (lat, lon, date) items in one request, e.g. all venues of a partner.
+
+    **Requires Authentication**: Include `Authorization: Bearer <token>` header
+
+    Items are snapped to the cache grid (2 decimals) and deduplicated; cache hits
+    are read in one batch and misses fetched concurrently. Each result carries
+    its item's `index` and either a `prediction` or an `error` with `status_code`
+    and `code` (invalid_request, location_rejected, no_data, upstream_error,
+    internal_error). `skip_llm=true` keeps verification rule-based and skips
+    insight generation (cached insights are still returned). `fields` projects
+    each `prediction` (see GET /predict).
+    """
+    logger.info("Batch prediction request", extra={
+        "user_id": current_user.get("user_id"), "items": len(payload.items), "skip_llm": payload.skip_llm
+    })
+
+    try:
+        response = await prediction_service.run_batch_prediction(
+            [{"lat": item.lat, "lon": item.lon, "date": item.date} for item in payload.items],
+            activity=payload.activity,
+            part_of_day=payload.part_of_day,
+            timezone=payload.timezone,
+            skip_llm=payload.skip_llm
+        )
+    except Exception as e:
+        raise _to_http_exception(e)
+
+    paths = parse_fields(payload.fields)
+    for result in response["results"]:
+        if result["status"] == "ok":
+            query = result["prediction"]["query"]
+            popularity_log.record_hit(query["lat"], query["lon"], query["date"])
+            result["prediction"] = project_fields(result["prediction"], paths)
+    return FastJSONResponse(response)
+
+
+def _sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.get("/predict/stream", tags=["Prediction"])
+async def predict_weather_stream(
+    lat: float = Query(..., description="Latitude of the location"),
+    lon: float = Query(..., description="Longitude of the location"),
+    date: str = Query(..., description="Date in YYYY-MM-DD format", regex=r"\d{4}-\d{2}-\d{2}"),
+    activity: str = Query(None, description="Planned activity (e.g., 'picnic', 'trekking', 'wedding')"),
+    part_of_day: Optional[str] = Query(None, description="morning, noon, evening, night or all_day"),
+    timezone: Optional[str] = Query(None, description="IANA timezone used to decide whether the date has passed"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Streams a prediction as server-sent events.
+    
+    **Requires Authentication**: Include `Authorization: Bearer <token>` header
+    
+    Events, in order:
+    - `statistics`: statistics, confidence and cache status, as soon as they are known
+    - `insight_token`: AI insight text chunks as Gemini generates them
+      (or a single `insight` event when the insight was cached)
+    - `done`: verification result and pipeline status
+    
+    Errors resolving the statistics are returned as regular HTTP errors before the stream starts.
+    """
+    logger.info("Streaming prediction request", extra={
+        "user_id": current_user.get("user_id"), "lat": lat, "lon": lon, "date": date, "activity": activity
+    })
+    popularity_log.record_hit(lat, lon, date)
+
+    already_passed = prediction_service.compute_already_passed(date, timezone, part_of_day)
+    try:
+        resolved = await prediction_service.resolve_statistics(lat, lon, date)
+    except Exception as e:
+        raise _to_http_exception(e)
+
+    async def event_stream():
+        try:
+            async for event, data in prediction_service.stream_prediction(
+                resolved, lat, lon, date,
+                activity=activity,
+                part_of_day=part_of_day,
+                already_passed=already_passed
+            ):
+                yield _sse_event(event, data)
+        except Exception as e:
+            logger.error("Prediction stream failed: %s", e)
+            yield _sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/predict/insight/{token}", tags=["Prediction"])
+async def get_deferred_insight(
+    token: str,
+    wait: float = Query(0, ge=0, description="Seconds to long-poll while the insight is being generated"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Retrieves an AI insight deferred by `/predict?defer_insight=true`.
+    
+    **Requires Authentication**: Include `Authorization: Bearer <token>` header
+    
+    Returns `status` 'ready' (with `ai_insight`), 'pending' (poll again, or pass
+    `wait` to long-poll) or 'failed'. Any worker answers for any token. Unknown
+    or expired tokens return 404.
+    """
+    result = await prediction_service.get_deferred_insight(token, wait=wait)
+    if result["status"] == "unknown":
+        raise HTTPException(status_code=404, detail="Unknown or expired insight token")
+    return result
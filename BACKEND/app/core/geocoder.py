@@ -0,0 +1,150 @@
+"""
+Offline Reverse Geocoder
+Resolves coordinates to the nearest populated place from a bundled gazetteer
+(app/data/places.csv), so prompts and responses can name the location
+without asking Gemini to guess it.
+
+The gazetteer is loaded on first use into numpy arrays with a 1-degree grid
+index; lookups are cached per snapped cell (2 decimals, like the prediction cache).
+"""
+
+import os
+import csv
+import math
+import logging
+import threading
+import numpy as np
+from functools import lru_cache
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_PATH = os.getenv(
+    "GAZETTEER_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "places.csv")
+)
+
+# Farther than this from every known place, no name is given
+PLACE_MAX_DISTANCE_KM = float(os.getenv("PLACE_MAX_DISTANCE_KM", "150"))
+
+# Within this distance the place name is used as is, beyond it as "near <place>"
+PLACE_NEAR_DISTANCE_KM = float(os.getenv("PLACE_NEAR_DISTANCE_KM", "25"))
+
+EARTH_RADIUS_KM = 6371.0
+_KM_PER_DEGREE = 111.2
+
+
+class Gazetteer:
+    """Populated places with a grid index for nearest-place lookups"""
+
+    def __init__(self, path: str = GAZETTEER_PATH):
+        names, countries, lats, lons = [], [], [], []
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                names.append(row['name'])
+                countries.append(row['country'])
+                lats.append(float(row['lat']))
+                lons.append(float(row['lon']))
+
+        self.names = names
+        self.countries = countries
+        self.lat = np.radians(np.array(lats))
+        self.lon = np.radians(np.array(lons))
+
+        cells: Dict[tuple, list] = {}
+        for index, (lat, lon) in enumerate(zip(lats, lons)):
+            cells.setdefault((math.floor(lat), math.floor(lon)), []).append(index)
+        self.grid = {cell: np.array(indices) for cell, indices in cells.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _candidates(self, lat: float, lon: float, max_distance_km: float) -> np.ndarray:
+        """Indices of places in the grid cells a max_distance_km circle can touch"""
+        lat_span = max_distance_km / _KM_PER_DEGREE
+        cos_lat = max(math.cos(math.radians(min(abs(lat) + lat_span, 90.0))), 0.01)
+        lon_span = min(max_distance_km / (_KM_PER_DEGREE * cos_lat), 180.0)
+
+        found = []
+        for cell_lat in range(math.floor(lat - lat_span), math.floor(lat + lat_span) + 1):
+            for cell_lon in range(math.floor(lon - lon_span), math.floor(lon + lon_span) + 1):
+                # Wrap around the antimeridian
+                wrapped = (cell_lon + 180) % 360 - 180
+                indices = self.grid.get((cell_lat, wrapped))
+                if indices is not None:
+                    found.append(indices)
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=int)
+
+    def nearest(self, lat: float, lon: float, max_distance_km: float = PLACE_MAX_DISTANCE_KM) -> Optional[tuple]:
+        """
+        Returns:
+            (index, distance_km) of the nearest place within max_distance_km, or None
+        """
+        candidates = self._candidates(lat, lon, max_distance_km)
+        if candidates.size == 0:
+            return None
+
+        lat_r, lon_r = math.radians(lat), math.radians(lon)
+        dlat = self.lat[candidates] - lat_r
+        dlon = self.lon[candidates] - lon_r
+        a = np.sin(dlat / 2) ** 2 + math.cos(lat_r) * np.cos(self.lat[candidates]) * np.sin(dlon / 2) ** 2
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+        best = int(np.argmin(distances))
+        if distances[best] > max_distance_km:
+            return None
+        return int(candidates[best]), float(distances[best])
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Loads the bundled gazetteer on first use"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer()
+                logger.info("Gazetteer loaded: %d places", len(_gazetteer))
+    return _gazetteer
+
+
+@lru_cache(maxsize=16384)
+def _resolve_cell(lat: float, lon: float) -> Optional[Dict[str, Any]]:
+    try:
+        gazetteer = get_gazetteer()
+    except (OSError, KeyError, ValueError) as e:
+        logger.warning("Gazetteer unavailable: %s", e)
+        return None
+
+    match = gazetteer.nearest(lat, lon)
+    if match is None:
+        return None
+
+    index, distance_km = match
+    name = f"{gazetteer.names[index]}, {gazetteer.countries[index]}"
+    return {
+        "name": gazetteer.names[index],
+        "country": gazetteer.countries[index],
+        "distance_km": round(distance_km, 1),
+        "label": name if distance_km <= PLACE_NEAR_DISTANCE_KM else f"near {name}",
+    }
+
+
+def resolve_place(lat: float, lon: float) -> Optional[Dict[str, Any]]:
+    """
+    Resolves coordinates to the nearest bundled place (cached per snapped cell).
+
+    Returns:
+        dict with name, country, distance_km and a display label
+        ("Bengaluru, India" or "near Mysuru, India"), or None if nothing is close
+    """
+    return _resolve_cell(round(lat, 2), round(lon, 2))
+
+
+def resolve_place_name(lat: float, lon: float) -> Optional[str]:
+    """Display label of resolve_place, or None"""
+    place = resolve_place(lat, lon)
+    return place["label"] if place else None
@@ -0,0 +1,182 @@
+"""
+LLM Backends
+Creates the model objects both agents call. LLM_BACKEND selects:
+
+- gemini (default): google-generativeai GenerativeModel, needs GEMINI_API_KEY
+- fake: a local, deterministic stand-in with configurable latency, streaming,
+  error rate and canned verification JSON, for load tests and benchmarks
+
+Every backend's model exposes the Gemini SDK surface the agents use:
+generate_content(prompt, stream=False, **kwargs) and
+generate_content_async(prompt, stream=False, **kwargs), returning objects
+with a .text attribute (or iterables of them when streaming).
+"""
+
+import os
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Optional, List
+import google.generativeai as genai
+
+logger = logging.getLogger(__name__)
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+
+# Fake backend settings
+# Latency per call: "fixed:<ms>", "uniform:<min_ms>:<max_ms>" or "lognormal:<median_ms>:<sigma>"
+FAKE_LLM_LATENCY = os.getenv("FAKE_LLM_LATENCY", "lognormal:800:0.5")
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_CHUNK_CHARS = int(os.getenv("FAKE_LLM_CHUNK_CHARS", "40"))
+FAKE_LLM_CHUNK_DELAY_MS = float(os.getenv("FAKE_LLM_CHUNK_DELAY_MS", "30"))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "42"))
+# Returned for verification prompts (overrides the default "valid" payload)
+FAKE_LLM_VERIFICATION_JSON = os.getenv("FAKE_LLM_VERIFICATION_JSON")
+
+DEFAULT_VERIFICATION_PAYLOAD = {
+    "is_valid": True,
+    "confidence": "high",
+    "anomalies": [],
+    "validation_notes": "Values are physically plausible and internally consistent (fake backend)",
+    "recommendations": ""
+}
+
+FAKE_INSIGHT_TEXT = (
+    "Based on the historical records, you can expect mostly pleasant conditions with a moderate "
+    "chance of showers later in the day. Temperatures should stay comfortable, so light clothing "
+    "works well, but keep an umbrella handy just in case. It's a good day for outdoor plans if you "
+    "stay flexible in the afternoon."
+)
+
+
+class FakeLLMError(RuntimeError):
+    """Injected failure from the fake backend (FAKE_LLM_ERROR_RATE)"""
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+def parse_latency(spec: str):
+    """
+    Latency sampler for a spec like FAKE_LLM_LATENCY ("fixed:<ms>",
+    "uniform:<min_ms>:<max_ms>" or "lognormal:<median_ms>:<sigma>").
+
+    Returns:
+        callable: random.Random -> milliseconds
+    """
+    kind, *params = spec.split(':')
+    values = [float(param) for param in params]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Invalid latency spec '{spec}'")
+
+
+class FakeModel:
+    """
+    Deterministic stand-in for a Gemini model. Latencies and injected errors
+    come from a seeded RNG, so the same sequence of calls behaves the same way
+    on every run; response text depends only on the prompt.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        latency: str = FAKE_LLM_LATENCY,
+        error_rate: float = FAKE_LLM_ERROR_RATE,
+        chunk_chars: int = FAKE_LLM_CHUNK_CHARS,
+        chunk_delay_ms: float = FAKE_LLM_CHUNK_DELAY_MS,
+        seed: int = FAKE_LLM_SEED,
+        verification_json: Optional[str] = FAKE_LLM_VERIFICATION_JSON
+    ):
+        self.model_name = model_name
+        self.error_rate = error_rate
+        self.chunk_chars = max(1, chunk_chars)
+        self.chunk_delay = chunk_delay_ms / 1000
+        self.verification_text = verification_json or json.dumps(DEFAULT_VERIFICATION_PAYLOAD)
+        self._latency = parse_latency(latency)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _next_call(self) -> tuple:
+        """Draws (latency seconds, should fail) for one call"""
+        with self._lock:
+            self.calls += 1
+            latency = max(0.0, self._latency(self._rng)) / 1000
+            fails = self._rng.random() < self.error_rate
+        return latency, fails
+
+    def _respond(self, prompt: str) -> str:
+        if "JSON ARRAY" in prompt:
+            dates = re.findall(r"^\s*- (\d{4}-\d{2}-\d{2}) \|", prompt, flags=re.MULTILINE)
+            return json.dumps([{"date": date, "insight": FAKE_INSIGHT_TEXT} for date in dates])
+        if "meteorological data validator" in prompt:
+            return self.verification_text
+        return FAKE_INSIGHT_TEXT
+
+    def _chunks(self, text: str) -> List[str]:
+        return [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        latency, fails = self._next_call()
+        time.sleep(latency)
+        if fails:
+            raise FakeLLMError("Injected fake LLM failure")
+        text = self._respond(prompt)
+        if not stream:
+            return FakeResponse(text)
+
+        def chunks():
+            for chunk in self._chunks(text):
+                time.sleep(self.chunk_delay)
+                yield FakeResponse(chunk)
+        return chunks()
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, **kwargs):
+        latency, fails = self._next_call()
+        await asyncio.sleep(latency)
+        if fails:
+            raise FakeLLMError("Injected fake LLM failure")
+        text = self._respond(prompt)
+        if not stream:
+            return FakeResponse(text)
+
+        async def chunks():
+            for chunk in self._chunks(text):
+                await asyncio.sleep(self.chunk_delay)
+                yield FakeResponse(chunk)
+        return chunks()
+
+
+def create_model(model_name: str):
+    """
+    Creates the model for an agent from the configured backend.
+
+    Returns:
+        (model or None, label for 'generated_by' metadata)
+    """
+    if LLM_BACKEND == "fake":
+        logger.info("Using fake LLM backend for %s (latency %s, error rate %s)", model_name, FAKE_LLM_LATENCY, FAKE_LLM_ERROR_RATE)
+        return FakeModel(model_name), f"fake-{model_name}"
+
+    if LLM_BACKEND != "gemini":
+        logger.warning("Unknown LLM_BACKEND '%s', expected 'gemini' or 'fake'", LLM_BACKEND)
+        return None, model_name
+
+    api_key = os.getenv('GEMINI_API_KEY')
+    if not api_key:
+        return None, model_name
+
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name), model_name
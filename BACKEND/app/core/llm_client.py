@@ -0,0 +1,236 @@
+"""
+Async LLM Client
+Shared gate in front of every Gemini call made from the event loop:
+a global concurrency limit, a bounded wait queue that sheds load when full,
+per-call timeouts and cancellation, plus queue/in-flight metrics.
+"""
+
+import os
+import time
+import asyncio
+import threading
+import weakref
+from typing import Dict, Any, Optional
+from app.utils import metrics
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "5"))
+LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "20"))
+
+LLM_CALL_SECONDS = metrics.histogram(
+    "llm_call_duration_seconds", "Gemini calls by pipeline stage and outcome (queue wait excluded)", ["stage", "outcome"]
+)
+LLM_FAILURES = metrics.counter(
+    "llm_failures_total", "Gemini calls that were shed, timed out or failed, by pipeline stage", ["stage", "reason"]
+)
+
+
+class LLMOverloadedError(RuntimeError):
+    """Raised when a call is shed because the wait queue is full or the wait took too long"""
+
+
+class LLMClient:
+    """
+    Concurrency-limited async wrapper around Gemini models.
+
+    Calls wait in a bounded queue for one of max_concurrency slots; when the
+    queue is full (or a slot does not free up within queue_timeout) the call
+    is rejected immediately instead of piling up behind a slow upstream.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_queue: int = LLM_MAX_QUEUE,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS,
+        call_timeout: float = LLM_CALL_TIMEOUT_SECONDS
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.call_timeout = call_timeout
+        # One semaphore per event loop (asyncio primitives are loop-bound)
+        self._semaphores: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._metrics = {
+            "queued": 0,
+            "in_flight": 0,
+            "peak_queued": 0,
+            "peak_in_flight": 0,
+            "completed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "cancelled": 0,
+            "shed": 0,
+        }
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    def _change(self, name: str, amount: int = 1):
+        with self._lock:
+            self._metrics[name] += amount
+            peak = f"peak_{name}"
+            if peak in self._metrics and self._metrics[name] > self._metrics[peak]:
+                self._metrics[peak] = self._metrics[name]
+
+    async def _acquire(self) -> asyncio.Semaphore:
+        semaphore = self._semaphore()
+        with self._lock:
+            # Admission is decided synchronously: every call is either queued or in flight
+            if self._metrics["queued"] + self._metrics["in_flight"] >= self.max_concurrency + self.max_queue:
+                self._metrics["shed"] += 1
+                raise LLMOverloadedError(f"LLM queue full ({self.max_queue} waiting)")
+            self._metrics["queued"] += 1
+            self._metrics["peak_queued"] = max(self._metrics["peak_queued"], self._metrics["queued"])
+
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._change("shed")
+            raise LLMOverloadedError(f"No LLM slot free within {self.queue_timeout}s")
+        finally:
+            self._change("queued", -1)
+
+        self._change("in_flight")
+        return semaphore
+
+    def _release(self, semaphore: asyncio.Semaphore):
+        self._change("in_flight", -1)
+        semaphore.release()
+
+    async def _call(self, model, prompt: str, **kwargs):
+        if hasattr(model, 'generate_content_async'):
+            return await model.generate_content_async(prompt, **kwargs)
+        # Blocking SDKs and test doubles run in a worker thread
+        if hasattr(model, 'generate_content'):
+            return await asyncio.to_thread(model.generate_content, prompt, **kwargs)
+        if hasattr(model, 'generate'):
+            return await asyncio.to_thread(model.generate, prompt)
+        raise RuntimeError('No supported generate method on model')
+
+    async def _acquire_for(self, stage: str) -> asyncio.Semaphore:
+        try:
+            return await self._acquire()
+        except LLMOverloadedError:
+            LLM_FAILURES.labels(stage, "shed").inc()
+            raise
+
+    @staticmethod
+    def _record(stage: str, outcome: str, started: float):
+        LLM_CALL_SECONDS.labels(stage, outcome).observe(time.perf_counter() - started)
+        if outcome in ("timeout", "error"):
+            LLM_FAILURES.labels(stage, outcome).inc()
+
+    async def generate(self, model, prompt: str, timeout: Optional[float] = None, stage: str = "other", **kwargs):
+        """
+        Runs one completion under the concurrency limit.
+
+        Args:
+            model: Gemini GenerativeModel (or a double with generate_content/generate)
+            prompt: Prompt text
+            timeout: Seconds for the call itself, defaults to call_timeout
+            stage: Pipeline stage making the call, for metrics (e.g. "verification")
+            **kwargs: Passed to generate_content_async (e.g. generation_config)
+
+        Raises:
+            LLMOverloadedError: Load was shed before the call started
+            asyncio.TimeoutError: The call exceeded its timeout (and was cancelled)
+        """
+        semaphore = await self._acquire_for(stage)
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(self._call(model, prompt, **kwargs), timeout=timeout or self.call_timeout)
+            self._change("completed")
+            self._record(stage, "ok", started)
+            return response
+        except asyncio.TimeoutError:
+            self._change("timeouts")
+            self._record(stage, "timeout", started)
+            raise
+        except asyncio.CancelledError:
+            self._change("cancelled")
+            self._record(stage, "cancelled", started)
+            raise
+        except Exception:
+            self._change("failed")
+            self._record(stage, "error", started)
+            raise
+        finally:
+            self._release(semaphore)
+
+    async def stream(self, model, prompt: str, timeout: Optional[float] = None, stage: str = "other", **kwargs):
+        """
+        Streams a completion, holding a slot until the stream is exhausted or closed.
+        Yields the SDK's response chunks; the timeout covers the whole stream.
+        """
+        semaphore = await self._acquire_for(stage)
+        started = time.perf_counter()
+        deadline = time.monotonic() + (timeout or self.call_timeout)
+        try:
+            response = await asyncio.wait_for(
+                model.generate_content_async(prompt, stream=True, **kwargs),
+                timeout=max(0.0, deadline - time.monotonic())
+            )
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(0.0, deadline - time.monotonic()))
+                except StopAsyncIteration:
+                    break
+                yield chunk
+            self._change("completed")
+            self._record(stage, "ok", started)
+        except asyncio.TimeoutError:
+            self._change("timeouts")
+            self._record(stage, "timeout", started)
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            self._change("cancelled")
+            self._record(stage, "cancelled", started)
+            raise
+        except Exception:
+            self._change("failed")
+            self._record(stage, "error", started)
+            raise
+        finally:
+            self._release(semaphore)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Snapshot of queue depth, in-flight calls and outcome counters"""
+        with self._lock:
+            return {
+                **self._metrics,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+            }
+
+
+# Singleton instance
+_llm_client = None
+
+
+def get_llm_client() -> LLMClient:
+    """Get or create the shared LLM client"""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = LLMClient()
+    return _llm_client
+
+
+def _collect_queue_metrics():
+    if _llm_client is None:
+        return []
+    current = _llm_client.get_metrics()
+    return [
+        (metrics.METRIC_PREFIX + "llm_in_flight", "gauge", "Gemini calls in flight", {}, current["in_flight"]),
+        (metrics.METRIC_PREFIX + "llm_queued", "gauge", "Gemini calls waiting for a slot", {}, current["queued"]),
+    ]
+
+
+metrics.REGISTRY.register_collector(_collect_queue_metrics)
@@ -1,11 +1,25 @@
+import os
+import logging
 import requests
+import numpy as np
 import pandas as pd
 import time
+import asyncio
+import threading
+import weakref
+import httpx
 from datetime import datetime
 from io import StringIO
+from app.utils import metrics, tracing
+from app.utils.shared_cache import tiered_cache
+from app.core import statistical_engine
+from app.utils.http_client import get_async_http_client
+
+logger = logging.getLogger(__name__)
 
 # --- CONFIGURATION ---
-NASA_POWER_API_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
+# Overridable to point at a stand-in server (scripts/nasa_power_stub.py) in load tests
+NASA_POWER_API_URL = os.getenv("NASA_POWER_API_URL", "https://power.larc.nasa.gov/api/temporal/daily/point")
 
 # NASA POWER API has data from 1986 to 2024
 START_YEAR = 1986
@@ -18,8 +32,75 @@ YEAR_RANGES = [
     (2022, 2024)
 ]
 
+# Concurrent NASA POWER requests per worker from the async fetch (politeness limit)
+NASA_MAX_CONCURRENT_REQUESTS = int(os.getenv("NASA_MAX_CONCURRENT_REQUESTS", "4"))
+_request_semaphores: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+# Retries of a range after a connection error or a 429/5xx answer (async fetch), with exponential backoff
+NASA_CHUNK_RETRIES = int(os.getenv("NASA_CHUNK_RETRIES", "2"))
+NASA_RETRY_BACKOFF_SECONDS = float(os.getenv("NASA_RETRY_BACKOFF_SECONDS", "0.5"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+CHUNK_SECONDS = metrics.histogram(
+    "nasa_chunk_duration_seconds", "Download of one NASA POWER year range, retries included", ["outcome"]
+)
+CHUNK_RETRIES = metrics.counter("nasa_chunk_retries_total", "Retried NASA POWER range downloads", ["reason"])
+RESPONSE_BYTES = metrics.counter("nasa_response_bytes_total", "Bytes of NASA POWER response bodies")
+
 # Parameters to fetch from NASA POWER API
 PARAMETERS = "WS10M,RH2M,T2M_MAX,T2M_MIN,PRECTOTCORR"
+PARAMETER_COLUMNS = PARAMETERS.split(",")
+
+# NASA POWER reports days it has not published yet with this fill value
+FILL_VALUE = -999
+
+# Days on each side of the target day kept for neighbouring-day climatology
+NEIGHBOUR_WINDOW_DAYS = int(os.getenv("NEIGHBOUR_WINDOW_DAYS", "7"))
+
+# Negative cache: cells NASA POWER rejected (400/404), e.g. oceans or out-of-domain points
+# (shared between worker processes when SHARED_CACHE_PATH is set)
+_negative_cache = tiered_cache(
+    'negative',
+    maxsize=int(os.getenv("NEGATIVE_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("NEGATIVE_CACHE_TTL_SECONDS", "86400"))
+)
+_negative_metrics_lock = threading.Lock()
+_negative_metrics = {
+    "rejections_cached": 0,
+    "short_circuited_requests": 0,
+    "avoided_upstream_calls": 0,
+}
+
+
+class LocationRejected(ValueError):
+    """Raised when NASA POWER rejects the location itself (400/404), e.g. an ocean point; cached"""
+
+
+class UpstreamUnavailable(RuntimeError):
+    """Raised when no year range could be downloaded (every range timed out); worth retrying"""
+
+
+def _snap_cell(lat: float, lon: float) -> str:
+    """Same 2-decimal snapping as the prediction cache keys"""
+    return f"{round(lat, 2)}_{round(lon, 2)}"
+
+
+def _remember_rejection(lat: float, lon: float, message: str):
+    _negative_cache.set(_snap_cell(lat, lon), message)
+    with _negative_metrics_lock:
+        _negative_metrics["rejections_cached"] += 1
+
+
+async def _remember_rejection_async(lat: float, lon: float, message: str):
+    await _negative_cache.aset(_snap_cell(lat, lon), message)
+    with _negative_metrics_lock:
+        _negative_metrics["rejections_cached"] += 1
+
+
+def get_negative_cache_metrics() -> dict:
+    """Returns size, hit and avoided-upstream-call counters of the negative cache"""
+    with _negative_metrics_lock:
+        return {**_negative_cache.stats(), **_negative_metrics}
 
 
 def _create_year_ranges_from_list(years: list) -> list:
@@ -57,22 +138,75 @@ def _create_year_ranges_from_list(years: list) -> list:
     return ranges
 
 
-def get_historical_data(lat: float, lon: float, date_str: str, specific_years: list = None):
+def parse_power_csv(csv_content: str) -> pd.DataFrame:
     """
-    Fetches historical weather data for a specific location and date from NASA POWER API.
+    Parses a NASA POWER CSV response (metadata header followed by the data table).
+    """
+    # Find where the CSV data starts (after the header lines)
+    header_end = csv_content.find('-END HEADER-')
+    data_start = csv_content.find('YEAR,', header_end if header_end != -1 else 0)
+    if data_start == -1:
+        data_start = 0
     
-    Args:
-        lat (float): Latitude of the location (-90 to 90)
-        lon (float): Longitude of the location (-180 to 180)
-        date_str (str): Target date in YYYY-MM-DD format
-        specific_years (list, optional): List of specific years to fetch. If None, fetches all available years.
+    return pd.read_csv(StringIO(csv_content[data_start:]))
+
+
+def _offsets_to_target(row_dates: np.ndarray, target_years: np.ndarray, target_month: int, target_day: int) -> tuple:
+    """
+    Days from the target month-day of target_years to each row's date, and
+    whether that month-day exists in the year (02-29 does not in non-leap years).
+    """
+    year_start = (target_years - 1970).astype('datetime64[Y]').astype('datetime64[D]')
+    month_start = year_start.astype('datetime64[M]') + (target_month - 1)
+    target_dates = month_start.astype('datetime64[D]') + (target_day - 1)
+    valid = target_dates.astype('datetime64[M]') == month_start
+    return (row_dates - target_dates).astype(np.int64), valid
+
+
+def select_target_day(df_chunk: pd.DataFrame, target_month: int, target_day: int) -> tuple:
+    """
+    Selects the rows for the target month-day in every year of a chunk, plus the
+    rows within NEIGHBOUR_WINDOW_DAYS of it. The window wraps across the year
+    boundary: for a 1 January target, late-December rows count as neighbours
+    of the following year's target day.
     
     Returns:
-        pd.DataFrame: Historical data for the specified date across all available years
-        
+        (target_rows, neighbour_rows) - neighbour_rows carries an OFFSET column
+        (days from the target day, never 0); unpublished days are dropped
+    """
+    published = df_chunk[(df_chunk[PARAMETER_COLUMNS] > FILL_VALUE).all(axis=1)]
+    
+    # Vectorised YEAR + DOY -> date of each row
+    years = published['YEAR'].to_numpy(dtype=np.int64)
+    row_dates = (years - 1970).astype('datetime64[Y]').astype('datetime64[D]') + (
+        published['DOY'].to_numpy(dtype=np.int64) - 1
+    )
+    
+    offsets, valid = _offsets_to_target(row_dates, years, target_month, target_day)
+    target_rows = published[valid & (offsets == 0)]
+    
+    # Nearest target day among the row's own year and the adjacent ones
+    nearest = np.where(valid, offsets, np.iinfo(np.int64).max)
+    for shift in (-1, 1):
+        adjacent, adjacent_valid = _offsets_to_target(row_dates, years + shift, target_month, target_day)
+        closer = adjacent_valid & (np.abs(adjacent) < np.abs(nearest))
+        nearest = np.where(closer, adjacent, nearest)
+    
+    in_window = (np.abs(nearest) >= 1) & (np.abs(nearest) <= NEIGHBOUR_WINDOW_DAYS)
+    neighbour_rows = published[in_window].assign(OFFSET=nearest[in_window])
+    
+    return target_rows, neighbour_rows
+
+
+def _plan_fetch(lat: float, lon: float, date_str: str, specific_years: list = None) -> tuple:
+    """
+    Validates a history request and picks the year ranges to download.
+
+    Returns:
+        (target_month, target_day, year ranges)
+
     Raises:
-        ValueError: If coordinates are invalid or date format is incorrect
-        requests.exceptions.HTTPError: If API request fails
+        ValueError: Invalid coordinates/date
     """
     # Validate coordinates
     if not (-90 <= lat <= 90):
@@ -83,105 +217,251 @@ def get_historical_data(lat: float, lon: float, date_str: str, specific_years: l
     # Parse the target date to extract month and day
     try:
         target_date = datetime.strptime(date_str, "%Y-%m-%d")
-        target_month = target_date.month
-        target_day = target_date.day
     except ValueError:
         raise ValueError(f"Invalid date format: {date_str}. Expected YYYY-MM-DD.")
     
     # Determine which years to fetch
     if specific_years:
         # Incremental update: fetch only specific years
-        print(f"📡 Fetching incremental data for years: {specific_years}")
+        logger.info("Fetching incremental data for years: %s", specific_years)
         year_ranges_to_fetch = _create_year_ranges_from_list(specific_years)
     else:
         # Full fetch: use default year ranges
         year_ranges_to_fetch = YEAR_RANGES
     
-    print(f"📡 Fetching historical data for ({lat}, {lon}) on {target_month:02d}-{target_day:02d}...")
+    logger.info("Fetching historical data for (%s, %s) on %02d-%02d", lat, lon, target_date.month, target_date.day)
+    return target_date.month, target_date.day, year_ranges_to_fetch
+
+
+def _skip_known_rejection(lat: float, lon: float, rejection, year_ranges_to_fetch: list):
+    """
+    Known-bad location (rejection is the negative cache entry): answer before any network I/O.
+
+    Raises:
+        LocationRejected: The location was already rejected by NASA POWER
+    """
+    if rejection is not None:
+        with _negative_metrics_lock:
+            _negative_metrics["short_circuited_requests"] += 1
+            _negative_metrics["avoided_upstream_calls"] += len(year_ranges_to_fetch)
+        logger.info("Skipping NASA request for known-bad location (%s, %s)", lat, lon)
+        raise LocationRejected(rejection)
+
+
+def _chunk_params(lat: float, lon: float, start_year: int, end_year: int) -> dict:
+    return {
+        "parameters": PARAMETERS,
+        "community": "AG",  # Agricultural community
+        "format": "CSV",
+        "latitude": lat,
+        "longitude": lon,
+        "start": f"{start_year}0101",
+        "end": f"{end_year}1231"
+    }
+
+
+def _rejection_message(lat: float, lon: float, status_code: int):
+    """Message for HTTP statuses that mean the location itself is bad (cached), else None"""
+    if status_code == 400:
+        # Bad request - possibly invalid location
+        return (
+            f"Invalid location coordinates ({lat}, {lon}). "
+            "The NASA POWER API could not find data for this location. "
+            "Please try a nearby location or use broader coordinates."
+        )
+    if status_code == 404:
+        return (
+            f"No data available for location ({lat}, {lon}). "
+            "Please try a different location."
+        )
+    return None
+
+
+def _parse_chunk(csv_content: str, target_month: int, target_day: int) -> tuple:
+    """Parses one downloaded range into (target-day rows, neighbouring-day rows)"""
+    return select_target_day(parse_power_csv(csv_content), target_month, target_day)
+
+
+def _combine_chunks(chunks: list, lat: float, lon: float, date_str: str) -> pd.DataFrame:
+    """
+    Concatenates parsed ranges and attaches the neighbouring-day climatology.
+
+    Raises:
+        UpstreamUnavailable: No range was downloaded
+    """
+    if not chunks:
+        raise UpstreamUnavailable(f"No historical data found for ({lat}, {lon}) on {date_str}")
+    
+    combined_df = pd.concat([data for data, _ in chunks], ignore_index=True)
+    
+    # Climatology of the surrounding days, used by the rule-based verification
+    combined_df.attrs["neighbour_climatology"] = statistical_engine.calculate_neighbour_climatology(
+        pd.concat([neighbours for _, neighbours in chunks], ignore_index=True)
+    )
+    
+    logger.info("Retrieved %d years of historical data", len(combined_df))
+    return combined_df
+
+
+def get_historical_data(lat: float, lon: float, date_str: str, specific_years: list = None):
+    """
+    Fetches historical weather data for a specific location and date from NASA POWER API.
+    Blocking; request handlers use get_historical_data_async.
+    
+    Args:
+        lat (float): Latitude of the location (-90 to 90)
+        lon (float): Longitude of the location (-180 to 180)
+        date_str (str): Target date in YYYY-MM-DD format
+        specific_years (list, optional): List of specific years to fetch. If None, fetches all available years.
+    
+    Returns:
+        pd.DataFrame: Historical data for the specified date across all available years
+        
+    Raises:
+        ValueError: If coordinates are invalid or date format is incorrect
+        LocationRejected: If NASA POWER has no data for the location
+        UpstreamUnavailable: If every year range timed out
+        requests.exceptions.HTTPError: If API request fails
+    """
+    target_month, target_day, year_ranges_to_fetch = _plan_fetch(lat, lon, date_str, specific_years)
+    _skip_known_rejection(lat, lon, _negative_cache.get(_snap_cell(lat, lon)), year_ranges_to_fetch)
     
-    all_data = []
+    chunks = []
     
     # Loop through year ranges to fetch data in chunks
     for start_year, end_year in year_ranges_to_fetch:
-        print(f"  📥 Downloading {start_year}-{end_year}...")
-        
-        params = {
-            "parameters": PARAMETERS,
-            "community": "AG",  # Agricultural community
-            "format": "CSV",
-            "latitude": lat,
-            "longitude": lon,
-            "start": f"{start_year}0101",
-            "end": f"{end_year}1231"
-        }
+        logger.debug("Downloading %s-%s", start_year, end_year)
         
+        started = time.perf_counter()
         try:
-            response = requests.get(NASA_POWER_API_URL, params=params, timeout=30)
+            response = requests.get(NASA_POWER_API_URL, params=_chunk_params(lat, lon, start_year, end_year), timeout=30)
             response.raise_for_status()
+            CHUNK_SECONDS.labels("ok").observe(time.perf_counter() - started)
+            RESPONSE_BYTES.inc(len(response.content))
             
-            # Parse the CSV response
-            # NASA POWER API returns CSV with metadata headers, skip to actual data
-            csv_content = response.text
-            
-            # Find where the CSV data starts (after the header lines)
-            lines = csv_content.split('\n')
-            csv_start_index = 0
-            for i, line in enumerate(lines):
-                if line.startswith('YEAR,'):
-                    csv_start_index = i
-                    break
-            
-            # Read the CSV data
-            csv_data = '\n'.join(lines[csv_start_index:])
-            df_chunk = pd.read_csv(StringIO(csv_data))
-            
-            # Filter for the specific month and day
-            df_chunk['MONTH'] = df_chunk['DOY'].apply(
-                lambda doy: datetime.strptime(f"{int(df_chunk.loc[df_chunk['DOY'] == doy, 'YEAR'].iloc[0])}-{int(doy)}", "%Y-%j").month
-            )
-            df_chunk['DAY'] = df_chunk['DOY'].apply(
-                lambda doy: datetime.strptime(f"{int(df_chunk.loc[df_chunk['DOY'] == doy, 'YEAR'].iloc[0])}-{int(doy)}", "%Y-%j").day
-            )
+            # Filter for the target date (and keep the surrounding days for climatology)
+            chunks.append(_parse_chunk(response.text, target_month, target_day))
             
-            # Filter for the target date
-            filtered_data = df_chunk[(df_chunk['MONTH'] == target_month) & (df_chunk['DAY'] == target_day)]
-            all_data.append(filtered_data)
-            
-            print(f"  ✅ {start_year}-{end_year} downloaded successfully")
+            logger.debug("Downloaded %s-%s", start_year, end_year)
             
             # Be nice to the API - add a small delay between requests
             time.sleep(0.5)
             
         except requests.exceptions.Timeout:
-            print(f"  ⚠️ Timeout error for {start_year}-{end_year}. Skipping this range.")
+            CHUNK_SECONDS.labels("timeout").observe(time.perf_counter() - started)
+            logger.warning("Timeout for %s-%s, skipping this range", start_year, end_year)
             continue
         except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 400:
-                # Bad request - possibly invalid location
-                raise ValueError(
-                    f"Invalid location coordinates ({lat}, {lon}). "
-                    "The NASA POWER API could not find data for this location. "
-                    "Please try a nearby location or use broader coordinates."
-                )
-            elif e.response.status_code == 404:
-                raise ValueError(
-                    f"No data available for location ({lat}, {lon}). "
-                    "Please try a different location."
-                )
-            else:
-                print(f"  ❌ HTTP Error {e.response.status_code} for {start_year}-{end_year}: {e}")
-                raise
+            message = _rejection_message(lat, lon, e.response.status_code)
+            CHUNK_SECONDS.labels("rejected" if message else "error").observe(time.perf_counter() - started)
+            if message:
+                _remember_rejection(lat, lon, message)
+                raise LocationRejected(message)
+            logger.error("HTTP error %s for %s-%s: %s", e.response.status_code, start_year, end_year, e)
+            raise
         except Exception as e:
-            print(f"  ❌ Unexpected error for {start_year}-{end_year}: {str(e)}")
+            logger.error("Unexpected error for %s-%s: %s", start_year, end_year, e)
+            raise
+    
+    return _combine_chunks(chunks, lat, lon, date_str)
+
+
+def _request_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _request_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _request_semaphores[loop] = asyncio.Semaphore(NASA_MAX_CONCURRENT_REQUESTS)
+    return semaphore
+
+
+async def _download_chunk_async(lat: float, lon: float, start_year: int, end_year: int) -> httpx.Response:
+    """GET for one year range, retrying connection errors and 429/5xx answers (not timeouts)"""
+    for attempt in range(NASA_CHUNK_RETRIES + 1):
+        last_attempt = attempt == NASA_CHUNK_RETRIES
+        try:
+            response = await get_async_http_client().get(
+                NASA_POWER_API_URL, params=_chunk_params(lat, lon, start_year, end_year), timeout=30
+            )
+        except httpx.TimeoutException:
             raise
+        except httpx.TransportError:
+            if last_attempt:
+                raise
+            reason = "connection"
+        else:
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                response.raise_for_status()
+                return response
+            reason = str(response.status_code)
+        
+        CHUNK_RETRIES.labels(reason).inc()
+        tracing.set_attribute("retries", attempt + 1)
+        logger.info("Retrying %s-%s after %s (attempt %d)", start_year, end_year, reason, attempt + 1)
+        await asyncio.sleep(NASA_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+
+async def _fetch_chunk_async(lat: float, lon: float, start_year: int, end_year: int, target_month: int, target_day: int):
+    """Downloads and parses one year range; None if it timed out"""
+    async with _request_semaphore():
+        logger.debug("Downloading %s-%s", start_year, end_year)
+        with tracing.span("nasa.chunk", years=f"{start_year}-{end_year}") as chunk_span:
+            started = time.perf_counter()
+            try:
+                response = await _download_chunk_async(lat, lon, start_year, end_year)
+            except httpx.TimeoutException:
+                CHUNK_SECONDS.labels("timeout").observe(time.perf_counter() - started)
+                chunk_span.set_attribute("outcome", "timeout")
+                logger.warning("Timeout for %s-%s, skipping this range", start_year, end_year)
+                return None
+            except httpx.HTTPStatusError as e:
+                message = _rejection_message(lat, lon, e.response.status_code)
+                CHUNK_SECONDS.labels("rejected" if message else "error").observe(time.perf_counter() - started)
+                chunk_span.set_attribute("http.status_code", e.response.status_code)
+                if message:
+                    await _remember_rejection_async(lat, lon, message)
+                    raise LocationRejected(message)
+                logger.error("HTTP error %s for %s-%s: %s", e.response.status_code, start_year, end_year, e)
+                raise
+            except httpx.TransportError:
+                CHUNK_SECONDS.labels("error").observe(time.perf_counter() - started)
+                raise
+            CHUNK_SECONDS.labels("ok").observe(time.perf_counter() - started)
+            RESPONSE_BYTES.inc(len(response.content))
+            chunk_span.set_attribute("bytes", len(response.content))
     
-    # Combine all data chunks
-    if not all_data:
-        raise ValueError(f"No historical data found for ({lat}, {lon}) on {date_str}")
+    # CSV parsing is CPU-bound: keep it off the event loop
+    with tracing.span("nasa.parse", years=f"{start_year}-{end_year}"):
+        chunk = await asyncio.to_thread(_parse_chunk, response.text, target_month, target_day)
+    logger.debug("Downloaded %s-%s", start_year, end_year)
+    return chunk
+
+
+async def get_historical_data_async(lat: float, lon: float, date_str: str, specific_years: list = None):
+    """
+    Non-blocking get_historical_data: year ranges are downloaded concurrently
+    over the shared async HTTP client, at most NASA_MAX_CONCURRENT_REQUESTS
+    at a time per worker (across all requests).
     
-    combined_df = pd.concat(all_data, ignore_index=True)
+    Raises:
+        ValueError: Invalid coordinates/date
+        LocationRejected: Location rejected by NASA POWER
+        UpstreamUnavailable: Every year range timed out
+        httpx.HTTPStatusError: Other API errors
+    """
+    target_month, target_day, year_ranges_to_fetch = _plan_fetch(lat, lon, date_str, specific_years)
+    rejection = await _negative_cache.aget(_snap_cell(lat, lon))
+    _skip_known_rejection(lat, lon, rejection, year_ranges_to_fetch)
     
-    print(f"✅ Successfully retrieved {len(combined_df)} years of historical data")
+    tasks = [
+        asyncio.create_task(_fetch_chunk_async(lat, lon, start_year, end_year, target_month, target_day))
+        for start_year, end_year in year_ranges_to_fetch
+    ]
+    try:
+        chunks = await asyncio.gather(*tasks)
+    except BaseException:
+        # One failed range (or a cancelled request) stops the others
+        for task in tasks:
+            task.cancel()
+        raise
     
-    # Return the dataframe with all historical data for this specific date
-    return combined_df
\ No newline at end of file
+    return _combine_chunks([chunk for chunk in chunks if chunk is not None], lat, lon, date_str)
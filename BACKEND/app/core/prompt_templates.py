@@ -0,0 +1,177 @@
+"""
+Prompt Templates
+Precompiled prompts for the Gemini agents: the static preamble is prepared
+once per template and only the variable fields are interpolated per call.
+
+Rendering enforces a token budget (dropping optional sections first), every
+template has a fingerprint that changes with its text (used in cache keys),
+and prompt/response token counts are accounted per template.
+"""
+
+import os
+import math
+import hashlib
+import logging
+import threading
+from string import Formatter
+from textwrap import dedent
+from typing import Dict, Any, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2000"))
+
+# Gemini tokenizes English prose at roughly 4 characters per token; used
+# when a response carries no usage metadata
+CHARS_PER_TOKEN = 4
+
+
+class PromptBudgetExceeded(ValueError):
+    """Raised when a prompt stays over its token budget after dropping optional sections"""
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def prompt_fingerprint(text: str) -> str:
+    """Short stable hash of a prompt (or any template text)"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, Any]] = {}
+
+
+class PromptTemplate:
+    """
+    A static preamble plus a body with str.format-style fields.
+
+    Args:
+        name: Template name used in accounting
+        preamble: Instructions that never change between calls
+        body: Per-call part, e.g. "Rain: {rain:.1f}%"
+        optional: Fields that may be blanked, in this order, to fit the budget
+        budget: Token budget for the rendered prompt
+    """
+
+    def __init__(
+        self,
+        name: str,
+        preamble: str,
+        body: str,
+        optional: Sequence[str] = (),
+        budget: int = PROMPT_TOKEN_BUDGET
+    ):
+        self.name = name
+        self.preamble = dedent(preamble).strip() + "\n\n"
+        self.optional = tuple(optional)
+        self.budget = budget
+        # Parsed once: (literal text, field name, format spec, conversion)
+        self._parts = list(Formatter().parse(dedent(body).strip()))
+        self.fields = {field for _, field, _, _ in self._parts if field is not None}
+        self.fingerprint = prompt_fingerprint(self.preamble + dedent(body))
+        self.preamble_tokens = estimate_tokens(self.preamble)
+
+    def _render_body(self, fields: Dict[str, Any]) -> str:
+        out = []
+        for literal, field, spec, conversion in self._parts:
+            out.append(literal)
+            if field is None:
+                continue
+            value = fields[field]
+            if conversion == 'r':
+                value = repr(value)
+            elif conversion == 's':
+                value = str(value)
+            out.append(format(value, spec) if spec else str(value))
+        return "".join(out)
+
+    def render(self, **fields) -> str:
+        """
+        Renders the prompt within the token budget.
+
+        Raises:
+            KeyError: A template field was not given
+            PromptBudgetExceeded: Still over budget with all optional fields blanked
+        """
+        prompt = self.preamble + self._render_body(fields)
+        trimmed = []
+        for field in self.optional:
+            if estimate_tokens(prompt) <= self.budget:
+                break
+            if fields.get(field):
+                fields[field] = ""
+                trimmed.append(field)
+                prompt = self.preamble + self._render_body(fields)
+
+        tokens = estimate_tokens(prompt)
+        if trimmed:
+            logger.info("%s prompt trimmed to %d tokens (dropped %s)", self.name, tokens, ", ".join(trimmed))
+            _increment(self.name, "trimmed")
+        if tokens > self.budget:
+            _increment(self.name, "over_budget")
+            raise PromptBudgetExceeded(f"{self.name} prompt needs {tokens} tokens, budget is {self.budget}")
+        return prompt
+
+
+def _entry(name: str) -> Dict[str, Any]:
+    entry = _stats.get(name)
+    if entry is None:
+        entry = _stats[name] = {
+            "calls": 0,
+            "prompt_tokens": 0,
+            "response_tokens": 0,
+            "max_prompt_tokens": 0,
+            "trimmed": 0,
+            "over_budget": 0,
+        }
+    return entry
+
+
+def _increment(name: str, counter: str):
+    with _stats_lock:
+        _entry(name)[counter] += 1
+
+
+def _usage_counts(response) -> tuple:
+    """(prompt tokens, response tokens) from Gemini usage metadata, if present"""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return None, None
+    counts = (getattr(usage, 'prompt_token_count', None), getattr(usage, 'candidates_token_count', None))
+    return tuple(count if isinstance(count, int) and count > 0 else None for count in counts)
+
+
+def record_usage(template: PromptTemplate, prompt: str, response_text: Optional[str], response=None) -> Dict[str, int]:
+    """
+    Accounts one call's prompt and response tokens (SDK counts when available,
+    estimates otherwise).
+
+    Returns:
+        dict: prompt_tokens and response_tokens of this call
+    """
+    prompt_tokens, response_tokens = _usage_counts(response)
+    prompt_tokens = prompt_tokens or estimate_tokens(prompt)
+    response_tokens = response_tokens or estimate_tokens(response_text)
+
+    with _stats_lock:
+        entry = _entry(template.name)
+        entry["calls"] += 1
+        entry["prompt_tokens"] += prompt_tokens
+        entry["response_tokens"] += response_tokens
+        entry["max_prompt_tokens"] = max(entry["max_prompt_tokens"], prompt_tokens)
+
+    logger.debug("%s prompt: %d tokens, response: %d tokens", template.name, prompt_tokens, response_tokens)
+    return {"prompt_tokens": prompt_tokens, "response_tokens": response_tokens}
+
+
+def get_prompt_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-template token accounting, with averages"""
+    with _stats_lock:
+        snapshot = {name: dict(entry) for name, entry in _stats.items()}
+    for entry in snapshot.values():
+        calls = entry["calls"] or 1
+        entry["avg_prompt_tokens"] = round(entry["prompt_tokens"] / calls, 1)
+        entry["avg_response_tokens"] = round(entry["response_tokens"] / calls, 1)
+    return snapshot
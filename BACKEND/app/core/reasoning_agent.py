@@ -4,9 +4,79 @@ Generates human-readable weather insights and recommendations
 """
 
 import os
-from typing import Dict, Any, Optional
-import google.generativeai as genai
+import re
+import json
+import asyncio
+import logging
+from typing import Dict, Any, Optional, List
 from datetime import datetime
+from app.core import llm_backends
+from app.core.llm_client import get_llm_client
+from app.core.prompt_templates import PromptTemplate, record_usage
+
+logger = logging.getLogger(__name__)
+
+_INSIGHT_TASK = """
+Write a natural, conversational weather insight in 3-4 sentences that includes:
+1. Rain likelihood in simple terms (e.g., "unlikely to rain", "high chance of showers")
+2. Temperature description (e.g., "pleasant weather", "hot day", "cool evening")
+3. Practical recommendation for the day (clothing, activities, precautions)
+4. Specific advice for the planned activity if one is given, otherwise general activity suggestions
+5. The place name (determine it from the coordinates if none is given)
+Keep it friendly, concise, and actionable. Speak directly to the user (use "you" and "your").
+"""
+
+INSIGHT_PROMPT = PromptTemplate(
+    "insight",
+    preamble="""
+You are AI Nimbus, a friendly and knowledgeable weather assistant helping someone plan their day.
+""" + _INSIGHT_TASK + """
+If ALREADY_PASSED is True the requested date/time has already occurred: begin by clearly stating that
+(for example: 'Update: The requested time has passed. Observed conditions:') and describe observed
+outcomes in the past tense ('was', 'rained', 'had'), never as future predictions.
+If ALREADY_PASSED is False use present or future tense ('there will be showers', 'expect pleasant temperatures').
+""",
+    body="""
+**Location**: {location}
+**Date**: {month_name} {day}
+**Historical Data**: Based on {data_years} years of weather records{activity_context}{part_of_day_context}
+ALREADY_PASSED: {already_passed}
+
+**Weather Statistics:**
+- Precipitation Probability: {rain_prob:.1f}%
+- Average Rainfall: {avg_precip:.1f}mm
+- Temperature Range: {min_temp:.1f}°C to {max_temp:.1f}°C (avg: {avg_temp:.1f}°C)
+- Wind Speed: {wind_speed:.1f} m/s
+- Humidity: {humidity:.1f}%
+- Prediction Confidence: {confidence:.0%}{missing_context}
+""",
+    optional=("missing_context", "part_of_day_context", "activity_context")
+)
+
+BATCH_INSIGHT_PROMPT = PromptTemplate(
+    "insight_batch",
+    preamble="""
+You are AI Nimbus, a friendly and knowledgeable weather assistant helping someone plan several days.
+For EACH date listed below:""" + _INSIGHT_TASK + """
+When already_passed=True the date has occurred: start by saying so and use the past tense.
+Otherwise use present or future tense.
+
+**RESPOND WITH ONLY A JSON ARRAY**, one object per date, in the same order:
+[{"date": "YYYY-MM-DD", "insight": "..."}]
+""",
+    body="""
+**Location**: {location}{activity_context}{part_of_day_context}
+
+**Historical weather statistics per date:**
+{days}
+""",
+    optional=("part_of_day_context", "activity_context")
+)
+
+
+def _location_line(lat: float, lon: float, place_name: Optional[str]) -> str:
+    # Place names come from the offline gazetteer; Gemini only guesses when there is none
+    return f"{place_name} (Latitude {lat}, Longitude {lon})" if place_name else f"Latitude {lat}, Longitude {lon}"
 
 
 class ReasoningAgent:
@@ -18,19 +88,22 @@ class ReasoningAgent:
         """Initialize Gemini API with configuration"""
         self.api_key = os.getenv('GEMINI_API_KEY')
         self.model = None
+        self.model_label = 'gemini-2.0-flash'
         self.enabled = False
+        self.llm = get_llm_client()
         
-        if self.api_key:
-            try:
-                genai.configure(api_key=self.api_key)
-                self.model = genai.GenerativeModel('gemini-2.0-flash')
-                self.enabled = True
-                print("✅ Gemini AI reasoning agent initialized successfully")
-            except Exception as e:
-                print(f"⚠️ Failed to initialize Gemini: {e}")
-                print("   Running without AI reasoning")
+        try:
+            # LLM_BACKEND selects Gemini (default) or the local fake
+            self.model, self.model_label = llm_backends.create_model('gemini-2.0-flash')
+        except Exception as e:
+            logger.warning("Failed to initialize Gemini, running without AI reasoning: %s", e)
+            return
+        
+        if self.model is not None:
+            self.enabled = True
+            logger.info("Gemini AI reasoning agent initialized successfully")
         else:
-            print("⚠️ GEMINI_API_KEY not found. Running without AI reasoning")
+            logger.warning("GEMINI_API_KEY not found. Running without AI reasoning")
     
     
     def _build_prompt(
@@ -43,94 +116,69 @@ class ReasoningAgent:
         missing_data_alert: Optional[Dict[str, Any]] = None,
         activity: Optional[str] = None,
         part_of_day: Optional[str] = None,
-        already_passed: Optional[bool] = None
+        already_passed: Optional[bool] = None,
+        place_name: Optional[str] = None
     ) -> str:
         """
-        Build a comprehensive prompt for Gemini with all weather context.
-        """
+        Build the insight prompt from INSIGHT_PROMPT with all weather context.
         
-        # Extract statistics
-        rain_prob = statistics.get('precipitation_probability_percent', 0)
-        avg_precip = statistics.get('average_precipitation_mm', 0)
-        avg_temp = statistics.get('average_temperature_celsius', 0)
-        max_temp = statistics.get('max_temperature_celsius', 0)
-        min_temp = statistics.get('min_temperature_celsius', 0)
-        wind_speed = statistics.get('average_wind_speed_ms', 0)
-        humidity = statistics.get('average_humidity_percent', 0)
-        data_years = statistics.get('data_years_count', 0)
+        Raises:
+            PromptBudgetExceeded: The prompt does not fit PROMPT_TOKEN_BUDGET
+        """
         
         # Parse date for context
         try:
             date_obj = datetime.strptime(date_str, '%Y-%m-%d')
             month_name = date_obj.strftime('%B')
             day = date_obj.day
-        except:
+        except ValueError:
             month_name = "the specified month"
             day = "this day"
         
         # Build missing data context
         missing_context = ""
         if missing_data_alert:
-            severity = missing_data_alert.get('severity', 'low')
             missing_years = missing_data_alert.get('missing_years_count', 0)
             if missing_years > 0:
-                missing_context = f"\n\n⚠️ Note: This prediction is for a future date. We're missing {missing_years} years of data (confidence: {confidence_score:.0%}). The prediction is based on historical patterns, but actual conditions may vary."
+                missing_context = (
+                    f"\n\n⚠️ Note: We're missing {missing_years} recent years of data (confidence: {confidence_score:.0%}). "
+                    f"The prediction is based on historical patterns, but actual conditions may vary."
+                )
         
-        # Build activity context
         activity_context = ""
         if activity:
-            activity_context = f"\n\n**Planned Activity**: {activity.title()}\nProvide specific recommendations for this activity considering the weather conditions."
-        # Part of day context
+            activity_context = f"\n**Planned Activity**: {activity.title()} (give specific advice for it)"
         part_of_day_context = ""
         if part_of_day:
-            part_of_day_context = f"\n\n**Part of day**: {part_of_day.replace('_', ' ').title()}"
-
-        # Tense guidance: make instruction explicit and provide examples so the model reliably
-        # uses past tense when the event already occurred.
-        if already_passed:
-            tense_instruction = (
-                "ALREADY_PASSED: True. The requested date/time has already occurred. "
-                "Begin the response by clearly stating that the event has passed (for example: 'Update: The requested time has passed. Observed conditions:'). "
-                "Describe observed outcomes in the past tense (use verbs like 'was', 'rained', 'had', 'experienced'). "
-                "Do NOT phrase observations as future predictions. Keep the message concise and factual."
-            )
-        else:
-            tense_instruction = (
-                "ALREADY_PASSED: False. The requested date/time is upcoming or ongoing. "
-                "Use present or future tense when describing expected conditions (for example: 'there will be showers', 'expect pleasant temperatures')."
-            )
+            part_of_day_context = f"\n**Part of day**: {part_of_day.replace('_', ' ').title()}"
         
-        prompt = f"""You are AI Nimbus, a friendly and knowledgeable weather assistant helping someone plan their day.
-
-        **Location**: Latitude {lat}, Longitude {lon}
-        **Date**: {month_name} {day}
-        **Historical Data**: Based on {data_years} years of weather records
-        {activity_context}{part_of_day_context}
-
-        {tense_instruction}
-
-        NOTE: If ALREADY_PASSED is True, the first sentence should make that explicit and use past-tense phrasing.
-
-        **Weather Statistics:**
-        - Precipitation Probability: {rain_prob:.1f}%
-        - Average Rainfall: {avg_precip:.1f}mm
-        - Temperature Range: {min_temp:.1f}°C to {max_temp:.1f}°C (avg: {avg_temp:.1f}°C)
-        - Wind Speed: {wind_speed:.1f} m/s
-        - Humidity: {humidity:.1f}%
-        - Prediction Confidence: {confidence_score:.0%}
-        {missing_context}
-
-        **Your Task:**
-        Provide a natural, conversational weather insight in 3-4 sentences that includes:
-        1. Rain likelihood in simple terms (e.g., "unlikely to rain", "high chance of showers")
-        2. Temperature description (e.g., "pleasant weather", "hot day", "cool evening")
-        3. Practical recommendation for the day (clothing, activities, precautions)
-        4. {f"Specific advice for {activity}" if activity else "General activity suggestions"}
-        5. Mention the place name (determine it from coordinates)
-        Keep it friendly, concise, and actionable. Speak directly to the user (use "you" and "your").
-        """
-
-        return prompt
+        return INSIGHT_PROMPT.render(
+            location=_location_line(lat, lon, place_name),
+            month_name=month_name,
+            day=day,
+            data_years=statistics.get('data_years_count', 0),
+            activity_context=activity_context,
+            part_of_day_context=part_of_day_context,
+            already_passed=bool(already_passed),
+            rain_prob=statistics.get('precipitation_probability_percent', 0),
+            avg_precip=statistics.get('average_precipitation_mm', 0),
+            min_temp=statistics.get('min_temperature_celsius', 0),
+            max_temp=statistics.get('max_temperature_celsius', 0),
+            avg_temp=statistics.get('average_temperature_celsius', 0),
+            wind_speed=statistics.get('average_wind_speed_mps', 0),
+            humidity=statistics.get('average_humidity_percent', 0),
+            confidence=confidence_score,
+            missing_context=missing_context
+        )
+    
+    
+    def make_insight(self, insight_text: str) -> Dict[str, Any]:
+        """Wraps generated text in the insight structure returned to clients"""
+        return {
+            "reasoning": insight_text,
+            "generated_by": self.model_label,
+            "generated_at": datetime.utcnow().isoformat() + "Z"
+        }
     
     
     def generate_insight(
@@ -143,7 +191,8 @@ class ReasoningAgent:
         missing_data_alert: Optional[Dict[str, Any]] = None,
         activity: Optional[str] = None,
         part_of_day: Optional[str] = None,
-        already_passed: Optional[bool] = None
+        already_passed: Optional[bool] = None,
+        place_name: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Generate AI-powered weather insight using Gemini.
@@ -170,28 +219,197 @@ class ReasoningAgent:
                 missing_data_alert=missing_data_alert,
                 activity=activity,
                 part_of_day=part_of_day,
-                already_passed=already_passed
+                already_passed=already_passed,
+                place_name=place_name
             )
             
             # Generate response
-            print("🤖 Generating AI insight with Gemini...")
+            logger.debug("Generating AI insight with Gemini")
             response = self.model.generate_content(prompt)
             
             insight_text = response.text.strip()
+            record_usage(INSIGHT_PROMPT, prompt, insight_text, response)
+            
+            logger.info("AI insight generated (%d characters)", len(insight_text))
+            
+            return self.make_insight(insight_text)
+            
+        except Exception as e:
+            logger.error("Failed to generate AI insight: %s", e)
+            return None
+    
+    
+    async def generate_insight_async(
+        self,
+        lat: float,
+        lon: float,
+        date_str: str,
+        statistics: Dict[str, Any],
+        confidence_score: float,
+        missing_data_alert: Optional[Dict[str, Any]] = None,
+        activity: Optional[str] = None,
+        part_of_day: Optional[str] = None,
+        already_passed: Optional[bool] = None,
+        place_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant of generate_insight going through the shared LLM client
+        (concurrency limit, load shedding, timeout), so the event loop stays
+        free and the call can be cancelled at a deadline.
+        """
+        
+        if not self.enabled or not self.model:
+            return None
+        
+        try:
+            prompt = self._build_prompt(
+                lat=lat,
+                lon=lon,
+                date_str=date_str,
+                statistics=statistics,
+                confidence_score=confidence_score,
+                missing_data_alert=missing_data_alert,
+                activity=activity,
+                part_of_day=part_of_day,
+                already_passed=already_passed,
+                place_name=place_name
+            )
+            
+            logger.debug("Generating AI insight with Gemini (async)")
+            response = await self.llm.generate(self.model, prompt, stage="insight")
+            
+            insight_text = response.text.strip()
+            record_usage(INSIGHT_PROMPT, prompt, insight_text, response)
             
-            print(f"✅ AI insight generated ({len(insight_text)} characters)")
+            logger.info("AI insight generated (%d characters)", len(insight_text))
             
-            return {
-                "reasoning": insight_text,
-                "generated_by": "gemini-2.0-flash",
-                "generated_at": datetime.utcnow().isoformat() + "Z"
-            }
+            return self.make_insight(insight_text)
             
         except Exception as e:
-            print(f"❌ Failed to generate AI insight: {e}")
+            logger.error("Failed to generate AI insight: %s", e)
             return None
     
     
+    def _build_batch_prompt(
+        self,
+        lat: float,
+        lon: float,
+        items: List[Dict[str, Any]],
+        activity: Optional[str] = None,
+        part_of_day: Optional[str] = None,
+        place_name: Optional[str] = None
+    ) -> str:
+        """
+        Build one prompt covering several dates from BATCH_INSIGHT_PROMPT: the
+        instructions are shared, each date only contributes a compact statistics line.
+        """
+        lines = []
+        for item in items:
+            stats = item['statistics']
+            missing = (item.get('missing_data_alert') or {}).get('missing_years_count', 0)
+            lines.append(
+                f"- {item['date_str']} | already_passed={bool(item.get('already_passed'))} | "
+                f"rain {stats.get('precipitation_probability_percent', 0):.1f}% "
+                f"(avg {stats.get('average_precipitation_mm', 0):.1f}mm) | "
+                f"temp {stats.get('min_temperature_celsius', 0):.1f}-{stats.get('max_temperature_celsius', 0):.1f}°C "
+                f"(avg {stats.get('average_temperature_celsius', 0):.1f}°C) | "
+                f"wind {stats.get('average_wind_speed_mps', 0):.1f} m/s | "
+                f"humidity {stats.get('average_humidity_percent', 0):.1f}% | "
+                f"{stats.get('data_years_count', 0)} years | confidence {item['confidence_score']:.0%}"
+                + (f" | {missing} recent years missing" if missing else "")
+            )
+        
+        return BATCH_INSIGHT_PROMPT.render(
+            location=_location_line(lat, lon, place_name),
+            activity_context=f"\n**Planned Activity**: {activity.title()} (give specific advice for it)" if activity else "",
+            part_of_day_context=f"\n**Part of day**: {part_of_day.replace('_', ' ').title()}" if part_of_day else "",
+            days="\n".join(lines)
+        )
+    
+    
+    def _parse_batch_response(self, response_text: str) -> Dict[str, str]:
+        """
+        Parse a batched response into date -> insight text.
+        Returns an empty dict if no JSON array can be read.
+        """
+        cleaned = response_text.strip()
+        match = re.search(r"(\[[\s\S]*\])", cleaned)
+        if not match:
+            return {}
+        try:
+            entries = json.loads(match.group(1))
+        except ValueError:
+            return {}
+        
+        insights = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if isinstance(entry, dict) and isinstance(entry.get('insight'), str) and entry['insight'].strip():
+                insights[str(entry.get('date'))] = entry['insight'].strip()
+        return insights
+    
+    
+    async def generate_insights_batch(
+        self,
+        lat: float,
+        lon: float,
+        items: List[Dict[str, Any]],
+        activity: Optional[str] = None,
+        part_of_day: Optional[str] = None,
+        place_name: Optional[str] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Generate insights for several dates of one location with a single Gemini call.
+        
+        Args:
+            items: Dicts with date_str, statistics, confidence_score and optionally
+                   missing_data_alert and already_passed
+        
+        Returns:
+            List of insights in the order of items (None where generation failed).
+            Dates missing from the batched answer fall back to one call each.
+        """
+        if not self.enabled or not self.model or not items:
+            return [None] * len(items)
+        
+        parsed = {}
+        if len(items) > 1:
+            try:
+                prompt = self._build_batch_prompt(lat, lon, items, activity, part_of_day, place_name)
+                logger.debug("Generating %d AI insights with one Gemini call", len(items))
+                response = await self.llm.generate(self.model, prompt, stage="insight_batch")
+                record_usage(BATCH_INSIGHT_PROMPT, prompt, response.text, response)
+                parsed = self._parse_batch_response(response.text)
+                logger.info("Batched AI insights parsed for %d/%d dates", len(parsed), len(items))
+            except Exception as e:
+                logger.error("Failed to generate batched AI insights: %s", e)
+        
+        results = [
+            self.make_insight(parsed[item['date_str']]) if item['date_str'] in parsed else None
+            for item in items
+        ]
+        
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            fallbacks = await asyncio.gather(*(
+                self.generate_insight_async(
+                    lat, lon,
+                    items[index]['date_str'],
+                    items[index]['statistics'],
+                    items[index]['confidence_score'],
+                    items[index].get('missing_data_alert'),
+                    activity,
+                    part_of_day=part_of_day,
+                    already_passed=items[index].get('already_passed'),
+                    place_name=place_name
+                )
+                for index in missing
+            ))
+            for index, insight in zip(missing, fallbacks):
+                results[index] = insight
+        
+        return results
+    
+    
     def generate_insight_streaming(
         self,
         lat: float,
@@ -199,10 +417,14 @@ class ReasoningAgent:
         date_str: str,
         statistics: Dict[str, Any],
         confidence_score: float,
-        missing_data_alert: Optional[Dict[str, Any]] = None
+        missing_data_alert: Optional[Dict[str, Any]] = None,
+        activity: Optional[str] = None,
+        part_of_day: Optional[str] = None,
+        already_passed: Optional[bool] = None,
+        place_name: Optional[str] = None
     ):
         """
-        Generate AI insight with streaming response (for future use).
+        Generate AI insight with streaming response.
         Yields text chunks as they're generated.
         """
         
@@ -217,22 +439,75 @@ class ReasoningAgent:
                 date_str=date_str,
                 statistics=statistics,
                 confidence_score=confidence_score,
-                missing_data_alert=missing_data_alert
+                missing_data_alert=missing_data_alert,
+                activity=activity,
+                part_of_day=part_of_day,
+                already_passed=already_passed,
+                place_name=place_name
             )
             
-            print("🤖 Generating AI insight with streaming...")
+            logger.debug("Generating AI insight with streaming")
             
             response = self.model.generate_content(prompt, stream=True)
             
+            streamed = []
             for chunk in response:
                 if chunk.text:
+                    streamed.append(chunk.text)
                     yield chunk.text
             
-            print("✅ AI insight streaming complete")
+            record_usage(INSIGHT_PROMPT, prompt, "".join(streamed))
+            logger.info("AI insight streaming complete")
             
         except Exception as e:
-            print(f"❌ Failed to stream AI insight: {e}")
+            logger.error("Failed to stream AI insight: %s", e)
             yield None
+    
+    
+    async def generate_insight_stream_async(
+        self,
+        lat: float,
+        lon: float,
+        date_str: str,
+        statistics: Dict[str, Any],
+        confidence_score: float,
+        missing_data_alert: Optional[Dict[str, Any]] = None,
+        activity: Optional[str] = None,
+        part_of_day: Optional[str] = None,
+        already_passed: Optional[bool] = None,
+        place_name: Optional[str] = None
+    ):
+        """
+        Async streaming variant used by the /predict/stream endpoint.
+        Yields text chunks as they arrive; yields nothing if AI is disabled.
+        Errors are raised to the caller, which has already sent partial output.
+        """
+        
+        if not self.enabled or not self.model:
+            return
+        
+        prompt = self._build_prompt(
+            lat=lat,
+            lon=lon,
+            date_str=date_str,
+            statistics=statistics,
+            confidence_score=confidence_score,
+            missing_data_alert=missing_data_alert,
+            activity=activity,
+            part_of_day=part_of_day,
+            already_passed=already_passed,
+            place_name=place_name
+        )
+        
+        logger.debug("Streaming AI insight with Gemini (async)")
+        streamed = []
+        async for chunk in self.llm.stream(self.model, prompt, stage="insight_stream"):
+            if chunk.text:
+                streamed.append(chunk.text)
+                yield chunk.text
+        
+        record_usage(INSIGHT_PROMPT, prompt, "".join(streamed))
+        logger.info("AI insight streaming complete")
 
 
 # Global instance (initialized once)
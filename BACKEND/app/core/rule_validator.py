@@ -0,0 +1,142 @@
+"""
+Rule-based Statistics Validator
+Deterministic checks run before (and usually instead of) the Gemini verification:
+physical bounds, internal consistency and climatological z-scores against the
+neighbouring days of the same location.
+"""
+
+import os
+import math
+from typing import Dict, Any, List, Optional
+from app.core.statistical_engine import RAIN_THRESHOLD_MM_DAY
+
+# Physically possible ranges (same limits the verification prompt gives Gemini)
+PHYSICAL_BOUNDS = {
+    "precipitation_probability_percent": (0.0, 100.0),
+    "average_precipitation_mm": (0.0, 500.0),
+    "average_temperature_celsius": (-50.0, 60.0),
+    "max_temperature_celsius": (-50.0, 60.0),
+    "min_temperature_celsius": (-50.0, 60.0),
+    "average_wind_speed_mps": (0.0, 100.0),
+    "average_humidity_percent": (0.0, 100.0),
+}
+
+# A statistic further than this many standard deviations from its neighbouring
+# days is flagged as a climatological outlier
+Z_THRESHOLD = float(os.getenv("VERIFICATION_Z_THRESHOLD", "4"))
+
+# Lower bounds on the neighbour spread, so a very flat neighbourhood (e.g. a
+# desert with 0% rain all week) does not turn rounding noise into outliers
+STD_FLOORS = {
+    "precipitation_probability_percent": 10.0,
+    "average_precipitation_mm": 1.0,
+    "average_temperature_celsius": 1.0,
+    "max_temperature_celsius": 1.0,
+    "min_temperature_celsius": 1.0,
+    "average_wind_speed_mps": 0.5,
+    "average_humidity_percent": 3.0,
+}
+
+# Fewer neighbouring days than this give no usable spread
+MIN_CLIMATOLOGY_DAYS = 4
+
+# Statistics are rounded to 2 decimals before they reach the validator
+_TOLERANCE = 0.05
+
+
+def _number(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def validate_statistics(
+    statistics: Dict[str, Any],
+    climatology: Optional[Dict[str, Dict[str, float]]] = None
+) -> Dict[str, Any]:
+    """
+    Checks a statistics dict from statistical_engine.calculate_statistics.
+
+    Args:
+        statistics: Statistics to check
+        climatology: Optional statistical_engine.calculate_neighbour_climatology output
+
+    Returns:
+        dict: is_valid (no hard violations), needs_review (anything flagged),
+              violations (impossible or inconsistent values),
+              outliers (climatological z-score flags) and z_scores
+    """
+    violations: List[str] = []
+    outliers: List[str] = []
+    z_scores: Dict[str, float] = {}
+    values: Dict[str, float] = {}
+
+    # 1. Presence and physical bounds
+    for name, (low, high) in PHYSICAL_BOUNDS.items():
+        value = _number(statistics.get(name))
+        if value is None:
+            violations.append(f"{name} is missing or not a number")
+            continue
+        values[name] = value
+        if not low <= value <= high:
+            violations.append(f"{name}={value} outside physical range [{low}, {high}]")
+
+    # 2. Internal consistency
+    t_max = values.get("max_temperature_celsius")
+    t_min = values.get("min_temperature_celsius")
+    t_avg = values.get("average_temperature_celsius")
+    if t_max is not None and t_min is not None:
+        if t_min > t_max + _TOLERANCE:
+            violations.append(f"min temperature {t_min}°C above max temperature {t_max}°C")
+        elif t_avg is not None:
+            # The average is the mean of (max + min) / 2, so it sits at the midpoint
+            if not t_min - _TOLERANCE <= t_avg <= t_max + _TOLERANCE:
+                violations.append(f"average temperature {t_avg}°C outside [{t_min}, {t_max}]°C")
+            elif abs(t_avg - (t_max + t_min) / 2) > _TOLERANCE:
+                violations.append(f"average temperature {t_avg}°C is not the midpoint of max and min")
+
+    probability = values.get("precipitation_probability_percent")
+    precipitation = values.get("average_precipitation_mm")
+    if probability is not None and precipitation is not None:
+        # Every rainy day contributes more than the threshold to the mean
+        if precipitation + _TOLERANCE < probability / 100 * RAIN_THRESHOLD_MM_DAY:
+            violations.append(
+                f"average precipitation {precipitation} mm too low for {probability}% rain probability"
+            )
+        if probability == 0 and precipitation > RAIN_THRESHOLD_MM_DAY + _TOLERANCE:
+            violations.append(f"average precipitation {precipitation} mm with 0% rain probability")
+
+    count = statistics.get("data_years_count")
+    years_analyzed = statistics.get("years_analyzed")
+    if count is not None and years_analyzed:
+        try:
+            first_year, last_year = [int(part) for part in str(years_analyzed).split('-')]
+            if count < 1 or count > last_year - first_year + 1:
+                violations.append(f"{count} data years do not fit the span {years_analyzed}")
+        except (TypeError, ValueError):
+            violations.append(f"years_analyzed '{years_analyzed}' is not a year range")
+
+    # 3. Climatological z-scores against the neighbouring days
+    for name, reference in (climatology or {}).items():
+        value = values.get(name)
+        if value is None or name not in STD_FLOORS or reference.get("days", 0) < MIN_CLIMATOLOGY_DAYS:
+            continue
+        spread = max(reference.get("std") or 0.0, STD_FLOORS[name])
+        z = (value - reference["mean"]) / spread
+        z_scores[name] = round(z, 2)
+        if abs(z) > Z_THRESHOLD:
+            outliers.append(
+                f"{name}={value} is {z:+.1f}σ from neighbouring days (mean {reference['mean']})"
+            )
+
+    return {
+        "is_valid": not violations,
+        "needs_review": bool(violations or outliers),
+        "violations": violations,
+        "outliers": outliers,
+        "z_scores": z_scores,
+    }
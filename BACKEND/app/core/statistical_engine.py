@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from typing import Dict, Any
 
 # Define a threshold for what we consider a "rainy day" in mm/day
 # 1.0 mm/day is a common threshold.
@@ -51,4 +52,83 @@ def calculate_statistics(df: pd.DataFrame):
         "years_analyzed": f"{int(df['YEAR'].min())}-{int(df['YEAR'].max())}"
     }
     
-    return stats
\ No newline at end of file
+    return stats
+
+
+# Columns whose sums are kept as sufficient statistics (order is part of the packed cache format)
+SUFFICIENT_COLUMNS = ["WS10M", "RH2M", "T2M_MAX", "T2M_MIN", "PRECTOTCORR"]
+
+
+def compute_sufficient_statistics(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Reduces historical data to the counts and sums needed to rebuild the statistics.
+    
+    Returns:
+        dict: count, rainy_days, first_year, last_year and per-column sums
+    """
+    return {
+        "count": int(len(df)),
+        "rainy_days": int((df['PRECTOTCORR'] > RAIN_THRESHOLD_MM_DAY).sum()),
+        "first_year": int(df['YEAR'].min()),
+        "last_year": int(df['YEAR'].max()),
+        "sums": {column: float(df[column].sum()) for column in SUFFICIENT_COLUMNS},
+    }
+
+
+def statistics_from_sufficient(sufficient: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rebuilds the calculate_statistics output from sufficient statistics
+    without touching the per-year values.
+    """
+    count = sufficient["count"]
+    if count == 0:
+        return {"error": "No data available for this location/date."}
+    
+    sums = sufficient["sums"]
+    return {
+        "data_years_count": count,
+        "precipitation_probability_percent": round(sufficient["rainy_days"] / count * 100, 2),
+        "average_precipitation_mm": round(sums['PRECTOTCORR'] / count, 2),
+        "average_temperature_celsius": round((sums['T2M_MAX'] + sums['T2M_MIN']) / 2 / count, 2),
+        "max_temperature_celsius": round(sums['T2M_MAX'] / count, 2),
+        "min_temperature_celsius": round(sums['T2M_MIN'] / count, 2),
+        "average_wind_speed_mps": round(sums['WS10M'] / count, 2),
+        "average_humidity_percent": round(sums['RH2M'] / count, 2),
+        "years_analyzed": f"{sufficient['first_year']}-{sufficient['last_year']}"
+    }
+
+
+def calculate_neighbour_climatology(neighbours: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+    """
+    Summarises the days around a target day: each statistic is computed per
+    neighbouring day (across years), then reduced to its mean and spread.
+    
+    Args:
+        neighbours (pd.DataFrame): Rows of the surrounding days with an OFFSET column
+    
+    Returns:
+        dict: statistic name -> {"mean", "std", "days"}; empty if no neighbours
+    """
+    if neighbours is None or neighbours.empty:
+        return {}
+    
+    offset = neighbours['OFFSET']
+    per_day = pd.DataFrame({
+        "precipitation_probability_percent": (neighbours['PRECTOTCORR'] > RAIN_THRESHOLD_MM_DAY).groupby(offset).mean() * 100,
+        "average_precipitation_mm": neighbours['PRECTOTCORR'].groupby(offset).mean(),
+        "average_temperature_celsius": ((neighbours['T2M_MAX'] + neighbours['T2M_MIN']) / 2).groupby(offset).mean(),
+        "max_temperature_celsius": neighbours['T2M_MAX'].groupby(offset).mean(),
+        "min_temperature_celsius": neighbours['T2M_MIN'].groupby(offset).mean(),
+        "average_wind_speed_mps": neighbours['WS10M'].groupby(offset).mean(),
+        "average_humidity_percent": neighbours['RH2M'].groupby(offset).mean(),
+    })
+    
+    days = len(per_day)
+    return {
+        name: {
+            "mean": round(float(column.mean()), 3),
+            "std": round(float(column.std(ddof=1)), 3) if days > 1 else 0.0,
+            "days": days,
+        }
+        for name, column in per_day.items()
+    }
@@ -1,17 +1,67 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 from .api import routes, auth_routes
+from .services import cache_refresher, cache_warmup, popularity_log
+from .utils import metrics, tracing
+from .utils.http_client import close_async_http_client
+from .utils.compression import CompressionMiddleware
+from .utils.responses import FastJSONResponse
+from .utils.request_context import RequestContextMiddleware
+from .utils.structured_logging import configure_logging, shutdown_logging
 from dotenv import load_dotenv
+import asyncio
 import os
 
 # Load environment variables from .env file
 load_dotenv()
 
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts background jobs with the app and cancels them on shutdown.
+    """
+    background_tasks = []
+
+    # Prefetch popular entries; /ready reports 503 until this finishes
+    if os.getenv("CACHE_WARMUP_ENABLED", "true").lower() == "true":
+        background_tasks.append(asyncio.create_task(cache_warmup.warm_up_async()))
+    elif os.getenv("CACHE_WARMUP_FOLLOW_LEADER", "false").lower() == "true":
+        # Gunicorn worker that lost the leader election: ready when the leader's warm-up is done
+        cache_warmup.follow_leader()
+    else:
+        cache_warmup.mark_ready()
+    background_tasks.append(asyncio.create_task(cache_warmup.flush_popularity_periodically()))
+
+    # Worker processes publish their metrics for each other's /metrics
+    if metrics.METRICS_DIR:
+        background_tasks.append(asyncio.create_task(metrics.flush_metrics_periodically()))
+
+    # Off-peak sweep of stale cache entries (opt-in)
+    if os.getenv("CACHE_REFRESH_ENABLED", "false").lower() == "true":
+        background_tasks.append(asyncio.create_task(cache_refresher.run_scheduler()))
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    await close_async_http_client()
+    await asyncio.to_thread(popularity_log.flush)
+    await asyncio.to_thread(metrics.write_snapshot)
+    await asyncio.to_thread(tracing.flush_traces)
+    shutdown_logging()
+
+
 # Create the FastAPI app instance
 app = FastAPI(
     title="Will It Rain API",
     description="Weather prediction API with NASA data, AI insights, and Firebase Authentication",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS for Flutter frontend
@@ -23,6 +73,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli for responses above COMPRESSION_MIN_SIZE bytes
+app.add_middleware(CompressionMiddleware)
+
+# Request counts and latency by route for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Span per request and pipeline stage (Server-Timing, debug=timing, OTLP export)
+app.add_middleware(tracing.TracingMiddleware)
+
+# Request ID for log correlation (outermost, so it covers everything above)
+app.add_middleware(RequestContextMiddleware)
+
 # Include routers
 app.include_router(routes.router)
-app.include_router(auth_routes.router)
\ No newline at end of file
+app.include_router(auth_routes.router)
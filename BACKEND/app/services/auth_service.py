@@ -5,12 +5,15 @@ Supports both Email/Password and Google OAuth
 """
 
 import os
+import logging
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.services import firestore_service
 
+logger = logging.getLogger(__name__)
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -117,7 +120,7 @@ def create_user_email_password(email: str, password: str, name: str) -> Dict[str
             data={"sub": user_ref.id, "email": email, "name": name}
         )
         
-        print(f"✅ User registered: {email} (ID: {user_ref.id})")
+        logger.info("User registered", extra={"user_id": user_ref.id, "auth_provider": "email"})
         
         return {
             "user_id": user_ref.id,
@@ -128,7 +131,7 @@ def create_user_email_password(email: str, password: str, name: str) -> Dict[str
         }
         
     except Exception as e:
-        print(f"❌ User registration failed: {e}")
+        logger.error("User registration failed: %s", e)
         return {"error": str(e)}
 
 
@@ -171,7 +174,7 @@ def login_user_email_password(email: str, password: str) -> Dict[str, Any]:
             data={"sub": user_doc.id, "email": email, "name": user_data.get('name', '')}
         )
         
-        print(f"✅ User logged in: {email}")
+        logger.info("User logged in", extra={"user_id": user_doc.id, "auth_provider": "email"})
         
         return {
             "user_id": user_doc.id,
@@ -182,7 +185,7 @@ def login_user_email_password(email: str, password: str) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        print(f"❌ Login failed: {e}")
+        logger.error("Login failed: %s", e)
         return {"error": str(e)}
 
 
@@ -224,7 +227,7 @@ def login_user_google_oauth(google_id_token: str) -> Dict[str, Any]:
                 data={"sub": user_doc.id, "email": email, "name": name}
             )
             
-            print(f"✅ User logged in via Google: {email}")
+            logger.info("User logged in", extra={"user_id": user_doc.id, "auth_provider": "google"})
             
             return {
                 "user_id": user_doc.id,
@@ -252,7 +255,7 @@ def login_user_google_oauth(google_id_token: str) -> Dict[str, Any]:
                 data={"sub": user_ref.id, "email": email, "name": name}
             )
             
-            print(f"✅ User registered via Google: {email} (ID: {user_ref.id})")
+            logger.info("User registered", extra={"user_id": user_ref.id, "auth_provider": "google"})
             
             return {
                 "user_id": user_ref.id,
@@ -263,7 +266,7 @@ def login_user_google_oauth(google_id_token: str) -> Dict[str, Any]:
             }
         
     except Exception as e:
-        print(f"❌ Google OAuth login failed: {e}")
+        logger.error("Google OAuth login failed: %s", e)
         return {"error": str(e)}
 
 
@@ -323,7 +326,7 @@ def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
         
         return user_data
     except Exception as e:
-        print(f"❌ Get user by email failed: {e}")
+        logger.error("Get user by email failed: %s", e)
         return None
 
 
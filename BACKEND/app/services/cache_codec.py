@@ -0,0 +1,150 @@
+"""
+Compact binary encoding for the numeric part of cached predictions.
+
+Instead of a verbose 'statistics' map, a cache document can carry a single
+bytes field ('packed') plus 'schema_version'. Layout (little-endian, v1):
+
+    header   magic "WIR", version u8, flags u8, count u16,
+             rainy_days u16, first_year u16, last_year u16          13 bytes
+    sums     float64 x 5 (SUFFICIENT_COLUMNS order)                  40 bytes
+    years    uint16 x count                          (if FLAG_SERIES)
+    values   float32 x count, one block per SUFFICIENT_COLUMNS entry (if FLAG_SERIES)
+
+Statistics are rebuilt from the header and sums alone; the per-year arrays
+are optional (CACHE_PACK_SERIES) and only decoded when a caller asks for them.
+"""
+
+import os
+import struct
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Optional
+from app.core import statistical_engine
+from app.core.statistical_engine import SUFFICIENT_COLUMNS
+
+SCHEMA_VERSION = 1
+PACKED_FIELD = "packed"
+
+# Keep the per-year values too (about 22 bytes per year), so incremental
+# updates can append new years instead of downloading the whole history
+PACK_SERIES = os.getenv("CACHE_PACK_SERIES", "false").lower() == "true"
+
+FLAG_SERIES = 0x01
+
+_MAGIC = b"WIR"
+_HEADER = struct.Struct("<3sBBHHHH")
+_SUMS = struct.Struct(f"<{len(SUFFICIENT_COLUMNS)}d")
+_SERIES_OFFSET = _HEADER.size + _SUMS.size
+
+
+def encode(df: pd.DataFrame, include_series: Optional[bool] = None) -> bytes:
+    """
+    Packs the sufficient statistics of historical data (one row per year),
+    optionally followed by the per-year values.
+    """
+    if include_series is None:
+        include_series = PACK_SERIES
+
+    df = df.sort_values('YEAR')
+    sufficient = statistical_engine.compute_sufficient_statistics(df)
+
+    parts = [
+        _HEADER.pack(
+            _MAGIC, SCHEMA_VERSION, FLAG_SERIES if include_series else 0,
+            sufficient["count"], sufficient["rainy_days"],
+            sufficient["first_year"], sufficient["last_year"]
+        ),
+        _SUMS.pack(*(sufficient["sums"][column] for column in SUFFICIENT_COLUMNS)),
+    ]
+    if include_series:
+        parts.append(df['YEAR'].to_numpy(dtype="<u2").tobytes())
+        for column in SUFFICIENT_COLUMNS:
+            parts.append(df[column].to_numpy(dtype="<f4").tobytes())
+
+    return b"".join(parts)
+
+
+def _read_header(blob: bytes) -> tuple:
+    magic, version, flags, count, rainy_days, first_year, last_year = _HEADER.unpack_from(blob, 0)
+    if magic != _MAGIC:
+        raise ValueError("Not a packed prediction blob")
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported packed schema version: {version}")
+    return flags, count, rainy_days, first_year, last_year
+
+
+def has_series(blob: bytes) -> bool:
+    return bool(_read_header(blob)[0] & FLAG_SERIES)
+
+
+def decode_sufficient(blob: bytes) -> Dict[str, Any]:
+    """Decodes only the header and sums (no per-year arrays)"""
+    _, count, rainy_days, first_year, last_year = _read_header(blob)
+    sums = _SUMS.unpack_from(blob, _HEADER.size)
+    return {
+        "count": count,
+        "rainy_days": rainy_days,
+        "first_year": first_year,
+        "last_year": last_year,
+        "sums": dict(zip(SUFFICIENT_COLUMNS, sums)),
+    }
+
+
+def decode_statistics(blob: bytes) -> Dict[str, Any]:
+    """Rebuilds the statistics dict from a packed blob"""
+    return statistical_engine.statistics_from_sufficient(decode_sufficient(blob))
+
+
+def decode_series(blob: bytes) -> pd.DataFrame:
+    """
+    Decodes the per-year values into a DataFrame shaped like
+    nasa_data_handler.get_historical_data output (YEAR plus parameter columns).
+    """
+    flags, count = _read_header(blob)[:2]
+    if not flags & FLAG_SERIES:
+        raise ValueError("Packed blob was stored without per-year values")
+    buffer = memoryview(blob)
+    offset = _SERIES_OFFSET
+
+    columns = {"YEAR": np.frombuffer(buffer, dtype="<u2", count=count, offset=offset).astype(int)}
+    offset += count * 2
+    for column in SUFFICIENT_COLUMNS:
+        columns[column] = np.frombuffer(buffer, dtype="<f4", count=count, offset=offset).astype(float)
+        offset += count * 4
+
+    return pd.DataFrame(columns)
+
+
+class LazyPredictionDoc(dict):
+    """
+    Cached prediction document whose packed numeric fields are decoded on
+    first access. Behaves like the legacy dict layout for callers.
+    """
+
+    def __missing__(self, key):
+        if key == 'statistics' and dict.__contains__(self, PACKED_FIELD):
+            statistics = decode_statistics(dict.__getitem__(self, PACKED_FIELD))
+            self['statistics'] = statistics
+            return statistics
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        if key == 'statistics':
+            return dict.__contains__(self, key) or dict.__contains__(self, PACKED_FIELD)
+        return dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def copy(self) -> "LazyPredictionDoc":
+        return LazyPredictionDoc(self)
+
+    def series(self) -> Optional[pd.DataFrame]:
+        """Per-year values, or None if the document does not carry them"""
+        blob = dict.get(self, PACKED_FIELD)
+        if blob is None or not has_series(blob):
+            return None
+        return decode_series(blob)
@@ -0,0 +1,312 @@
+"""
+Background Cache Refresher
+Sweeps cached predictions whose month-day has passed since their last update
+and refreshes them with newly published NASA POWER years.
+
+Runs as an in-app scheduled task (CACHE_REFRESH_ENABLED=true) or standalone:
+    python -m app.services.cache_refresher --ignore-offpeak
+"""
+
+import os
+import time
+import asyncio
+import logging
+import argparse
+import threading
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from app.core import nasa_data_handler, statistical_engine
+from app.services import firestore_service
+from app.utils.structured_logging import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIGURATION ---
+# Off-peak window in UTC hours, "start-end" (end exclusive, may wrap midnight)
+OFFPEAK_HOURS = os.getenv("CACHE_REFRESH_OFFPEAK_HOURS", "2-6")
+BATCH_SIZE = int(os.getenv("CACHE_REFRESH_BATCH_SIZE", "10"))
+BATCH_PAUSE_SECONDS = float(os.getenv("CACHE_REFRESH_BATCH_PAUSE_SECONDS", "30"))
+MAX_ENTRIES_PER_CYCLE = int(os.getenv("CACHE_REFRESH_MAX_ENTRIES", "200"))
+SCHEDULE_INTERVAL_SECONDS = int(os.getenv("CACHE_REFRESH_INTERVAL_SECONDS", "3600"))
+
+# Entries refreshed after their month-day passed are retried only after this long,
+# so days NASA has not published yet are not re-fetched on every cycle
+RETRY_AFTER = timedelta(days=int(os.getenv("CACHE_REFRESH_RETRY_DAYS", "7")))
+
+_cycle_lock = threading.Lock()
+_metrics_lock = threading.Lock()
+_metrics: Dict[str, Any] = {
+    "status": "idle",
+    "cycles_completed": 0,
+    "last_cycle_started": None,
+    "last_cycle_finished": None,
+    "last_cycle_seconds": None,
+    "scanned": 0,
+    "stale_found": 0,
+    "processed": 0,
+    "refreshed": 0,
+    "unchanged": 0,
+    "failed": 0,
+    "entries_per_second": 0.0,
+    "last_error": None,
+    "total_refreshed": 0,
+    "total_failed": 0,
+}
+
+
+def _update_metrics(**values):
+    with _metrics_lock:
+        _metrics.update(values)
+
+
+def _increment_metric(name: str, amount: int = 1):
+    with _metrics_lock:
+        _metrics[name] += amount
+
+
+def get_refresh_metrics() -> Dict[str, Any]:
+    """Returns a snapshot of the refresher's progress, throughput and error metrics"""
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+def is_off_peak(now: Optional[datetime] = None) -> bool:
+    """
+    Checks whether the current UTC hour falls inside the off-peak window.
+    """
+    now = now or datetime.utcnow()
+    start, end = [int(part) for part in OFFPEAK_HOURS.split('-')]
+
+    if start <= end:
+        return start <= now.hour < end
+    # Window wraps midnight, e.g. "22-4"
+    return now.hour >= start or now.hour < end
+
+
+def _last_occurrence(month: int, day: int, now: datetime) -> Optional[datetime]:
+    """
+    Returns the most recent past occurrence of a month-day (handles 02-29).
+    """
+    for year in range(now.year, now.year - 5, -1):
+        try:
+            occurrence = datetime(year, month, day)
+        except ValueError:
+            continue
+        if occurrence < now:
+            return occurrence
+    return None
+
+
+def find_stale_entries(now: Optional[datetime] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Scans cache metadata and returns entries that may have new NASA years available.
+
+    An entry is stale when a year newer than 'latest_available_year' has already
+    passed its month-day, and either that month-day passed after 'last_updated'
+    or the last attempt is older than the retry interval.
+
+    Args:
+        now (datetime, optional): Reference time (UTC), defaults to utcnow
+        limit (int, optional): Stop after this many stale entries
+
+    Returns:
+        list: Dicts with cache_key, lat, lon, date and years_to_fetch
+    """
+    now = now or datetime.utcnow()
+    stale = []
+    scanned = 0
+
+    for cache_key, data in firestore_service.stream_cache_metadata():
+        scanned += 1
+        try:
+            month, day = [int(part) for part in data['target_date'].split('-')]
+            occurrence = _last_occurrence(month, day, now)
+            if occurrence is None:
+                continue
+
+            date_str = occurrence.strftime("%Y-%m-%d")
+            needs_update, years_to_fetch = firestore_service.should_update_cache(data, date_str)
+            if not needs_update:
+                continue
+
+            last_updated = datetime.fromisoformat(data['metadata']['last_updated'])
+            if last_updated >= occurrence and now - last_updated < RETRY_AFTER:
+                continue
+
+            stale.append({
+                "cache_key": cache_key,
+                "lat": data['location']['lat'],
+                "lon": data['location']['lon'],
+                "date": date_str,
+                "years_to_fetch": years_to_fetch,
+            })
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("Skipping malformed cache entry %s: %s", cache_key, e)
+            continue
+
+        if limit is not None and len(stale) >= limit:
+            break
+
+    _update_metrics(scanned=scanned, stale_found=len(stale))
+    return stale
+
+
+def refresh_entry(entry: Dict[str, Any]) -> bool:
+    """
+    Re-fetches the history for a stale entry, including the newly passed years,
+    and rewrites its statistics and metadata.
+
+    Returns:
+        bool: True if the entry gained new years, False if NASA had nothing new
+    """
+    lat, lon, date_str = entry['lat'], entry['lon'], entry['date']
+    latest_cached_year = min(entry['years_to_fetch']) - 1
+
+    history = nasa_data_handler.get_historical_data(lat, lon, date_str)
+    new_years = nasa_data_handler.get_historical_data(
+        lat, lon, date_str, specific_years=entry['years_to_fetch']
+    )
+    combined = pd.concat([history, new_years], ignore_index=True).drop_duplicates(subset='YEAR', keep='last')
+
+    statistics = statistical_engine.calculate_statistics(combined)
+    if "error" in statistics:
+        raise ValueError(statistics["error"])
+
+    latest_year, missing_years, confidence_score = firestore_service.compute_cache_metadata(statistics, date_str)
+
+    firestore_service.update_cache_with_new_data(
+        lat, lon, date_str,
+        statistics,
+        statistics['years_analyzed'],
+        statistics['data_years_count'],
+        latest_year,
+        missing_years,
+        confidence_score,
+        historical_data=combined
+    )
+
+    return latest_year > latest_cached_year
+
+
+def run_refresh_cycle(
+    batch_size: int = BATCH_SIZE,
+    batch_pause: float = BATCH_PAUSE_SECONDS,
+    max_entries: int = MAX_ENTRIES_PER_CYCLE,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Finds stale entries and refreshes them in rate-limited batches.
+
+    Args:
+        batch_size (int): Entries refreshed back to back before pausing
+        batch_pause (float): Seconds to wait between batches (upstream rate limit)
+        max_entries (int): Upper bound on entries refreshed in this cycle
+        dry_run (bool): Only report stale entries, do not refresh them
+
+    Returns:
+        dict: Metrics snapshot at the end of the cycle
+    """
+    if not _cycle_lock.acquire(blocking=False):
+        logger.info("Cache refresh already running, skipping this cycle")
+        return get_refresh_metrics()
+
+    started = time.monotonic()
+    try:
+        _update_metrics(
+            status="scanning",
+            last_cycle_started=datetime.utcnow().isoformat(),
+            scanned=0, stale_found=0, processed=0,
+            refreshed=0, unchanged=0, failed=0,
+            entries_per_second=0.0, last_error=None,
+        )
+
+        stale = find_stale_entries(limit=max_entries)
+        logger.info("Cache refresh: %d stale entries found", len(stale))
+
+        if not dry_run:
+            _update_metrics(status="refreshing")
+            for index, entry in enumerate(stale):
+                if index and index % batch_size == 0:
+                    time.sleep(batch_pause)
+
+                try:
+                    if refresh_entry(entry):
+                        _increment_metric("refreshed")
+                        _increment_metric("total_refreshed")
+                    else:
+                        _increment_metric("unchanged")
+                except Exception as e:
+                    logger.warning("Cache refresh failed for %s: %s", entry['cache_key'], e)
+                    _increment_metric("failed")
+                    _increment_metric("total_failed")
+                    _update_metrics(last_error=f"{entry['cache_key']}: {e}")
+
+                _increment_metric("processed")
+                elapsed = time.monotonic() - started
+                _update_metrics(entries_per_second=round((index + 1) / elapsed, 3) if elapsed else 0.0)
+    finally:
+        elapsed = time.monotonic() - started
+        _update_metrics(
+            status="idle",
+            last_cycle_finished=datetime.utcnow().isoformat(),
+            last_cycle_seconds=round(elapsed, 2),
+        )
+        _increment_metric("cycles_completed")
+        _cycle_lock.release()
+
+    metrics = get_refresh_metrics()
+    logger.info(
+        "Cache refresh cycle done: %s refreshed, %s unchanged, %s failed in %ss",
+        metrics['refreshed'], metrics['unchanged'], metrics['failed'], metrics['last_cycle_seconds']
+    )
+    return metrics
+
+
+async def run_scheduler(interval_seconds: int = SCHEDULE_INTERVAL_SECONDS):
+    """
+    In-app scheduled task: runs a refresh cycle every interval during off-peak hours.
+    The cycle itself is blocking, so it runs in a worker thread.
+    """
+    logger.info("Cache refresher scheduled every %ss (off-peak UTC hours %s)", interval_seconds, OFFPEAK_HOURS)
+    while True:
+        if is_off_peak():
+            try:
+                await asyncio.to_thread(run_refresh_cycle)
+            except Exception as e:
+                logger.error("Scheduled cache refresh failed: %s", e)
+                _update_metrics(last_error=str(e))
+        await asyncio.sleep(interval_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh stale cached predictions with new NASA years")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--batch-pause", type=float, default=BATCH_PAUSE_SECONDS)
+    parser.add_argument("--max-entries", type=int, default=MAX_ENTRIES_PER_CYCLE)
+    parser.add_argument("--dry-run", action="store_true", help="Only list stale entries")
+    parser.add_argument("--ignore-offpeak", action="store_true", help="Run even outside the off-peak window")
+    args = parser.parse_args()
+    configure_logging(fmt="text")
+
+    if not args.ignore_offpeak and not is_off_peak():
+        print(f"⏸️ Outside off-peak hours ({OFFPEAK_HOURS} UTC). Use --ignore-offpeak to run anyway.")
+        return
+
+    if firestore_service.get_db() is None:
+        print("❌ Firestore is not configured, nothing to refresh")
+        return
+
+    metrics = run_refresh_cycle(
+        batch_size=args.batch_size,
+        batch_pause=args.batch_pause,
+        max_entries=args.max_entries,
+        dry_run=args.dry_run,
+    )
+    print(metrics)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
@@ -0,0 +1,190 @@
+"""
+Cache Warm-up
+Prefetches the most popular (snapped location, month-day) entries into the
+in-process and Firestore caches so the first requests after a deploy are hits.
+
+Runs at startup (CACHE_WARMUP_ENABLED, default on) or standalone:
+    python -m app.services.cache_warmup --top-n 50
+"""
+
+import os
+import time
+import asyncio
+import logging
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+from app.core import nasa_data_handler, statistical_engine
+from app.services import firestore_service, popularity_log
+from app.utils.structured_logging import configure_logging
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TOP_N = int(os.getenv("CACHE_WARMUP_TOP_N", "20"))
+WARMUP_CONCURRENCY = int(os.getenv("CACHE_WARMUP_CONCURRENCY", "4"))
+# Marker file the warm-up leader creates when done, so the other workers of the host
+# report ready only then (set by gunicorn.conf.py; empty = single process)
+WARMUP_READY_PATH = os.getenv("WARMUP_READY_PATH", "")
+
+_ready = threading.Event()
+_follows_leader = False
+_status_lock = threading.Lock()
+_warmup_status: Dict[str, Any] = {
+    "ready": False,
+    "requested": 0,
+    "from_cache": 0,
+    "fetched": 0,
+    "failed": 0,
+    "seconds": None,
+}
+
+
+def is_ready() -> bool:
+    """True once startup warm-up has finished (or was skipped), in this worker or the leader"""
+    if not _ready.is_set() and _follows_leader and os.path.exists(WARMUP_READY_PATH):
+        _set_ready()
+    return _ready.is_set()
+
+
+def _set_ready():
+    _warmup_status["ready"] = True
+    _ready.set()
+
+
+def mark_ready():
+    """Flips the readiness flag and, when warm-up is shared, publishes it to the other workers"""
+    _set_ready()
+    if WARMUP_READY_PATH:
+        try:
+            with open(WARMUP_READY_PATH, "a"):
+                pass
+        except OSError as e:
+            logger.warning("Could not publish warm-up completion to %s: %s", WARMUP_READY_PATH, e)
+
+
+def follow_leader():
+    """
+    For workers that skip warm-up because another worker runs it: stay not
+    ready until the leader has created WARMUP_READY_PATH.
+    """
+    global _follows_leader
+    if not WARMUP_READY_PATH:
+        mark_ready()
+        return
+    _follows_leader = True
+
+
+def get_warmup_status() -> Dict[str, Any]:
+    return dict(_warmup_status)
+
+
+def _date_for_month_day(month_day: str) -> str:
+    """Builds a YYYY-MM-DD date for a month-day (leap-day entries use the last leap year)"""
+    month, day = [int(part) for part in month_day.split('-')]
+    year = datetime.utcnow().year
+    while True:
+        try:
+            return datetime(year, month, day).strftime("%Y-%m-%d")
+        except ValueError:
+            year -= 1
+
+
+def warm_entry(entry: Dict[str, Any]) -> str:
+    """
+    Makes sure one popular entry is cached.
+
+    Returns:
+        str: "cache" if it was already in Firestore (now also in memory),
+             "fetched" if it was computed from NASA data
+    """
+    lat, lon = entry['lat'], entry['lon']
+    date_str = _date_for_month_day(entry['month_day'])
+
+    if firestore_service.get_prediction_from_cache(lat, lon, date_str) is not None:
+        return "cache"
+
+    historical_data = nasa_data_handler.get_historical_data(lat, lon, date_str)
+    statistics = statistical_engine.calculate_statistics(historical_data)
+    if "error" in statistics:
+        raise ValueError(statistics["error"])
+
+    latest_year, missing_years, confidence_score = firestore_service.compute_cache_metadata(statistics, date_str)
+
+    # AI stages are left to the first real request (they depend on activity and tense)
+    firestore_service.save_prediction_to_cache(
+        lat, lon, date_str,
+        statistics,
+        statistics['years_analyzed'],
+        statistics['data_years_count'],
+        latest_year,
+        missing_years,
+        confidence_score,
+        historical_data=historical_data
+    )
+    return "fetched"
+
+
+def warm_up(top_n: int = WARMUP_TOP_N, concurrency: int = WARMUP_CONCURRENCY) -> Dict[str, Any]:
+    """
+    Prefetches the top-N popular entries concurrently, then flips the readiness flag.
+    """
+    started = time.monotonic()
+    entries = popularity_log.top_entries(top_n)
+    _warmup_status.update(requested=len(entries), from_cache=0, fetched=0, failed=0)
+    logger.info("Cache warm-up: prefetching %d popular entries (concurrency %d)", len(entries), concurrency)
+
+    def _warm(entry):
+        try:
+            result = warm_entry(entry)
+            key = "from_cache" if result == "cache" else "fetched"
+        except Exception as e:
+            logger.warning("Warm-up failed for %s: %s", entry['cache_key'], e)
+            key = "failed"
+        with _status_lock:
+            _warmup_status[key] += 1
+
+    try:
+        if entries:
+            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+                list(pool.map(_warm, entries))
+    finally:
+        _warmup_status["seconds"] = round(time.monotonic() - started, 2)
+        mark_ready()
+
+    logger.info(
+        "Cache warm-up done in %ss: %s from cache, %s fetched, %s failed",
+        _warmup_status['seconds'], _warmup_status['from_cache'], _warmup_status['fetched'], _warmup_status['failed']
+    )
+    return get_warmup_status()
+
+
+async def warm_up_async(top_n: int = WARMUP_TOP_N, concurrency: int = WARMUP_CONCURRENCY) -> Dict[str, Any]:
+    """Runs warm-up in a worker thread so the event loop keeps serving health checks"""
+    return await asyncio.to_thread(warm_up, top_n, concurrency)
+
+
+async def flush_popularity_periodically(interval_seconds: int = 60):
+    """Background task persisting the popularity log"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(popularity_log.flush)
+        except Exception as e:
+            logger.warning("Popularity log flush failed: %s", e)
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Prefetch the most popular predictions into the cache")
+    parser.add_argument("--top-n", type=int, default=WARMUP_TOP_N)
+    parser.add_argument("--concurrency", type=int, default=WARMUP_CONCURRENCY)
+    args = parser.parse_args(argv)
+    configure_logging(fmt="text")
+    print(warm_up(top_n=args.top_n, concurrency=args.concurrency))
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
@@ -3,19 +3,46 @@ Current Weather Service
 Fetches real-time weather data from NASA POWER API
 """
 
+import logging
 import requests
+import httpx
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
+from app.utils.http_client import get_async_http_client
+
+logger = logging.getLogger(__name__)
 
 class CurrentWeatherService:
     """Service to fetch current weather conditions"""
     
     BASE_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
     
+    @staticmethod
+    def _date_window() -> tuple:
+        """(now, yesterday as YYYYMMDD, today as YYYYMMDD)"""
+        # Use safe date arithmetic to get yesterday and today
+        today = datetime.utcnow()
+        yesterday = today - timedelta(days=1)
+        return today, yesterday.strftime("%Y%m%d"), today.strftime("%Y%m%d")
+    
+    @staticmethod
+    def _params(lat: float, lon: float, start_date: str, end_date: str) -> Dict[str, Any]:
+        # NASA POWER API parameters for current conditions
+        return {
+            "parameters": "T2M,PRECTOTCORR,QV2M,WS2M,CLOUD_AMT,PS",
+            "community": "RE",
+            "longitude": lon,
+            "latitude": lat,
+            "start": start_date,
+            "end": end_date,
+            "format": "JSON"
+        }
+    
     @staticmethod
     def get_current_weather(lat: float, lon: float) -> Dict[str, Any]:
         """
-        Fetch current weather conditions for a location
+        Fetch current weather conditions for a location (blocking; request
+        handlers use get_current_weather_async)
         
         Args:
             lat: Latitude
@@ -25,99 +52,108 @@ class CurrentWeatherService:
             Dictionary with current weather data
         """
         try:
-            # Use safe date arithmetic to get yesterday and today
-            today = datetime.utcnow()
-            yesterday = today - timedelta(days=1)
-
-            start_date = yesterday.strftime("%Y%m%d")
-            end_date = today.strftime("%Y%m%d")
-            
-            # NASA POWER API parameters for current conditions
-            params = {
-                "parameters": "T2M,PRECTOTCORR,QV2M,WS2M,CLOUD_AMT,PS",
-                "community": "RE",
-                "longitude": lon,
-                "latitude": lat,
-                "start": start_date,
-                "end": end_date,
-                "format": "JSON"
-            }
+            today, start_date, end_date = CurrentWeatherService._date_window()
+            params = CurrentWeatherService._params(lat, lon, start_date, end_date)
             
             response = requests.get(CurrentWeatherService.BASE_URL, params=params, timeout=10)
             response.raise_for_status()
             
-            data = response.json()
-            
-            # Extract latest day's data
-            properties = data.get("properties", {}).get("parameter", {})
+            return CurrentWeatherService._parse(response.json(), lat, lon, today, end_date)
             
-            # Get most recent data point
-            temp_data = properties.get("T2M", {})
-            precip_data = properties.get("PRECTOTCORR", {})
-            humidity_data = properties.get("QV2M", {})
-            wind_data = properties.get("WS2M", {})
-            cloud_data = properties.get("CLOUD_AMT", {})
-            pressure_data = properties.get("PS", {})
-            
-            # Get latest values (may be missing). Use dict.get safely.
-            latest_date = end_date
-
-            def _safe_get(d, key):
-                try:
-                    return d.get(key)
-                except Exception:
-                    return None
-
-            temperature = _safe_get(temp_data, latest_date)
-            precipitation = _safe_get(precip_data, latest_date)
-            humidity = _safe_get(humidity_data, latest_date)
-            wind_speed = _safe_get(wind_data, latest_date)
-            cloud_cover = _safe_get(cloud_data, latest_date)
-            pressure = _safe_get(pressure_data, latest_date)
-
-            # If NASA returns sentinel values like -999 (or other unrealistic numbers), treat as missing
-            def _is_unrealistic(v):
-                if v is None:
-                    return True
-                try:
-                    num = float(v)
-                    # Anything below -500 is almost certainly a sentinel/error
-                    return num <= -500
-                except Exception:
-                    return True
-
-            if any(_is_unrealistic(x) for x in [temperature, precipitation, humidity, wind_speed, cloud_cover, pressure]):
-                print("⚠️ CurrentWeatherService: API returned missing/unrealistic values, falling back to local defaults")
-                return CurrentWeatherService._get_fallback_data(lat, lon)
+        except requests.exceptions.RequestException as e:
+            logger.warning("Error fetching current weather: %s", e)
+            # Return fallback data
+            return CurrentWeatherService._get_fallback_data(lat, lon)
+        except Exception as e:
+            logger.error("Unexpected error in current weather: %s", e)
+            return CurrentWeatherService._get_fallback_data(lat, lon)
+    
+    @staticmethod
+    async def get_current_weather_async(lat: float, lon: float) -> Dict[str, Any]:
+        """Non-blocking get_current_weather over the shared async HTTP client"""
+        try:
+            today, start_date, end_date = CurrentWeatherService._date_window()
+            params = CurrentWeatherService._params(lat, lon, start_date, end_date)
             
-            # Determine weather condition
-            condition = CurrentWeatherService._determine_condition(
-                precipitation, cloud_cover, temperature
-            )
+            response = await get_async_http_client().get(CurrentWeatherService.BASE_URL, params=params, timeout=10)
+            response.raise_for_status()
             
-            return {
-                "location": {"lat": lat, "lon": lon},
-                "timestamp": today.isoformat(),
-                "temperature": {
-                    "celsius": round(float(temperature), 1),
-                    "fahrenheit": round((float(temperature) * 9/5) + 32, 1)
-                },
-                "condition": condition,
-                "precipitation": round(float(precipitation), 2),
-                "humidity": round(float(humidity), 1),
-                "wind_speed": round(float(wind_speed), 1),
-                "cloud_cover": round(float(cloud_cover), 1),
-                "pressure": round(float(pressure), 1),
-                "description": CurrentWeatherService._get_description(condition)
-            }
+            return CurrentWeatherService._parse(response.json(), lat, lon, today, end_date)
             
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching current weather: {e}")
+        except httpx.HTTPError as e:
+            logger.warning("Error fetching current weather: %s", e)
             # Return fallback data
             return CurrentWeatherService._get_fallback_data(lat, lon)
         except Exception as e:
-            print(f"Unexpected error in current weather: {e}")
+            logger.error("Unexpected error in current weather: %s", e)
+            return CurrentWeatherService._get_fallback_data(lat, lon)
+    
+    @staticmethod
+    def _parse(data: Dict[str, Any], lat: float, lon: float, today: datetime, end_date: str) -> Dict[str, Any]:
+        """Builds the response from a NASA POWER JSON payload (fallback data if values are missing)"""
+        # Extract latest day's data
+        properties = data.get("properties", {}).get("parameter", {})
+
+        # Get most recent data point
+        temp_data = properties.get("T2M", {})
+        precip_data = properties.get("PRECTOTCORR", {})
+        humidity_data = properties.get("QV2M", {})
+        wind_data = properties.get("WS2M", {})
+        cloud_data = properties.get("CLOUD_AMT", {})
+        pressure_data = properties.get("PS", {})
+
+        # Get latest values (may be missing). Use dict.get safely.
+        latest_date = end_date
+
+        def _safe_get(d, key):
+            try:
+                return d.get(key)
+            except Exception:
+                return None
+
+        temperature = _safe_get(temp_data, latest_date)
+        precipitation = _safe_get(precip_data, latest_date)
+        humidity = _safe_get(humidity_data, latest_date)
+        wind_speed = _safe_get(wind_data, latest_date)
+        cloud_cover = _safe_get(cloud_data, latest_date)
+        pressure = _safe_get(pressure_data, latest_date)
+
+        # If NASA returns sentinel values like -999 (or other unrealistic numbers), treat as missing
+        def _is_unrealistic(v):
+            if v is None:
+                return True
+            try:
+                num = float(v)
+                # Anything below -500 is almost certainly a sentinel/error
+                return num <= -500
+            except Exception:
+                return True
+
+        if any(_is_unrealistic(x) for x in [temperature, precipitation, humidity, wind_speed, cloud_cover, pressure]):
+            logger.warning("API returned missing/unrealistic values, falling back to local defaults")
             return CurrentWeatherService._get_fallback_data(lat, lon)
+
+        # Determine weather condition
+        condition = CurrentWeatherService._determine_condition(
+            precipitation, cloud_cover, temperature
+        )
+
+        return {
+            "location": {"lat": lat, "lon": lon},
+            "timestamp": today.isoformat(),
+            "temperature": {
+                "celsius": round(float(temperature), 1),
+                "fahrenheit": round((float(temperature) * 9/5) + 32, 1)
+            },
+            "condition": condition,
+            "precipitation": round(float(precipitation), 2),
+            "humidity": round(float(humidity), 1),
+            "wind_speed": round(float(wind_speed), 1),
+            "cloud_cover": round(float(cloud_cover), 1),
+            "pressure": round(float(pressure), 1),
+            "description": CurrentWeatherService._get_description(condition)
+        }
+
     
     @staticmethod
     def _determine_condition(precipitation: float, cloud_cover: float, temperature: float) -> str:
@@ -1,14 +1,46 @@
 import os
 import json
+import time
+import asyncio
+import logging
+import weakref
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator, Tuple
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
+from app.utils.shared_cache import tiered_cache
+from app.services import cache_codec
+from app.utils import metrics, tracing
+from app.utils.structured_logging import SAMPLED
+
+logger = logging.getLogger(__name__)
 
 # Initialize Firebase Admin (only once)
 _firebase_initialized = False
 _db = None
 
+# Async clients (grpc.aio channels are bound to the loop that created them)
+_async_dbs: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+# In-process cache in front of Firestore (also the only cache when Firestore is not configured),
+# shared between worker processes when SHARED_CACHE_PATH is set
+_memory_cache = tiered_cache(
+    'predictions',
+    maxsize=int(os.getenv('PREDICTION_MEMORY_CACHE_SIZE', '1024')),
+    ttl_seconds=float(os.getenv('PREDICTION_MEMORY_CACHE_TTL_SECONDS', '21600'))
+)
+
+CACHE_LOOKUP_SECONDS = metrics.histogram(
+    "cache_lookup_duration_seconds", "Prediction cache lookups by the tier that answered",
+    ["source"], buckets=metrics.FAST_BUCKETS + (2.5, 5.0)
+)
+CACHE_WRITE_SECONDS = metrics.histogram(
+    "cache_write_duration_seconds", "Prediction cache writes to Firestore", ["operation", "outcome"]
+)
+
+# Store the numeric part of new cache documents as a packed bytes field
+COMPACT_ENCODING = os.getenv('CACHE_COMPACT_ENCODING', 'true').lower() == 'true'
+
 
 def initialize_firebase():
     """
@@ -27,7 +59,7 @@ def initialize_firebase():
             firebase_admin.get_app()
             _db = firestore.client()
             _firebase_initialized = True
-            print("✅ Firebase already initialized, reusing connection")
+            logger.info("Firebase already initialized, reusing connection")
             return _db
         except ValueError:
             # App doesn't exist yet, initialize it
@@ -60,24 +92,20 @@ def initialize_firebase():
             firebase_admin.initialize_app(cred)
             _db = firestore.client()
             _firebase_initialized = True
-            print(f"✅ Firebase initialized successfully with credentials from: {credentials_file}")
+            logger.info("Firebase initialized with credentials from %s", credentials_file)
             return _db
         else:
             # Credentials path set but file doesn't exist in any location
-            print(f"⚠️ Firebase credentials file not found. Tried:")
-            for path in possible_paths:
-                if path:
-                    print(f"   - {path}")
-            print(f"   To enable caching:")
-            print(f"   1. Create Firebase project at https://console.firebase.google.com/")
-            print(f"   2. Download service account JSON")
-            print(f"   3. Save as one of the paths above")
-            print(f"   Running without caching (direct API mode)")
+            logger.warning(
+                "Firebase credentials file not found (tried %s); running without caching (direct API mode). "
+                "To enable caching, download a service account JSON from https://console.firebase.google.com/ "
+                "and save it at one of these paths",
+                ", ".join(path for path in possible_paths if path)
+            )
             return None
         
     except Exception as e:
-        print(f"⚠️ Firebase initialization failed: {e}")
-        print("   Running without caching (direct API mode)")
+        logger.warning("Firebase initialization failed, running without caching (direct API mode): %s", e)
         return None
 
 
@@ -89,6 +117,17 @@ def get_db():
     return _db
 
 
+def get_async_db():
+    """Async Firestore client for the running event loop, or None if Firestore is not configured"""
+    if get_db() is None:
+        return None
+    loop = asyncio.get_running_loop()
+    client = _async_dbs.get(loop)
+    if client is None:
+        client = _async_dbs[loop] = firestore_async.client()
+    return client
+
+
 def generate_cache_key(lat: float, lon: float, month: int, day: int) -> str:
     """
     Generates a unique cache key for a location and date.
@@ -105,6 +144,43 @@ def extract_month_day(date_str: str) -> tuple:
     return date_obj.month, date_obj.day
 
 
+def _apply_updates(cached: Dict[str, Any], updates: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Applies a Firestore-style update (dotted field paths) to a copy of a cached entry.
+    Entries are replaced rather than mutated so readers never see a partial update.
+    """
+    updated = cached.copy()
+    for path, value in updates.items():
+        if value is firestore.DELETE_FIELD:
+            updated.pop(path, None)
+            continue
+        if '.' in path:
+            parent, field = path.split('.', 1)
+            updated[parent] = {**updated.get(parent, {}), field: value}
+        else:
+            updated[path] = value
+    return updated
+
+
+def _update_memory_entry(cache_key: str, updates: Dict[str, Any]):
+    """Applies a Firestore-style update to the in-process copy, if there is one"""
+    cached = _memory_cache.get(cache_key)
+    if cached is not None:
+        _memory_cache.set(cache_key, _apply_updates(cached, updates))
+
+
+async def _update_memory_entry_async(cache_key: str, updates: Dict[str, Any]):
+    """_update_memory_entry for the event loop (the shared cache tier is used from a thread)"""
+    cached = await _memory_cache.aget(cache_key)
+    if cached is not None:
+        await _memory_cache.aset(cache_key, _apply_updates(cached, updates))
+
+
+def get_memory_cache_stats() -> Dict[str, Any]:
+    """Returns hit/miss/size counters of the in-process prediction cache"""
+    return _memory_cache.stats()
+
+
 def get_prediction_from_cache(lat: float, lon: float, date_str: str) -> Optional[Dict[str, Any]]:
     """
     Retrieves a cached prediction from Firestore.
@@ -117,31 +193,125 @@ def get_prediction_from_cache(lat: float, lon: float, date_str: str) -> Optional
     Returns:
         Dict with cached data or None if not found
     """
-    db = get_db()
-    if db is None:
-        return None
-    
     try:
-        month, day = extract_month_day(date_str)
-        cache_key = generate_cache_key(lat, lon, month, day)
-        
-        # Query Firestore
-        doc_ref = db.collection('weather_predictions').document(cache_key)
-        doc = doc_ref.get()
+        cache_key = _cache_key_for(lat, lon, date_str)
         
-        if doc.exists:
-            data = doc.to_dict()
-            print(f"🎯 Cache HIT for {cache_key}")
+        # In-process cache first
+        data = _memory_cache.get(cache_key)
+        if data is not None:
+            logger.info("Memory cache hit %s", cache_key, extra=SAMPLED)
             return data
-        else:
-            print(f"❌ Cache MISS for {cache_key}")
+        
+        db = get_db()
+        if db is None:
             return None
+        
+        # Query Firestore
+        doc = db.collection('weather_predictions').document(cache_key).get()
+        return _remember_document(cache_key, doc)
             
     except Exception as e:
-        print(f"⚠️ Error reading from cache: {e}")
+        logger.warning("Error reading from cache: %s", e)
         return None
 
 
+async def get_prediction_from_cache_async(lat: float, lon: float, date_str: str) -> Optional[Dict[str, Any]]:
+    """
+    Non-blocking get_prediction_from_cache: memory hits return without awaiting,
+    misses go through the async Firestore client.
+    """
+    with tracing.span("cache.read") as read_span:
+        started = time.perf_counter()
+        try:
+            cache_key = _cache_key_for(lat, lon, date_str)
+            read_span.set_attribute("cache_key", cache_key)
+            
+            data = await _memory_cache.aget(cache_key)
+            if data is not None:
+                logger.info("Memory cache hit %s", cache_key, extra=SAMPLED)
+                _observe_lookup(read_span, "memory", started, 1)
+                return data
+            
+            db = get_async_db()
+            if db is None:
+                _observe_lookup(read_span, "memory", started, 0)
+                return None
+            
+            doc = await db.collection('weather_predictions').document(cache_key).get()
+            data = _document_data(cache_key, doc)
+            if data is not None:
+                await _memory_cache.aset(cache_key, data)
+            _observe_lookup(read_span, "firestore", started, int(data is not None))
+            return data
+                
+        except Exception as e:
+            logger.warning("Error reading from cache: %s", e)
+            return None
+
+
+def _observe_lookup(read_span, source: str, started: float, hits: int):
+    CACHE_LOOKUP_SECONDS.labels(source).observe(time.perf_counter() - started)
+    read_span.set_attribute("source", source)
+    read_span.set_attribute("hits", hits)
+
+
+async def get_predictions_from_cache_async(cache_keys: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Looks up many cache keys at once: memory first, then a single batched
+    Firestore read (get_all) for the rest.
+
+    Returns:
+        dict: cache key -> cached data, or None if not cached
+    """
+    with tracing.span("cache.read_batch", keys=len(cache_keys)) as read_span:
+        started = time.perf_counter()
+        found: Dict[str, Optional[Dict[str, Any]]] = await _memory_cache.aget_many(dict.fromkeys(cache_keys))
+        remaining = [cache_key for cache_key, data in found.items() if data is None]
+
+        db = get_async_db() if remaining else None
+        if db is None:
+            _observe_lookup(read_span, "memory_batch", started, len(found) - len(remaining))
+            return found
+
+        try:
+            collection = db.collection('weather_predictions')
+            async for doc in db.get_all([collection.document(cache_key) for cache_key in remaining]):
+                if doc.exists:
+                    found[doc.id] = cache_codec.LazyPredictionDoc(doc.to_dict())
+                    await _memory_cache.aset(doc.id, found[doc.id])
+            logger.info(
+                "Batched cache read: %d in memory, %d/%d from Firestore",
+                len(cache_keys) - len(remaining), sum(found[key] is not None for key in remaining), len(remaining)
+            )
+        except Exception as e:
+            logger.warning("Error reading batch from cache: %s", e)
+        _observe_lookup(read_span, "firestore_batch", started, sum(data is not None for data in found.values()))
+        return found
+
+
+def _cache_key_for(lat: float, lon: float, date_str: str) -> str:
+    month, day = extract_month_day(date_str)
+    return generate_cache_key(lat, lon, month, day)
+
+
+def _document_data(cache_key: str, doc) -> Optional[Dict[str, Any]]:
+    """Wraps a fetched Firestore snapshot (None if the document does not exist)"""
+    if doc.exists:
+        # Packed numeric fields are decoded lazily, on first access
+        logger.info("Firestore cache hit %s", cache_key, extra=SAMPLED)
+        return cache_codec.LazyPredictionDoc(doc.to_dict())
+    logger.info("Firestore cache miss %s", cache_key)
+    return None
+
+
+def _remember_document(cache_key: str, doc) -> Optional[Dict[str, Any]]:
+    """Wraps a fetched Firestore snapshot and keeps it in the in-process cache"""
+    data = _document_data(cache_key, doc)
+    if data is not None:
+        _memory_cache.set(cache_key, data)
+    return data
+
+
 def save_prediction_to_cache(
     lat: float, 
     lon: float, 
@@ -153,7 +323,8 @@ def save_prediction_to_cache(
     missing_years: List[int],
     confidence_score: float,
     ai_insight: Optional[Dict[str, Any]] = None,
-    verification_result: Optional[Dict[str, Any]] = None
+    verification_result: Optional[Dict[str, Any]] = None,
+    historical_data=None
 ) -> bool:
     """
     Saves a prediction to Firestore cache.
@@ -170,58 +341,117 @@ def save_prediction_to_cache(
         confidence_score (float): Confidence score (0-1)
         ai_insight (dict, optional): AI-generated insight from Gemini
         verification_result (dict, optional): Two-stage verification result
+        historical_data (pd.DataFrame, optional): Per-year data the statistics came from;
+            when given (and CACHE_COMPACT_ENCODING is on) the numeric part is stored packed
     
     Returns:
         bool: True if saved successfully
     """
-    db = get_db()
-    if db is None:
-        return False
-    
     try:
-        month, day = extract_month_day(date_str)
-        cache_key = generate_cache_key(lat, lon, month, day)
-        
-        cache_data = {
-            "cache_key": cache_key,
-            "location": {
-                "lat": lat,
-                "lon": lon
-            },
-            "target_date": f"{month:02d}-{day:02d}",
-            "statistics": statistics,
-            "metadata": {
-                "years_analyzed": years_analyzed,
-                "total_years": total_years,
-                "latest_available_year": latest_year,
-                "missing_years": missing_years,
-                "last_updated": datetime.utcnow().isoformat(),
-                "data_complete_until": f"{latest_year}-12-31"
-            },
-            "confidence_score": confidence_score,
-            "created_at": datetime.utcnow().isoformat()
-        }
-        
-        # Add AI insight if available
-        if ai_insight:
-            cache_data["ai_insight"] = ai_insight
-        
-        # Add verification result if available
-        if verification_result:
-            cache_data["verification"] = verification_result
+        cache_key, cache_data, memory_entry = _prediction_document(
+            lat, lon, date_str, statistics, years_analyzed, total_years, latest_year,
+            missing_years, confidence_score, ai_insight, verification_result, historical_data
+        )
+        _memory_cache.set(cache_key, memory_entry)
+        
+        db = get_db()
+        if db is None:
+            return True
         
         # Save to Firestore
-        doc_ref = db.collection('weather_predictions').document(cache_key)
-        doc_ref.set(cache_data)
+        db.collection('weather_predictions').document(cache_key).set(cache_data)
+        
+        logger.info("Saved prediction to cache: %s", cache_key)
+        return True
+        
+    except Exception as e:
+        logger.warning("Error saving to cache: %s", e)
+        return False
+
+
+async def save_prediction_to_cache_async(*args, **kwargs) -> bool:
+    """Non-blocking save_prediction_to_cache (same arguments), via the async Firestore client"""
+    started = time.perf_counter()
+    try:
+        cache_key, cache_data, memory_entry = _prediction_document(*args, **kwargs)
+        await _memory_cache.aset(cache_key, memory_entry)
         
-        print(f"💾 Saved prediction to cache: {cache_key}")
+        db = get_async_db()
+        if db is None:
+            return True
+        
+        await db.collection('weather_predictions').document(cache_key).set(cache_data)
+        CACHE_WRITE_SECONDS.labels("save", "ok").observe(time.perf_counter() - started)
+        
+        logger.info("Saved prediction to cache: %s", cache_key)
         return True
         
     except Exception as e:
-        print(f"⚠️ Error saving to cache: {e}")
+        CACHE_WRITE_SECONDS.labels("save", "error").observe(time.perf_counter() - started)
+        logger.warning("Error saving to cache: %s", e)
         return False
 
 
+def _prediction_document(
+    lat: float,
+    lon: float,
+    date_str: str,
+    statistics: Dict[str, Any],
+    years_analyzed: str,
+    total_years: int,
+    latest_year: int,
+    missing_years: List[int],
+    confidence_score: float,
+    ai_insight: Optional[Dict[str, Any]] = None,
+    verification_result: Optional[Dict[str, Any]] = None,
+    historical_data=None
+) -> tuple:
+    """
+    Builds a cache document and its in-process copy.
+
+    Returns:
+        (cache_key, document to write to Firestore, entry for the in-process cache)
+    """
+    month, day = extract_month_day(date_str)
+    cache_key = generate_cache_key(lat, lon, month, day)
+    
+    cache_data = {
+        "cache_key": cache_key,
+        "location": {
+            "lat": lat,
+            "lon": lon
+        },
+        "target_date": f"{month:02d}-{day:02d}",
+        "metadata": {
+            "years_analyzed": years_analyzed,
+            "total_years": total_years,
+            "latest_available_year": latest_year,
+            "missing_years": missing_years,
+            "last_updated": datetime.utcnow().isoformat(),
+            "data_complete_until": f"{latest_year}-12-31"
+        },
+        "confidence_score": confidence_score,
+        "created_at": datetime.utcnow().isoformat()
+    }
+    
+    # Add AI insight if available
+    if ai_insight:
+        cache_data["ai_insight"] = ai_insight
+    
+    # Add verification result if available
+    if verification_result:
+        cache_data["verification"] = verification_result
+    
+    if COMPACT_ENCODING and historical_data is not None:
+        cache_data[cache_codec.PACKED_FIELD] = cache_codec.encode(historical_data)
+        cache_data["schema_version"] = cache_codec.SCHEMA_VERSION
+    else:
+        cache_data["statistics"] = statistics
+    
+    # The in-process copy keeps the already computed statistics (nothing to decode)
+    return cache_key, cache_data, cache_codec.LazyPredictionDoc(cache_data, statistics=statistics)
+
+
 def update_cache_with_new_data(
     lat: float,
     lon: float, 
@@ -231,41 +461,104 @@ def update_cache_with_new_data(
     total_years: int,
     latest_year: int,
     missing_years: List[int],
-    confidence_score: float
+    confidence_score: float,
+    historical_data=None
 ) -> bool:
     """
     Updates an existing cache entry with new data (incremental update).
-    """
-    db = get_db()
-    if db is None:
-        return False
     
+    When historical_data is given (and CACHE_COMPACT_ENCODING is on) the entry is
+    rewritten in the packed layout; otherwise the legacy statistics map is stored.
+    """
     try:
-        month, day = extract_month_day(date_str)
-        cache_key = generate_cache_key(lat, lon, month, day)
+        cache_key, updates, memory_updates = _cache_update(
+            lat, lon, date_str, new_statistics, years_analyzed, total_years, latest_year,
+            missing_years, confidence_score, historical_data
+        )
+        _update_memory_entry(cache_key, memory_updates)
         
-        doc_ref = db.collection('weather_predictions').document(cache_key)
+        db = get_db()
+        if db is None:
+            return True
         
         # Update specific fields
-        doc_ref.update({
-            "statistics": new_statistics,
-            "metadata.years_analyzed": years_analyzed,
-            "metadata.total_years": total_years,
-            "metadata.latest_available_year": latest_year,
-            "metadata.missing_years": missing_years,
-            "metadata.last_updated": datetime.utcnow().isoformat(),
-            "metadata.data_complete_until": f"{latest_year}-12-31",
-            "confidence_score": confidence_score
-        })
-        
-        print(f"🔄 Updated cache: {cache_key} (now includes data up to {latest_year})")
+        db.collection('weather_predictions').document(cache_key).update(updates)
+        
+        logger.info("Updated cache: %s (now includes data up to %s)", cache_key, latest_year)
+        return True
+        
+    except Exception as e:
+        logger.warning("Error updating cache: %s", e)
+        return False
+
+
+async def update_cache_with_new_data_async(*args, **kwargs) -> bool:
+    """Non-blocking update_cache_with_new_data (same arguments), via the async Firestore client"""
+    started = time.perf_counter()
+    try:
+        cache_key, updates, memory_updates = _cache_update(*args, **kwargs)
+        await _update_memory_entry_async(cache_key, memory_updates)
+        
+        db = get_async_db()
+        if db is None:
+            return True
+        
+        await db.collection('weather_predictions').document(cache_key).update(updates)
+        CACHE_WRITE_SECONDS.labels("update", "ok").observe(time.perf_counter() - started)
+        
+        logger.info("Updated cache: %s (now includes data up to %s)", cache_key, updates['metadata.latest_available_year'])
         return True
         
     except Exception as e:
-        print(f"⚠️ Error updating cache: {e}")
+        CACHE_WRITE_SECONDS.labels("update", "error").observe(time.perf_counter() - started)
+        logger.warning("Error updating cache: %s", e)
         return False
 
 
+def _cache_update(
+    lat: float,
+    lon: float,
+    date_str: str,
+    new_statistics: Dict[str, Any],
+    years_analyzed: str,
+    total_years: int,
+    latest_year: int,
+    missing_years: List[int],
+    confidence_score: float,
+    historical_data=None
+) -> tuple:
+    """
+    Builds the Firestore field updates of an incremental update, and the
+    matching updates of the in-process copy.
+
+    Returns:
+        (cache_key, field updates, in-process updates)
+    """
+    month, day = extract_month_day(date_str)
+    cache_key = generate_cache_key(lat, lon, month, day)
+    
+    updates = {
+        "metadata.years_analyzed": years_analyzed,
+        "metadata.total_years": total_years,
+        "metadata.latest_available_year": latest_year,
+        "metadata.missing_years": missing_years,
+        "metadata.last_updated": datetime.utcnow().isoformat(),
+        "metadata.data_complete_until": f"{latest_year}-12-31",
+        "confidence_score": confidence_score
+    }
+    if COMPACT_ENCODING and historical_data is not None:
+        packed = cache_codec.encode(historical_data)
+        updates[cache_codec.PACKED_FIELD] = packed
+        updates["schema_version"] = cache_codec.SCHEMA_VERSION
+        updates["statistics"] = firestore.DELETE_FIELD
+        memory_updates = {**updates, "statistics": new_statistics}
+    else:
+        updates["statistics"] = new_statistics
+        updates[cache_codec.PACKED_FIELD] = firestore.DELETE_FIELD
+        memory_updates = updates
+    return cache_key, updates, memory_updates
+
+
 def should_update_cache(cached_data: Dict[str, Any], target_date_str: str) -> tuple:
     """
     Determines if cached data needs updating with new years.
@@ -302,10 +595,64 @@ def should_update_cache(cached_data: Dict[str, Any], target_date_str: str) -> tu
         return needs_update, years_to_fetch
         
     except Exception as e:
-        print(f"⚠️ Error checking cache update need: {e}")
+        logger.warning("Error checking cache update need: %s", e)
         return False, []
 
 
+def stream_cache_metadata() -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streams the lightweight metadata of every cached prediction.
+    
+    Only the fields needed to decide staleness are read, so the scan does not
+    pay for statistics, verification blobs or AI insights.
+    
+    Yields:
+        (cache_key, data) tuples where data holds 'location', 'target_date'
+        and 'metadata'
+    """
+    db = get_db()
+    if db is None:
+        return
+    
+    query = db.collection('weather_predictions').select([
+        'location',
+        'target_date',
+        'metadata.latest_available_year',
+        'metadata.last_updated',
+    ])
+    
+    for doc in query.stream():
+        yield doc.id, doc.to_dict() or {}
+
+
+def compute_cache_metadata(statistics: Dict[str, Any], date_str: str) -> tuple:
+    """
+    Derives the cache metadata stored alongside a set of statistics.
+    
+    Args:
+        statistics (dict): Output of statistical_engine.calculate_statistics
+        date_str (str): Target date in YYYY-MM-DD format
+    
+    Returns:
+        (latest_year: int, missing_years: List[int], confidence_score: float)
+    """
+    target_year = datetime.strptime(date_str, "%Y-%m-%d").year
+    latest_year = int(statistics['years_analyzed'].split('-')[1])
+    
+    # Future prediction - all years between the latest data and the target are missing
+    if target_year > latest_year:
+        missing_years = list(range(latest_year + 1, target_year + 1))
+    else:
+        missing_years = []
+    
+    confidence_score = calculate_confidence_score(
+        statistics['data_years_count'],
+        len(missing_years)
+    )
+    
+    return latest_year, missing_years, confidence_score
+
+
 def calculate_confidence_score(total_years: int, missing_years_count: int) -> float:
     """
     Calculates confidence score based on data completeness.
@@ -378,43 +725,3 @@ def get_missing_data_alert(missing_years: List[int], total_years: int) -> Option
         "severity": "low" if missing_count <= 1 else "moderate" if missing_count <= 3 else "high"
     }
 
-
-def update_cache_with_ai_insight(
-    lat: float,
-    lon: float,
-    date_str: str,
-    ai_insight: Dict[str, Any]
-) -> bool:
-    """
-    Updates an existing cache entry with AI insight.
-    
-    Args:
-        lat (float): Latitude
-        lon (float): Longitude
-        date_str (str): Date in YYYY-MM-DD format
-        ai_insight (dict): AI-generated insight from Gemini
-    
-    Returns:
-        bool: True if updated successfully
-    """
-    db = get_db()
-    if db is None:
-        return False
-    
-    try:
-        month, day = extract_month_day(date_str)
-        cache_key = generate_cache_key(lat, lon, month, day)
-        
-        doc_ref = db.collection('weather_predictions').document(cache_key)
-        
-        # Update AI insight field
-        doc_ref.update({
-            "ai_insight": ai_insight
-        })
-        
-        print(f"🤖 Updated cache with AI insight: {cache_key}")
-        return True
-        
-    except Exception as e:
-        print(f"⚠️ Error updating cache with AI insight: {e}")
-        return False
\ No newline at end of file
@@ -0,0 +1,225 @@
+"""
+AI Insight Cache
+Stores generated insights per prompt context, so each (snapped location,
+month-day, statistics, activity, part of day, tense, prompt template) variant
+is generated once.
+
+Insights live in an in-process LRU and, when configured, in the Firestore
+'ai_insights' collection (one document per variant). The status of deferred
+generations ("pending", "failed") is kept next to them, in the shared cache
+tier when there is one, so any worker can answer a poll for a token.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Optional, Dict, Any
+from app.utils.shared_cache import tiered_cache
+from app.services import firestore_service
+from app.core.reasoning_agent import INSIGHT_PROMPT
+
+logger = logging.getLogger(__name__)
+
+INSIGHT_COLLECTION = 'ai_insights'
+
+_memory_cache = tiered_cache(
+    'insights',
+    maxsize=int(os.getenv('INSIGHT_MEMORY_CACHE_SIZE', '2048')),
+    ttl_seconds=float(os.getenv('INSIGHT_MEMORY_CACHE_TTL_SECONDS', '21600'))
+)
+
+# How long a deferred generation counts as pending (covers a worker dying
+# mid-generation) and how long a failure is reported
+INSIGHT_PENDING_TTL_SECONDS = float(os.getenv('INSIGHT_PENDING_TTL_SECONDS', '120'))
+INSIGHT_FAILED_TTL_SECONDS = 600
+
+# Insight key -> "pending" / "failed". Never answered from process memory when
+# the shared tier exists: the generating worker changes it
+_status_cache = tiered_cache(
+    'insight_status',
+    maxsize=1024,
+    ttl_seconds=INSIGHT_FAILED_TTL_SECONDS,
+    memory_ttl_seconds=0
+)
+
+
+def normalize_activity(activity: Optional[str]) -> str:
+    """Lower-cases and collapses whitespace, so 'Picnic ' and 'picnic' share an insight"""
+    if not activity:
+        return ""
+    return " ".join(activity.lower().split())
+
+
+def statistics_digest(statistics: Dict[str, Any], confidence_score: Optional[float] = None) -> str:
+    """Short stable digest of the numbers an insight was written from"""
+    payload = {"statistics": statistics, "confidence_score": round(confidence_score or 0.0, 2)}
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:16]
+
+
+def build_context(
+    lat: float,
+    lon: float,
+    date_str: str,
+    statistics: Dict[str, Any],
+    confidence_score: Optional[float] = None,
+    activity: Optional[str] = None,
+    part_of_day: Optional[str] = None,
+    already_passed: Optional[bool] = None
+) -> Dict[str, str]:
+    """
+    Everything that changes the insight prompt, normalized.
+
+    Raises:
+        ValueError: Invalid date format
+    """
+    month, day = firestore_service.extract_month_day(date_str)
+    return {
+        "cell": firestore_service.generate_cache_key(lat, lon, month, day),
+        "stats_digest": statistics_digest(statistics, confidence_score),
+        "activity": normalize_activity(activity),
+        "part_of_day": part_of_day or "all_day",
+        # The reasoning agent only distinguishes past from upcoming dates
+        "tense": "past" if already_passed else "future",
+        # Editing the prompt template retires insights written from the old one
+        "prompt": INSIGHT_PROMPT.fingerprint,
+    }
+
+
+def insight_key(context: Dict[str, str]) -> str:
+    """Cache key (sha256 hex) for a build_context result"""
+    raw = "|".join(context[field] for field in ("cell", "stats_digest", "activity", "part_of_day", "tense", "prompt"))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def get_insight(key: str) -> Optional[Dict[str, Any]]:
+    """
+    Looks up an insight in memory, then in Firestore.
+
+    Returns:
+        dict: The cached insight, or None
+    """
+    insight = _memory_cache.get(key)
+    if insight is not None:
+        return insight
+
+    db = firestore_service.get_db()
+    if db is None:
+        return None
+
+    try:
+        doc = db.collection(INSIGHT_COLLECTION).document(key).get()
+        return _remember_insight(key, doc)
+    except Exception as e:
+        logger.warning("Error reading insight cache: %s", e)
+        return None
+
+
+async def get_insight_async(key: str) -> Optional[Dict[str, Any]]:
+    """Non-blocking get_insight: memory hits return without awaiting, misses use the async Firestore client"""
+    insight = await _memory_cache.aget(key)
+    if insight is not None:
+        return insight
+
+    db = firestore_service.get_async_db()
+    if db is None:
+        return None
+
+    try:
+        doc = await db.collection(INSIGHT_COLLECTION).document(key).get()
+        insight = _document_insight(doc)
+        if insight:
+            await _memory_cache.aset(key, insight)
+        return insight
+    except Exception as e:
+        logger.warning("Error reading insight cache: %s", e)
+        return None
+
+
+def _document_insight(doc) -> Optional[Dict[str, Any]]:
+    if not doc.exists:
+        return None
+    return (doc.to_dict() or {}).get("insight")
+
+
+def _remember_insight(key: str, doc) -> Optional[Dict[str, Any]]:
+    insight = _document_insight(doc)
+    if insight:
+        _memory_cache.set(key, insight)
+    return insight
+
+
+def save_insight(key: str, insight: Dict[str, Any], context: Dict[str, str]) -> bool:
+    """
+    Stores an insight in memory and Firestore.
+
+    Returns:
+        bool: True if saved (memory-only counts when Firestore is not configured)
+    """
+    if not insight:
+        return False
+
+    _memory_cache.set(key, insight)
+
+    db = firestore_service.get_db()
+    if db is None:
+        return True
+
+    try:
+        db.collection(INSIGHT_COLLECTION).document(key).set(_insight_document(insight, context))
+        logger.info(
+            "Cached AI insight for %s (%s, %s, %s)",
+            context['cell'], context['activity'] or 'general', context['part_of_day'], context['tense']
+        )
+        return True
+    except Exception as e:
+        logger.warning("Error saving insight cache: %s", e)
+        return False
+
+
+async def save_insight_async(key: str, insight: Dict[str, Any], context: Dict[str, str]) -> bool:
+    """Non-blocking save_insight, via the async Firestore client"""
+    if not insight:
+        return False
+
+    await _memory_cache.aset(key, insight)
+
+    db = firestore_service.get_async_db()
+    if db is None:
+        return True
+
+    try:
+        await db.collection(INSIGHT_COLLECTION).document(key).set(_insight_document(insight, context))
+        logger.info(
+            "Cached AI insight for %s (%s, %s, %s)",
+            context['cell'], context['activity'] or 'general', context['part_of_day'], context['tense']
+        )
+        return True
+    except Exception as e:
+        logger.warning("Error saving insight cache: %s", e)
+        return False
+
+
+def _insight_document(insight: Dict[str, Any], context: Dict[str, str]) -> Dict[str, Any]:
+    return {
+        **context,
+        "insight": insight,
+        "created_at": datetime.utcnow().isoformat(),
+    }
+
+
+async def set_generation_status_async(key: str, status: str):
+    """Records a deferred generation as "pending" or "failed" for every worker"""
+    ttl = INSIGHT_PENDING_TTL_SECONDS if status == "pending" else INSIGHT_FAILED_TTL_SECONDS
+    await _status_cache.aset(key, status, ttl_seconds=ttl)
+
+
+async def get_generation_status_async(key: str) -> Optional[str]:
+    """"pending", "failed" or None (no deferred generation known for this key)"""
+    return await _status_cache.aget(key)
+
+
+def get_insight_cache_stats() -> Dict[str, Any]:
+    return _memory_cache.stats()
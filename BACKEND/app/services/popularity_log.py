@@ -0,0 +1,197 @@
+"""
+Popularity Log
+Counts prediction requests per (snapped location, month-day) so the most
+requested entries can be pre-warmed after a deploy.
+
+Hits are counted in memory and flushed periodically to a local JSON file and,
+when configured, to Firestore (which survives Render redeploys). Each worker
+process flushes only the hits it counted since its last flush, added to the
+persisted totals, so concurrent workers don't overwrite each other's counts.
+"""
+
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List
+from app.services import firestore_service
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+POPULARITY_LOG_PATH = os.getenv("POPULARITY_LOG_PATH", "popularity_log.json")
+POPULARITY_LOG_MAX_ENTRIES = int(os.getenv("POPULARITY_LOG_MAX_ENTRIES", "500"))
+
+_lock = threading.Lock()
+# Persisted totals plus this process's hits, for ranking
+_entries: Dict[str, Dict[str, Any]] = {}
+# Hits counted by this process since its last flush
+_pending: Dict[str, Dict[str, Any]] = {}
+_loaded = False
+
+
+def record_hit(lat: float, lon: float, date_str: str):
+    """
+    Counts one prediction request for the snapped cell and month-day of a query.
+    Cheap enough to call on every request (no I/O).
+    """
+    try:
+        month, day = firestore_service.extract_month_day(date_str)
+    except ValueError:
+        return
+
+    cache_key = firestore_service.generate_cache_key(lat, lon, month, day)
+    with _lock:
+        for counts in (_entries, _pending):
+            entry = counts.get(cache_key)
+            if entry is None:
+                entry = counts[cache_key] = {
+                    "lat": round(lat, 2),
+                    "lon": round(lon, 2),
+                    "month_day": f"{month:02d}-{day:02d}",
+                    "hits": 0,
+                }
+            entry["hits"] += 1
+
+
+def top_entries(n: int) -> List[Dict[str, Any]]:
+    """Returns the n most requested entries, most popular first"""
+    load()
+    with _lock:
+        ranked = sorted(_entries.items(), key=lambda item: item[1]["hits"], reverse=True)
+        return [{"cache_key": key, **entry} for key, entry in ranked[:n]]
+
+
+def _merge(entries: Dict[str, Dict[str, Any]], into: Dict[str, Dict[str, Any]]):
+    """Merges two copies of the persisted totals, keeping the larger count for each entry"""
+    for key, entry in entries.items():
+        current = into.get(key)
+        if current is None or entry.get("hits", 0) > current["hits"]:
+            into[key] = dict(entry)
+
+
+def _add_hits(deltas: Dict[str, Dict[str, Any]], into: Dict[str, Dict[str, Any]]):
+    """Adds per-process hit counts to totals"""
+    for key, entry in deltas.items():
+        current = into.get(key)
+        if current is None:
+            into[key] = dict(entry)
+        else:
+            current["hits"] += entry["hits"]
+
+
+def _read_persisted() -> Dict[str, Dict[str, Any]]:
+    """Persisted totals, from the local file and Firestore merged"""
+    persisted: Dict[str, Dict[str, Any]] = {}
+    if os.path.exists(POPULARITY_LOG_PATH):
+        try:
+            with open(POPULARITY_LOG_PATH, "r") as f:
+                _merge(json.load(f), persisted)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read popularity log %s: %s", POPULARITY_LOG_PATH, e)
+
+    db = firestore_service.get_db()
+    if db is not None:
+        try:
+            doc = db.collection('cache_meta').document('popularity').get()
+            if doc.exists:
+                _merge((doc.to_dict() or {}).get("entries", {}), persisted)
+        except Exception as e:
+            logger.warning("Could not read popularity log from Firestore: %s", e)
+    return persisted
+
+
+@contextmanager
+def _flush_lock():
+    """Serializes read-merge-write of the persisted totals across worker processes"""
+    if fcntl is None:
+        yield
+        return
+    try:
+        lock_file = open(f"{POPULARITY_LOG_PATH}.lock", "a")
+    except OSError as e:
+        logger.warning("Could not open popularity log lock: %s", e)
+        yield
+        return
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+    finally:
+        lock_file.close()
+
+
+def load():
+    """
+    Loads persisted counts once per process (Firestore and local file are merged,
+    keeping the larger count for each entry).
+    """
+    global _loaded
+    with _lock:
+        if _loaded:
+            return
+    persisted = _read_persisted()
+    with _lock:
+        if _loaded:
+            return
+        _loaded = True
+        _merge(persisted, _entries)
+
+
+def flush() -> bool:
+    """
+    Adds the hits counted since the last flush to the persisted totals (trimmed
+    to the most popular entries), if there are any.
+
+    The persisted totals are re-read first, so hits flushed by other worker
+    processes since this one loaded are kept.
+
+    Returns:
+        bool: True if something was written
+    """
+    load()
+    with _lock:
+        if not _pending:
+            return False
+        deltas = {key: dict(entry) for key, entry in _pending.items()}
+        _pending.clear()
+
+    written = False
+    with _flush_lock():
+        totals = _read_persisted()
+        _add_hits(deltas, totals)
+        ranked = sorted(totals.items(), key=lambda item: item[1]["hits"], reverse=True)
+        snapshot = dict(ranked[:POPULARITY_LOG_MAX_ENTRIES])
+
+        # Write-then-rename: other worker processes never read a half-written file
+        tmp_path = f"{POPULARITY_LOG_PATH}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, POPULARITY_LOG_PATH)
+            written = True
+        except OSError as e:
+            logger.warning("Could not write popularity log %s: %s", POPULARITY_LOG_PATH, e)
+
+        db = firestore_service.get_db()
+        if db is not None:
+            try:
+                db.collection('cache_meta').document('popularity').set({"entries": snapshot})
+                written = True
+            except Exception as e:
+                logger.warning("Could not write popularity log to Firestore: %s", e)
+
+    with _lock:
+        if not written:
+            # Nothing persisted: keep the hits for the next flush
+            _add_hits(deltas, _pending)
+            return False
+        # Hits counted while flushing are in _pending and not yet in the snapshot
+        _entries.clear()
+        _entries.update({key: dict(entry) for key, entry in snapshot.items()})
+        _add_hits(_pending, _entries)
+    return True
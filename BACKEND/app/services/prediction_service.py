@@ -0,0 +1,1036 @@
+"""
+Prediction Service
+Shared prediction pipeline used by every /predict endpoint:
+cache lookup -> incremental refresh or full fetch -> statistics ->
+verification and AI insight -> cache write -> response.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import httpx
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from app.core import geocoder, nasa_data_handler, statistical_engine
+from app.core.reasoning_agent import get_reasoning_agent
+from app.core.verification_agent import get_verification_agent
+from app.services import firestore_service, insight_cache
+from app.utils import metrics, tracing
+from app.utils.structured_logging import SAMPLED
+
+logger = logging.getLogger(__name__)
+
+# Initialize AI agents
+reasoning_agent = get_reasoning_agent()
+verification_agent_instance = get_verification_agent()
+
+# End-to-end budget for the AI stages (verification and insight run concurrently)
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "8"))
+
+# Longest date range served by one /predict/range request
+RANGE_MAX_DAYS = int(os.getenv("PREDICT_RANGE_MAX_DAYS", "14"))
+
+# Largest /predict/batch request, and how many of its items are worked on at once
+BATCH_MAX_ITEMS = int(os.getenv("PREDICT_BATCH_MAX_ITEMS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("PREDICT_BATCH_CONCURRENCY", "16"))
+
+# Longest a client may long-poll for a deferred insight
+INSIGHT_MAX_WAIT_SECONDS = float(os.getenv("INSIGHT_MAX_WAIT_SECONDS", "25"))
+
+CACHE_REQUESTS = metrics.counter(
+    "cache_requests_total", "Prediction cache outcomes (hit, hit_stale, updated, miss) and insight cache hits/misses",
+    ["cache", "status"]
+)
+STATISTICS_SECONDS = metrics.histogram(
+    "statistics_duration_seconds", "Time to compute statistics from a historical series", buckets=metrics.FAST_BUCKETS
+)
+
+# Deferred insight generation: insight cache key -> background task (kept
+# referenced until done). Pending/failed status for other workers is in insight_cache
+_insight_tasks: Dict[str, asyncio.Task] = {}
+
+# Interval at which a long-poll checks the shared tier for an insight generated by another worker
+INSIGHT_POLL_INTERVAL_SECONDS = 0.25
+
+# End of each part of day, as (hour, minute, second, extra hours)
+_PART_OF_DAY_END = {
+    'morning': (12, 0, 0, 0),
+    'noon': (16, 0, 0, 0),
+    'evening': (19, 0, 0, 0),
+    # night: 19:00 selected day to 04:00 next day
+    'night': (19, 0, 0, 9),
+}
+
+
+def compute_already_passed(
+    date_str: str,
+    timezone: Optional[str] = None,
+    part_of_day: Optional[str] = None,
+    client_value: Optional[bool] = None
+) -> Optional[bool]:
+    """
+    Computes the authoritative 'already_passed' flag for a date and part of day
+    using the caller's IANA timezone (UTC if missing or unknown).
+
+    Returns:
+        bool, or the client's value (False if none) if the date cannot be parsed
+    """
+    tz_name = timezone or 'UTC'
+    try:
+        tzinfo = ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning("Timezone not found on server: %s. Falling back to UTC for already_passed computation.", tz_name)
+        tzinfo = ZoneInfo('UTC')
+
+    try:
+        now = datetime.now(tzinfo)
+        year, month, day = [int(p) for p in date_str.split('-')]
+
+        # Determine end time for the requested part_of_day
+        hour, minute, second, extra_hours = _PART_OF_DAY_END.get(part_of_day or 'all_day', (23, 59, 59, 0))
+        part_end = datetime(year, month, day, hour, minute, second, tzinfo=tzinfo) + timedelta(hours=extra_hours)
+
+        # Compare dates (day-based) first
+        today = datetime(now.year, now.month, now.day, tzinfo=tzinfo)
+        selected_day = datetime(year, month, day, tzinfo=tzinfo)
+
+        if selected_day < today:
+            server_value = True
+        elif selected_day > today:
+            server_value = False
+        else:
+            server_value = part_end < now
+    except (ValueError, TypeError):
+        return client_value if client_value is not None else False
+
+    # Log if client and server disagree
+    if client_value is not None and client_value != server_value:
+        logger.info("Client sent already_passed=%s but server computed %s. Using server value.", client_value, server_value)
+
+    return server_value
+
+
+async def fetch_history_with_new_years(
+    lat: float,
+    lon: float,
+    date_str: str,
+    years_to_fetch: List[int],
+    cached_series: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """
+    Builds the full per-year history including newly passed years.
+
+    If the cache document carries the per-year values (CACHE_PACK_SERIES) only
+    the new years are downloaded; otherwise the whole history is re-fetched.
+    """
+    if cached_series is None:
+        cached_series = await nasa_data_handler.get_historical_data_async(lat, lon, date_str)
+
+    new_years = await nasa_data_handler.get_historical_data_async(lat, lon, date_str, specific_years=years_to_fetch)
+    combined = pd.concat([cached_series, new_years], ignore_index=True).drop_duplicates(subset='YEAR', keep='last')
+    # Keep the neighbouring-day climatology of the full history. A decoded cache
+    # series has none, and the new years alone are too few to stand in for it
+    combined.attrs = dict(cached_series.attrs)
+    return combined
+
+
+def _calculate_statistics(historical_data: pd.DataFrame) -> Dict[str, Any]:
+    with tracing.span("statistics", years=len(historical_data)), STATISTICS_SECONDS.time():
+        statistics = statistical_engine.calculate_statistics(historical_data)
+    if "error" in statistics:
+        raise LookupError(statistics["error"])
+    return statistics
+
+
+async def resolve_statistics(lat: float, lon: float, date: str) -> Dict[str, Any]:
+    """
+    Resolves statistics for a query from the cache, refreshing or computing
+    them when needed.
+
+    Returns:
+        dict with cache_status ('hit', 'hit_stale', 'updated' or 'miss'),
+        statistics, confidence_score, missing_data_alert, cached (document or None),
+        historical_data (DataFrame when freshly computed), latest_year,
+        missing_years and an optional warning
+    """
+    cached_data = await firestore_service.get_prediction_from_cache_async(lat, lon, date)
+    return await resolve_cached_statistics(cached_data, lat, lon, date)
+
+
+async def resolve_cached_statistics(
+    cached_data: Optional[Dict[str, Any]],
+    lat: float,
+    lon: float,
+    date: str
+) -> Dict[str, Any]:
+    """resolve_statistics for an already looked up cache document (or None)"""
+    if cached_data:
+        # We have cached data! Now check if it needs updating
+        needs_update, years_to_fetch = firestore_service.should_update_cache(cached_data, date)
+
+        if not needs_update:
+            # CACHE HIT: Data is up-to-date, return from cache
+            logger.info("Cache hit, data is current", extra=SAMPLED)
+            CACHE_REQUESTS.labels("prediction", "hit").inc()
+            return {
+                "cache_status": "hit",
+                "cached": cached_data,
+                "statistics": cached_data['statistics'],
+                "confidence_score": cached_data['confidence_score'],
+                "missing_data_alert": firestore_service.get_missing_data_alert(
+                    cached_data['metadata']['missing_years'],
+                    cached_data['metadata']['total_years']
+                ),
+                "historical_data": None,
+            }
+
+        # INCREMENTAL UPDATE: Fetch only new years
+        logger.info("Incremental update needed, fetching %d new year(s): %s", len(years_to_fetch), years_to_fetch)
+        try:
+            cached_series = cached_data.series() if hasattr(cached_data, 'series') else None
+            historical_data = await fetch_history_with_new_years(lat, lon, date, years_to_fetch, cached_series)
+            statistics = _calculate_statistics(historical_data)
+            latest_year, missing_years, confidence_score = firestore_service.compute_cache_metadata(statistics, date)
+
+            with tracing.span("cache.write", operation="update"):
+                await firestore_service.update_cache_with_new_data_async(
+                    lat, lon, date,
+                    statistics,
+                    statistics['years_analyzed'],
+                    statistics['data_years_count'],
+                    latest_year,
+                    missing_years,
+                    confidence_score,
+                    historical_data=historical_data
+                )
+            cache_status = "updated"
+            CACHE_REQUESTS.labels("prediction", "updated").inc()
+        except Exception as e:
+            logger.warning("Incremental update failed, returning cached data: %s", e)
+            CACHE_REQUESTS.labels("prediction", "hit_stale").inc()
+            # If update fails, return cached data with warning
+            return {
+                "cache_status": "hit_stale",
+                "cached": cached_data,
+                "statistics": cached_data['statistics'],
+                "confidence_score": cached_data['confidence_score'],
+                "missing_data_alert": firestore_service.get_missing_data_alert(
+                    cached_data['metadata']['missing_years'],
+                    cached_data['metadata']['total_years']
+                ),
+                "historical_data": None,
+                "warning": "Could not update with latest data. Returning cached version.",
+            }
+    else:
+        # CACHE MISS: Fetch all data
+        logger.info("Cache miss, fetching full historical data")
+        CACHE_REQUESTS.labels("prediction", "miss").inc()
+        historical_data = await nasa_data_handler.get_historical_data_async(lat, lon, date)
+        statistics = _calculate_statistics(historical_data)
+        latest_year, missing_years, confidence_score = firestore_service.compute_cache_metadata(statistics, date)
+        cache_status = "miss"
+
+    return {
+        "cache_status": cache_status,
+        "cached": cached_data,
+        "statistics": statistics,
+        "confidence_score": confidence_score,
+        "missing_data_alert": firestore_service.get_missing_data_alert(missing_years, statistics['data_years_count']),
+        "historical_data": historical_data,
+        "latest_year": latest_year,
+        "missing_years": missing_years,
+    }
+
+
+def build_verification_block(verification_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Response representation of a verification result"""
+    block = {
+        "status": verification_result['status'],
+        "confidence": verification_result['confidence'],
+        "summary": verification_agent_instance.get_verification_summary(verification_result)
+    }
+    # Add detailed verification info if there are anomalies
+    if verification_result.get('anomalies'):
+        block["anomalies"] = verification_result['anomalies']
+        block["notes"] = verification_result.get('validation_notes', '')
+    return block
+
+
+async def _timed_stage(name: str, coroutine) -> tuple:
+    # "verification:2024-06-15" -> span "verification" with a date attribute
+    stage, _, date = name.partition(":")
+    with tracing.span(stage, date=date or None):
+        started = time.perf_counter()
+        result = await coroutine
+        return result, (time.perf_counter() - started) * 1000
+
+
+async def run_llm_stages(
+    stages: Dict[str, Any],
+    deadline_seconds: float = LLM_DEADLINE_SECONDS
+) -> tuple:
+    """
+    Runs the AI stages concurrently under one end-to-end deadline.
+    Stages still running at the deadline are cancelled and their result omitted.
+
+    Args:
+        stages (dict): stage name -> coroutine
+        deadline_seconds (float): Budget for all stages together
+
+    Returns:
+        (results: dict name -> result or None, report: dict name -> {status, ms})
+    """
+    if not stages:
+        return {}, {}
+
+    started = time.perf_counter()
+    tasks = {name: asyncio.create_task(_timed_stage(name, coroutine)) for name, coroutine in stages.items()}
+    await asyncio.wait(tasks.values(), timeout=deadline_seconds)
+
+    results, report = {}, {}
+    for name, task in tasks.items():
+        if not task.done():
+            task.cancel()
+            results[name] = None
+            report[name] = {"status": "timeout", "ms": round((time.perf_counter() - started) * 1000, 1)}
+            logger.warning("%s stage missed the %ss deadline, omitting it", name, deadline_seconds)
+        elif task.exception() is not None:
+            results[name] = None
+            report[name] = {"status": "error", "error": str(task.exception())}
+            logger.warning("%s stage failed: %s", name, task.exception())
+        else:
+            result, elapsed_ms = task.result()
+            results[name] = result
+            report[name] = {"status": "ok" if result is not None else "unavailable", "ms": round(elapsed_ms, 1)}
+
+    return results, report
+
+
+def _verification_stage(resolved: Dict[str, Any], lat: float, lon: float, date: str, allow_llm: bool = True):
+    """Verification coroutine for freshly computed statistics, or None on cache hits"""
+    if resolved["cache_status"] not in ("miss", "updated"):
+        return None
+
+    # STAGE 1: VERIFICATION OF STATISTICS (rule-based, Gemini only on anomalies)
+    logger.debug("Stage 1: verifying statistical calculations")
+    return verification_agent_instance.verify_statistics_async(
+        statistics=resolved["statistics"],
+        location={"lat": lat, "lon": lon},
+        date=date,
+        climatology=resolved["historical_data"].attrs.get("neighbour_climatology"),
+        allow_llm=allow_llm
+    )
+
+
+async def _save_new_prediction(
+    resolved: Dict[str, Any],
+    lat: float,
+    lon: float,
+    date: str,
+    verification_result: Optional[Dict[str, Any]]
+):
+    """Saves a cache miss with its verification status (insights live in the insight cache)"""
+    if resolved["cache_status"] != "miss":
+        return
+
+    statistics = resolved["statistics"]
+    with tracing.span("cache.write", operation="save"):
+        await firestore_service.save_prediction_to_cache_async(
+            lat, lon, date,
+            statistics,
+            statistics['years_analyzed'],
+            statistics['data_years_count'],
+            resolved["latest_year"],
+            resolved["missing_years"],
+            resolved["confidence_score"],
+            verification_result=verification_result,  # Save verification metadata
+            historical_data=resolved["historical_data"]
+        )
+
+
+def _base_response(
+    resolved: Dict[str, Any],
+    lat: float,
+    lon: float,
+    date: str,
+    already_passed: Optional[bool]
+) -> Dict[str, Any]:
+    """Statistics part of a prediction response (available before any AI stage)"""
+    response = {
+        "query": {"lat": lat, "lon": lon, "date": date, "place_name": geocoder.resolve_place_name(lat, lon)},
+        "statistics": resolved["statistics"],
+        "confidence_score": round(resolved["confidence_score"], 2),
+        "cache_status": resolved["cache_status"],
+        "missing_data_alert": resolved["missing_data_alert"]
+    }
+
+    if resolved.get("warning"):
+        response["warning"] = resolved["warning"]
+
+    if already_passed is not None:
+        response["server_already_passed"] = bool(already_passed)
+
+    return response
+
+
+async def _insight_lookup(
+    resolved: Dict[str, Any],
+    lat: float,
+    lon: float,
+    date: str,
+    activity: Optional[str],
+    part_of_day: Optional[str],
+    already_passed: Optional[bool]
+) -> tuple:
+    """
+    Looks up the insight for this prompt context (activity, part of day, tense, ...).
+
+    Returns:
+        (cached insight or None, insight cache key, insight context)
+    """
+    context = insight_cache.build_context(
+        lat, lon, date, resolved["statistics"], resolved["confidence_score"],
+        activity, part_of_day, already_passed
+    )
+    key = insight_cache.insight_key(context)
+    ai_insight = await insight_cache.get_insight_async(key)
+    CACHE_REQUESTS.labels("insight", "hit" if ai_insight else "miss").inc()
+    return ai_insight, key, context
+
+
+def _pipeline_status(stage_report: Dict[str, Any]) -> Dict[str, Any]:
+    if not stage_report:
+        return {}
+    timed_out = [name for name, stage in stage_report.items() if stage["status"] == "timeout"]
+    status = {"pipeline_status": "partial" if timed_out else "complete"}
+    if timed_out:
+        status["omitted_stages"] = timed_out
+    return status
+
+
+async def _generate_deferred_insight(key: str, context: Dict[str, str], generation) -> Optional[Dict[str, Any]]:
+    # Outlives the request that started it, so it gets its own trace
+    with tracing.span("insight", new_trace=True, deferred=True, insight_key=key):
+        try:
+            ai_insight = await generation
+        except Exception as e:
+            logger.error("Deferred insight generation failed: %s", e)
+            ai_insight = None
+
+        if ai_insight:
+            await insight_cache.save_insight_async(key, ai_insight, context)
+        else:
+            await insight_cache.set_generation_status_async(key, "failed")
+        return ai_insight
+
+
+async def defer_insight_generation(key: str, context: Dict[str, str], generation) -> str:
+    """
+    Generates an insight in a background task (one task per insight key per
+    worker), recording it as pending so that polls reaching any worker see it.
+
+    Args:
+        key: Insight cache key, also the token clients poll with
+        context: insight_cache.build_context output
+        generation: Coroutine producing the insight
+
+    Returns:
+        str: The token
+    """
+    if key in _insight_tasks:
+        generation.close()
+        return key
+
+    task = asyncio.create_task(_generate_deferred_insight(key, context, generation))
+    _insight_tasks[key] = task
+    task.add_done_callback(lambda _: _insight_tasks.pop(key, None))
+    # Before the token reaches the client, which may poll another worker
+    await insight_cache.set_generation_status_async(key, "pending")
+    return key
+
+
+async def _wait_for_shared_insight(token: str, timeout: float) -> Optional[Dict[str, Any]]:
+    """Long-polls the insight cache while another worker generates the insight"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(min(INSIGHT_POLL_INTERVAL_SECONDS, max(0.0, deadline - time.perf_counter())))
+        ai_insight = await insight_cache.get_insight_async(token)
+        if ai_insight:
+            return ai_insight
+        if await insight_cache.get_generation_status_async(token) != "pending":
+            return None
+    return None
+
+
+async def get_deferred_insight(token: str, wait: float = 0) -> Dict[str, Any]:
+    """
+    Looks up a deferred insight, optionally waiting for it to finish. Works
+    from any worker: generation started elsewhere is seen through the shared
+    status and insight cache tiers.
+
+    Args:
+        token: insight_pending token from a deferred /predict response
+        wait: Seconds to long-poll while generation is still running
+
+    Returns:
+        dict: status 'ready' (with ai_insight), 'pending', 'failed' or 'unknown'
+    """
+    ai_insight = await insight_cache.get_insight_async(token)
+    if ai_insight:
+        return {"status": "ready", "ai_insight": ai_insight}
+
+    task = _insight_tasks.get(token)
+    status = "pending" if task is not None else await insight_cache.get_generation_status_async(token)
+    if status == "pending" and wait > 0:
+        timeout = min(wait, INSIGHT_MAX_WAIT_SECONDS)
+        if task is not None:
+            # shield: a client giving up must not cancel generation for everyone else
+            await asyncio.wait({asyncio.shield(task)}, timeout=timeout)
+            ai_insight = await insight_cache.get_insight_async(token)
+        else:
+            ai_insight = await _wait_for_shared_insight(token, timeout)
+        if ai_insight:
+            return {"status": "ready", "ai_insight": ai_insight}
+        status = "pending" if token in _insight_tasks else await insight_cache.get_generation_status_async(token)
+
+    if status in ("pending", "failed"):
+        return {"status": status}
+    return {"status": "unknown"}
+
+
+async def run_prediction(
+    lat: float,
+    lon: float,
+    date: str,
+    activity: Optional[str] = None,
+    part_of_day: Optional[str] = None,
+    already_passed: Optional[bool] = None,
+    debug: Optional[str] = None,
+    defer_insight: bool = False
+) -> Dict[str, Any]:
+    """
+    Runs the full prediction pipeline for one query.
+    
+    debug='timing' adds a debug block with per-stage AI timings.
+    defer_insight=True returns without waiting for the AI insight: the response
+    carries an 'insight_pending' token for /predict/insight/{token} instead.
+
+    Raises:
+        ValueError: Invalid coordinates/date or location rejected by NASA POWER (LocationRejected)
+        LookupError: No historical data for this location/date
+        nasa_data_handler.UpstreamUnavailable: NASA POWER timed out for every year range
+    """
+    resolved = await resolve_statistics(lat, lon, date)
+    return await complete_prediction(
+        resolved, lat, lon, date, activity, part_of_day, already_passed, debug, defer_insight
+    )
+
+
+async def complete_prediction(
+    resolved: Dict[str, Any],
+    lat: float,
+    lon: float,
+    date: str,
+    activity: Optional[str] = None,
+    part_of_day: Optional[str] = None,
+    already_passed: Optional[bool] = None,
+    debug: Optional[str] = None,
+    defer_insight: bool = False,
+    skip_llm: bool = False,
+    save: bool = True,
+    shared_verification: Optional[asyncio.Future] = None
+) -> Dict[str, Any]:
+    """
+    Runs the stages after resolve_statistics (verification, AI insight, cache
+    write) and builds the response.
+
+    skip_llm=True keeps verification rule-based and only returns insights that
+    are already cached. save=False leaves the cache write to another caller
+    sharing the same resolved statistics. shared_verification is a task
+    already verifying these statistics for another caller: it is awaited
+    (under this call's deadline, without cancelling it) instead of verifying
+    again.
+    """
+    cached_data = resolved["cached"]
+
+    verification_result = None
+    stages = {}
+
+    if shared_verification is not None:
+        stages["verification"] = asyncio.shield(shared_verification)
+    else:
+        verification = _verification_stage(resolved, lat, lon, date, allow_llm=not skip_llm)
+        if verification is not None:
+            stages["verification"] = verification
+        elif cached_data:
+            verification_result = cached_data.get('verification')
+
+    ai_insight, insight_key, insight_context = await _insight_lookup(
+        resolved, lat, lon, date, activity, part_of_day, already_passed
+    )
+    insight_cache_status = "hit" if ai_insight else "miss"
+
+    insight_pending = None
+    needs_insight = not ai_insight and resolved["cache_status"] != "hit_stale"
+    # Without Gemini there is nothing to defer (a pending token would never resolve)
+    if (defer_insight and not reasoning_agent.enabled) or skip_llm:
+        needs_insight = False
+
+    if needs_insight:
+        # STAGE 2: AI INSIGHT GENERATION (runs concurrently with verification)
+        logger.debug("Stage 2: generating human-readable insight")
+        generation = reasoning_agent.generate_insight_async(
+            lat, lon, date,
+            resolved["statistics"],
+            resolved["confidence_score"],
+            resolved["missing_data_alert"],
+            activity,
+            part_of_day=part_of_day,
+            already_passed=already_passed,
+            place_name=geocoder.resolve_place_name(lat, lon)
+        )
+        if defer_insight:
+            insight_pending = await defer_insight_generation(insight_key, insight_context, generation)
+        else:
+            stages["insight"] = generation
+
+    results, stage_report = await run_llm_stages(stages)
+    if "verification" in stages:
+        verification_result = results["verification"]
+        # Check if verification flagged any issues
+        if verification_result and not verification_result.get('is_valid', True):
+            logger.warning("Verification flagged anomalies: %s", verification_result.get('anomalies', []))
+    if "insight" in stages:
+        ai_insight = results["insight"]
+        if ai_insight:
+            await insight_cache.save_insight_async(insight_key, ai_insight, insight_context)
+
+    if save:
+        await _save_new_prediction(resolved, lat, lon, date, verification_result)
+
+    response = _base_response(resolved, lat, lon, date, already_passed)
+
+    if verification_result:
+        response["verification"] = build_verification_block(verification_result)
+
+    if ai_insight:
+        response["ai_insight"] = ai_insight
+    elif insight_pending:
+        response["insight_pending"] = insight_pending
+
+    response.update(_pipeline_status(stage_report))
+
+    if debug == "timing":
+        tracing.request_server_timing()
+        response["debug"] = {
+            "llm_deadline_seconds": LLM_DEADLINE_SECONDS,
+            "llm_stages": stage_report,
+            "insight_cache": insight_cache_status,
+            "trace_id": tracing.current_trace_id(),
+            "stages": tracing.timing_breakdown(),
+        }
+
+    return response
+
+
+def expand_date_range(start_date: str, end_date: str, max_days: int = RANGE_MAX_DAYS) -> List[str]:
+    """
+    Lists the YYYY-MM-DD dates from start_date to end_date (inclusive).
+
+    Raises:
+        ValueError: Invalid dates, end before start, or more than max_days days
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    days = (end - start).days + 1
+    if days < 1:
+        raise ValueError("end_date must not be before start_date")
+    if days > max_days:
+        raise ValueError(f"Date range too long ({days} days, at most {max_days})")
+    return [(start + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(days)]
+
+
+async def run_range_prediction(
+    lat: float,
+    lon: float,
+    dates: List[str],
+    activity: Optional[str] = None,
+    part_of_day: Optional[str] = None,
+    timezone: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Runs the prediction pipeline for several dates of one location. Dates are
+    resolved concurrently (at most BATCH_CONCURRENCY at once, with NASA POWER
+    downloads bounded per worker as usual); insights missing from the insight
+    cache are then generated together in one batched Gemini call,
+    concurrently with verification.
+
+    Raises:
+        ValueError: Invalid coordinates/date or location rejected by NASA POWER (LocationRejected)
+        LookupError: No historical data for one of the dates
+        nasa_data_handler.UpstreamUnavailable: NASA POWER timed out for every year range
+    """
+    # Cold dates each wait on NASA POWER: resolve them together, as batches do
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def resolve_day(date: str) -> Dict[str, Any]:
+        async with semaphore:
+            resolved = await resolve_statistics(lat, lon, date)
+            already_passed = compute_already_passed(date, timezone, part_of_day)
+            ai_insight, insight_key, insight_context = await _insight_lookup(
+                resolved, lat, lon, date, activity, part_of_day, already_passed
+            )
+        return {
+            "date": date,
+            "resolved": resolved,
+            "already_passed": already_passed,
+            "ai_insight": ai_insight,
+            "insight_key": insight_key,
+            "insight_context": insight_context,
+            "verification": None if resolved["cache_status"] in ("miss", "updated")
+            else (resolved["cached"] or {}).get('verification'),
+        }
+
+    tasks = [asyncio.create_task(resolve_day(date)) for date in dates]
+    try:
+        days = await asyncio.gather(*tasks)
+    except BaseException:
+        # One failed date (or a cancelled request) stops the others
+        for task in tasks:
+            task.cancel()
+        raise
+
+    stages = {}
+    for day in days:
+        verification = _verification_stage(day["resolved"], lat, lon, day["date"])
+        if verification is not None:
+            stages[f"verification:{day['date']}"] = verification
+
+    pending = [day for day in days if not day["ai_insight"] and day["resolved"]["cache_status"] != "hit_stale"]
+    if pending:
+        logger.info("Generating insights for %d date(s) in one batch", len(pending))
+        stages["insights"] = reasoning_agent.generate_insights_batch(
+            lat, lon,
+            [
+                {
+                    "date_str": day["date"],
+                    "statistics": day["resolved"]["statistics"],
+                    "confidence_score": day["resolved"]["confidence_score"],
+                    "missing_data_alert": day["resolved"]["missing_data_alert"],
+                    "already_passed": day["already_passed"],
+                }
+                for day in pending
+            ],
+            activity=activity,
+            part_of_day=part_of_day,
+            place_name=geocoder.resolve_place_name(lat, lon)
+        )
+
+    results, stage_report = await run_llm_stages(stages)
+    for day, ai_insight in zip(pending, results.get("insights") or []):
+        if ai_insight:
+            day["ai_insight"] = ai_insight
+            await insight_cache.save_insight_async(day["insight_key"], ai_insight, day["insight_context"])
+
+    responses = []
+    for day in days:
+        stage = f"verification:{day['date']}"
+        if stage in stages:
+            day["verification"] = results[stage]
+        await _save_new_prediction(day["resolved"], lat, lon, day["date"], day["verification"])
+
+        response = _base_response(day["resolved"], lat, lon, day["date"], day["already_passed"])
+        if day["verification"]:
+            response["verification"] = build_verification_block(day["verification"])
+        if day["ai_insight"]:
+            response["ai_insight"] = day["ai_insight"]
+        responses.append(response)
+
+    return {
+        "query": {
+            "lat": lat, "lon": lon, "start_date": dates[0], "end_date": dates[-1],
+            "place_name": geocoder.resolve_place_name(lat, lon),
+        },
+        "days": responses,
+        **_pipeline_status(stage_report),
+    }
+
+
+def batch_error(error: Exception) -> Dict[str, Any]:
+    """Per-item error of a batch prediction: HTTP-style status code plus a stable error code"""
+    if isinstance(error, nasa_data_handler.LocationRejected):
+        status_code, code = 400, "location_rejected"
+    elif isinstance(error, ValueError):
+        status_code, code = 400, "invalid_request"
+    elif isinstance(error, LookupError):
+        status_code, code = 404, "no_data"
+    elif isinstance(error, (nasa_data_handler.UpstreamUnavailable, httpx.HTTPError)):
+        status_code, code = 502, "upstream_error"
+    else:
+        status_code, code = 500, "internal_error"
+    return {"status_code": status_code, "code": code, "detail": str(error)}
+
+
+def _snap_batch_item(item: Dict[str, Any]) -> tuple:
+    """
+    Validates a batch item and snaps it to the cache grid.
+
+    Returns:
+        (lat, lon, date, cache_key) with lat/lon rounded like the cache keys
+
+    Raises:
+        ValueError: Coordinates out of range or invalid date
+    """
+    lat, lon, date = item["lat"], item["lon"], item["date"]
+    if not (-90 <= lat <= 90):
+        raise ValueError(f"Invalid latitude: {lat}. Must be between -90 and 90.")
+    if not (-180 <= lon <= 180):
+        raise ValueError(f"Invalid longitude: {lon}. Must be between -180 and 180.")
+    try:
+        month, day = firestore_service.extract_month_day(date)
+    except ValueError:
+        raise ValueError(f"Invalid date format: {date}. Expected YYYY-MM-DD.")
+    return round(lat, 2), round(lon, 2), date, firestore_service.generate_cache_key(lat, lon, month, day)
+
+
+async def run_batch_prediction(
+    items: List[Dict[str, Any]],
+    activity: Optional[str] = None,
+    part_of_day: Optional[str] = None,
+    timezone: Optional[str] = None,
+    skip_llm: bool = False
+) -> Dict[str, Any]:
+    """
+    Predicts many (lat, lon, date) items in one call.
+
+    Items are snapped to the cache grid and deduplicated, cache hits come from
+    one batched read, and misses are computed concurrently (BATCH_CONCURRENCY
+    at a time, NASA requests additionally limited per worker). Every item gets
+    its own result or error, so one bad venue does not fail the batch.
+
+    Args:
+        items: Dicts with lat, lon and date
+        skip_llm: Rule-based verification only, and no insight generation
+
+    Returns:
+        dict with results (one per item, in order) and a summary
+
+    Raises:
+        ValueError: More than BATCH_MAX_ITEMS items
+    """
+    if len(items) > BATCH_MAX_ITEMS:
+        raise ValueError(f"Too many items ({len(items)}, at most {BATCH_MAX_ITEMS})")
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    units: Dict[tuple, Dict[str, Any]] = {}
+    for index, item in enumerate(items):
+        try:
+            lat, lon, date, cache_key = _snap_batch_item(item)
+        except ValueError as e:
+            results[index] = {
+                "index": index,
+                "status": "error",
+                "error": {"status_code": 400, "code": "invalid_request", "detail": str(e)},
+            }
+            continue
+        unit = units.setdefault((cache_key, date), {
+            "lat": lat, "lon": lon, "date": date, "cache_key": cache_key, "indices": []
+        })
+        unit["indices"].append(index)
+
+    # Statistics are resolved once per cache key: every date of a cell and
+    # month-day shares them, and the first such unit writes the cache
+    owners: Dict[str, Dict[str, Any]] = {}
+    for unit in units.values():
+        owners.setdefault(unit["cache_key"], unit)
+
+    cached = await firestore_service.get_predictions_from_cache_async(list(owners))
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def resolve(unit: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            return await resolve_cached_statistics(cached.get(unit["cache_key"]), unit["lat"], unit["lon"], unit["date"])
+
+    resolutions = dict(zip(owners, await asyncio.gather(
+        *(resolve(unit) for unit in owners.values()), return_exceptions=True
+    )))
+
+    # Likewise verification: it checks the statistics, which units of one
+    # cache key share, so it runs once and only the insight is per date
+    verifications: Dict[str, asyncio.Task] = {}
+    for cache_key, owner in owners.items():
+        resolved = resolutions[cache_key]
+        if isinstance(resolved, BaseException):
+            continue
+        verification = _verification_stage(resolved, owner["lat"], owner["lon"], owner["date"], allow_llm=not skip_llm)
+        if verification is not None:
+            verifications[cache_key] = asyncio.create_task(verification)
+
+    async def complete(unit: Dict[str, Any]) -> Dict[str, Any]:
+        resolved = resolutions[unit["cache_key"]]
+        if isinstance(resolved, BaseException):
+            raise resolved
+        async with semaphore:
+            return await complete_prediction(
+                resolved, unit["lat"], unit["lon"], unit["date"],
+                activity=activity,
+                part_of_day=part_of_day,
+                already_passed=compute_already_passed(unit["date"], timezone, part_of_day),
+                skip_llm=skip_llm,
+                save=owners[unit["cache_key"]] is unit,
+                shared_verification=verifications.get(unit["cache_key"])
+            )
+
+    try:
+        outcomes = await asyncio.gather(*(complete(unit) for unit in units.values()), return_exceptions=True)
+    finally:
+        # Verifications every unit gave up on (deadline) must not outlive the request
+        for task in verifications.values():
+            task.cancel()
+
+    cache_statuses: Dict[str, int] = {}
+    for unit, outcome in zip(units.values(), outcomes):
+        if isinstance(outcome, BaseException) and not isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, Exception):
+            logger.warning("Batch item %s (%s) failed: %s", unit['cache_key'], unit['date'], outcome)
+            entry = {"status": "error", "error": batch_error(outcome)}
+        else:
+            cache_statuses[outcome["cache_status"]] = cache_statuses.get(outcome["cache_status"], 0) + 1
+            entry = {"status": "ok", "prediction": outcome}
+        for index in unit["indices"]:
+            results[index] = {"index": index, **entry}
+
+    failed = sum(result["status"] == "error" for result in results)
+    return {
+        "results": results,
+        "summary": {
+            "items": len(items),
+            "unique": len(units),
+            "ok": len(items) - failed,
+            "errors": failed,
+            "cache_status": cache_statuses,
+            "llm_skipped": skip_llm,
+        },
+    }
+
+
+async def stream_prediction(
+    resolved: Dict[str, Any],
+    lat: float,
+    lon: float,
+    date: str,
+    activity: Optional[str] = None,
+    part_of_day: Optional[str] = None,
+    already_passed: Optional[bool] = None,
+    deadline_seconds: float = LLM_DEADLINE_SECONDS
+):
+    """
+    Streaming variant of run_prediction for already resolved statistics.
+
+    Yields (event, data) pairs:
+        statistics     - the statistics part of the response, immediately
+        insight_token  - {"text": chunk} as the AI insight is generated
+        insight        - the complete insight, when it came from the insight cache
+        done           - verification block and pipeline status
+    """
+    started = time.perf_counter()
+    deadline = started + deadline_seconds
+    cached_data = resolved["cached"]
+
+    verification_task = None
+    verification_result = None
+    stage_report = {}
+
+    verification = _verification_stage(resolved, lat, lon, date)
+    if verification is not None:
+        verification_task = asyncio.create_task(_timed_stage("verification", verification))
+    elif cached_data:
+        verification_result = cached_data.get('verification')
+
+    try:
+        yield "statistics", _base_response(resolved, lat, lon, date, already_passed)
+
+        ai_insight, insight_key, insight_context = await _insight_lookup(
+            resolved, lat, lon, date, activity, part_of_day, already_passed
+        )
+
+        if ai_insight:
+            yield "insight", ai_insight
+        elif resolved["cache_status"] != "hit_stale":
+            # STAGE 2: AI INSIGHT GENERATION, streamed while verification runs
+            chunks = []
+            status = "ok"
+            stream = reasoning_agent.generate_insight_stream_async(
+                lat, lon, date,
+                resolved["statistics"],
+                resolved["confidence_score"],
+                resolved["missing_data_alert"],
+                activity,
+                part_of_day=part_of_day,
+                already_passed=already_passed,
+                place_name=geocoder.resolve_place_name(lat, lon)
+            )
+            try:
+                while True:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), timeout=remaining)
+                    except StopAsyncIteration:
+                        break
+                    chunks.append(chunk)
+                    yield "insight_token", {"text": chunk}
+            except asyncio.TimeoutError:
+                status = "timeout"
+                logger.warning("insight stream missed the %ss deadline, stopping it", deadline_seconds)
+            except Exception as e:
+                status = "error"
+                logger.error("Failed to stream AI insight: %s", e)
+            finally:
+                await stream.aclose()
+
+            if status == "ok" and not chunks:
+                status = "unavailable"
+            stage_report["insight"] = {"status": status, "ms": round((time.perf_counter() - started) * 1000, 1)}
+
+            # Partial insights are streamed but never cached
+            if status == "ok":
+                await insight_cache.save_insight_async(
+                    insight_key, reasoning_agent.make_insight("".join(chunks).strip()), insight_context
+                )
+
+        if verification_task is not None:
+            done, _ = await asyncio.wait({verification_task}, timeout=max(0.0, deadline - time.perf_counter()))
+            if not done:
+                verification_task.cancel()
+                stage_report["verification"] = {"status": "timeout", "ms": round((time.perf_counter() - started) * 1000, 1)}
+                logger.warning("verification stage missed the %ss deadline, omitting it", deadline_seconds)
+            elif verification_task.exception() is not None:
+                stage_report["verification"] = {"status": "error", "error": str(verification_task.exception())}
+                logger.warning("verification stage failed: %s", verification_task.exception())
+            else:
+                verification_result, elapsed_ms = verification_task.result()
+                stage_report["verification"] = {
+                    "status": "ok" if verification_result is not None else "unavailable",
+                    "ms": round(elapsed_ms, 1)
+                }
+    finally:
+        # Client disconnects close the generator early: still keep the statistics
+        # (shielded, so the write is not cancelled along with the request)
+        if verification_task is not None and not verification_task.done():
+            verification_task.cancel()
+            await asyncio.wait({verification_task})
+            # Cancelled before its first step: the stage coroutine never ran
+            verification.close()
+        await asyncio.shield(_save_new_prediction(resolved, lat, lon, date, verification_result))
+
+    final = {}
+    if verification_result:
+        final["verification"] = build_verification_block(verification_result)
+    final.update(_pipeline_status(stage_report))
+    yield "done", final
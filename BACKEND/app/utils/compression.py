@@ -0,0 +1,161 @@
+"""
+Response compression
+ASGI middleware that compresses complete (non-streamed) responses above a
+size threshold with the best encoding the client accepts: brotli when the
+optional `brotli` package is installed, otherwise gzip.
+
+Streamed responses (SSE from /predict/stream) pass through untouched, so
+events are never held back in a compression buffer. Every response that
+could be compressed carries Vary: Accept-Encoding, compressed or not, and a
+304 repeats the Vary and ETag of the representation it revalidates.
+"""
+
+import os
+import gzip
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+
+def available_encodings() -> tuple:
+    """Encodings this process can produce, most preferred first"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Picks the response encoding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding (str): e.g. "gzip, deflate, br;q=0.9"
+
+    Returns:
+        "br", "gzip" or None (send identity)
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _encoded_etag(etag: str, encoding: str) -> str:
+    """Strong ETag of the encoded representation (responses.etag_matches strips the suffix)"""
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _revalidated_variant(headers: MutableHeaders, request_headers: Headers, encoding: Optional[str]):
+    """
+    Makes a 304 repeat the validators of the 200 it stands for: Vary, and the
+    encoded ETag when the client revalidated the compressed representation.
+    """
+    etag = headers.get("etag")
+    if not etag:
+        return
+    headers.add_vary_header("Accept-Encoding")
+    if encoding and etag.endswith('"') and not etag.startswith("W/"):
+        encoded = _encoded_etag(etag, encoding)
+        if encoded in request_headers.get("if-none-match", ""):
+            headers["ETag"] = encoded
+
+
+class CompressionMiddleware:
+    """
+    Compresses single-message responses of at least minimum_size bytes
+    (COMPRESSION_MIN_SIZE when not given)
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""))
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                if message["status"] == 304:
+                    _revalidated_variant(MutableHeaders(raw=message["headers"]), request_headers, encoding)
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or headers.get("content-type", "").startswith("text/event-stream")
+                or len(body) < (COMPRESSION_MIN_SIZE if self.minimum_size is None else self.minimum_size)
+            ):
+                # Streamed, already encoded or too small to be worth it
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            # The body depends on Accept-Encoding even when this client gets it
+            # as is: a shared cache must not serve the identity body to everyone
+            headers.add_vary_header("Accept-Encoding")
+            if encoding is None:
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            # Encoded bytes differ, so a strong ETag must too
+            etag = headers.get("etag")
+            if etag and etag.endswith('"') and not etag.startswith("W/"):
+                headers["ETag"] = _encoded_etag(etag, encoding)
+            headers["Content-Length"] = str(len(compressed))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,435 @@
+"""
+Metrics
+In-process counters and histograms, rendered in the Prometheus text format
+by GET /metrics. Modules declare their metrics at import time:
+
+    CHUNK_SECONDS = metrics.histogram("nasa_chunk_duration_seconds", "...", ["outcome"])
+    CHUNK_SECONDS.labels("ok").observe(elapsed)
+
+Recording a sample is a dict lookup and an addition under a lock. With
+several worker processes (METRICS_DIR set, as in the production profile)
+each process writes its samples to that directory every
+METRICS_FLUSH_SECONDS and /metrics adds up the files of all processes.
+Counters and histograms of exited processes are folded into one archive file
+(archive_process, called by gunicorn's child_exit hook) so totals do not go
+backwards when a worker is recycled; their gauges are dropped.
+"""
+
+import os
+import glob
+import json
+import time
+import asyncio
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+METRIC_PREFIX = "willitrain_"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; upstream calls (NASA POWER, Gemini, Firestore)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Seconds; in-process work (memory cache lookups, statistics)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> float:
+        return self.value
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        # One count per bucket (not cumulative) plus the +Inf bucket
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observes the duration of the with-block in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"counts": list(self.counts), "sum": self.sum}
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Child for one combination of label values (in labelnames order)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(tuple(str(value) for value in values), self._new_child())
+        return child
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "samples": {
+                json.dumps(key): child.snapshot()
+                for key, child in list(self._children.items())
+            },
+        }
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**super().snapshot(), "buckets": list(self.buckets)}
+
+
+class Registry:
+    """Metrics of this process, plus collectors called at scrape time for values kept elsewhere"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Adds a metric; registering a name again returns the existing metric"""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]):
+        """
+        Adds a callable returning (name, type, help, labels, value) samples, for
+        values other modules already track (e.g. LLM queue depth).
+        """
+        self._collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serialisable samples of every metric and collector"""
+        snapshot = {name: metric.snapshot() for name, metric in list(self._metrics.items())}
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                logger.warning("Metrics collector failed: %s", e)
+                continue
+            for name, kind, documentation, labels, value in samples:
+                entry = snapshot.setdefault(name, {
+                    "type": kind, "help": documentation, "labelnames": list(labels), "samples": {}
+                })
+                key = json.dumps([str(labels[label]) for label in entry["labelnames"]])
+                entry["samples"][key] = entry["samples"].get(key, 0) + value
+        return snapshot
+
+    def clear(self):
+        """Forgets every recorded sample (metrics stay registered)"""
+        for metric in list(self._metrics.values()):
+            with metric._lock:
+                metric._children.clear()
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    """Registers a counter (the name gets METRIC_PREFIX, and should end in _total)"""
+    return REGISTRY.register(Counter(METRIC_PREFIX + name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+    """Registers a histogram (the name gets METRIC_PREFIX)"""
+    return REGISTRY.register(Histogram(METRIC_PREFIX + name, documentation, labelnames, buckets))
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Adds up the samples of several processes' snapshots"""
+    merged: Dict[str, Any] = {}
+    for snapshot in snapshots:
+        for name, entry in snapshot.items():
+            target = merged.get(name)
+            if target is None:
+                merged[name] = json.loads(json.dumps(entry))
+                continue
+            for key, sample in entry["samples"].items():
+                existing = target["samples"].get(key)
+                if existing is None:
+                    target["samples"][key] = sample
+                elif isinstance(sample, dict):
+                    existing["counts"] = [a + b for a, b in zip(existing["counts"], sample["counts"])]
+                    existing["sum"] += sample["sum"]
+                else:
+                    target["samples"][key] = existing + sample
+    return merged
+
+
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(METRICS_DIR, f"metrics-{pid}.json")
+
+
+def _archive_path() -> str:
+    return os.path.join(METRICS_DIR, "metrics-archive.json")
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def write_snapshot() -> bool:
+    """Writes this process's samples to METRICS_DIR (atomically)"""
+    if not METRICS_DIR:
+        return False
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        _write_json(_snapshot_path(os.getpid()), REGISTRY.snapshot())
+        return True
+    except OSError as e:
+        logger.warning("Could not write metrics snapshot: %s", e)
+        return False
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _without_gauges(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """Counters and histograms only: gauges of an exited process no longer describe anything"""
+    return {name: entry for name, entry in snapshot.items() if entry["type"] != "gauge"}
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _read_archive() -> Dict[str, Any]:
+    """{"pids": processes whose samples are in "metrics" but whose files may still exist, "metrics": snapshot}"""
+    archive = _read_json(_archive_path())
+    if not isinstance(archive, dict) or "metrics" not in archive:
+        return {"pids": [], "metrics": {}}
+    return archive
+
+
+def archive_process(pid: int) -> bool:
+    """
+    Folds the counters and histograms of an exited process into the archive
+    file and deletes its snapshot, so METRICS_DIR does not grow with every
+    recycled worker. Meant to be called by one process at a time (the
+    gunicorn master).
+
+    Args:
+        pid: Process ID of the exited worker
+
+    Returns:
+        bool: True if a snapshot was archived
+    """
+    if not METRICS_DIR:
+        return False
+    path = _snapshot_path(pid)
+    snapshot = _read_json(path)
+    if snapshot is None:
+        return False
+    archive = _read_archive()
+    try:
+        # Readers skip the snapshots of pids listed in the archive, so nothing
+        # is counted twice between the two steps below
+        _write_json(_archive_path(), {
+            "pids": [pid] + [other for other in archive["pids"] if os.path.exists(_snapshot_path(other))],
+            "metrics": merge_snapshots([archive["metrics"], _without_gauges(snapshot)]),
+        })
+        os.remove(path)
+        return True
+    except OSError as e:
+        logger.warning("Could not archive metrics of process %s: %s", pid, e)
+        return False
+
+
+def _other_process_snapshots() -> List[Dict[str, Any]]:
+    if not METRICS_DIR:
+        return []
+    archive = _read_archive()
+    archived_pids = set(archive["pids"])
+    snapshots = [archive["metrics"]] if archive["metrics"] else []
+    for path in glob.glob(os.path.join(METRICS_DIR, "metrics-*.json")):
+        suffix = os.path.basename(path)[len("metrics-"):-len(".json")]
+        if not suffix.isdigit():
+            continue
+        pid = int(suffix)
+        if pid == os.getpid() or pid in archived_pids:
+            continue
+        snapshot = _read_json(path)
+        if snapshot is None:
+            continue
+        snapshots.append(snapshot if _pid_alive(pid) else _without_gauges(snapshot))
+    return snapshots
+
+
+async def flush_metrics_periodically(interval_seconds: float = METRICS_FLUSH_SECONDS):
+    """Background task: keeps this process's snapshot in METRICS_DIR current"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        await asyncio.to_thread(write_snapshot)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(labelnames: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+def render_snapshot(snapshot: Dict[str, Any]) -> str:
+    """Prometheus text exposition format (0.0.4)"""
+    lines = []
+    for name in sorted(snapshot):
+        entry = snapshot[name]
+        lines.append(f"# HELP {name} {entry['help']}")
+        lines.append(f"# TYPE {name} {entry['type']}")
+        labelnames = entry["labelnames"]
+        for key in sorted(entry["samples"]):
+            values = json.loads(key)
+            sample = entry["samples"][key]
+            if entry["type"] != "histogram":
+                lines.append(f"{name}{_label_text(labelnames, values)} {sample}")
+                continue
+            cumulative = 0
+            for bound, count in zip(entry["buckets"] + ["+Inf"], sample["counts"]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_bound(bound)
+                lines.append(f"{name}_bucket{_label_text(labelnames, values, ('le', le))} {cumulative}")
+            lines.append(f"{name}_sum{_label_text(labelnames, values)} {sample['sum']}")
+            lines.append(f"{name}_count{_label_text(labelnames, values)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def render() -> str:
+    """This process's metrics, added to those of the other processes sharing METRICS_DIR"""
+    return render_snapshot(merge_snapshots([REGISTRY.snapshot(), *_other_process_snapshots()]))
+
+
+HTTP_REQUESTS = counter("http_requests_total", "HTTP requests by route template and status", ["method", "route", "status"])
+HTTP_REQUEST_SECONDS = histogram("http_request_duration_seconds", "HTTP request latency by route template", ["method", "route"])
+
+
+class MetricsMiddleware:
+    """
+    Counts requests and times them by route template (/predict/insight/{token},
+    not the raw path, so label values stay bounded; unmatched paths are 'other').
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "other"
+            method = scope["method"]
+            HTTP_REQUESTS.labels(method, route, str(status[0])).inc()
+            HTTP_REQUEST_SECONDS.labels(method, route).observe(time.perf_counter() - started)
@@ -0,0 +1,163 @@
+"""
+Response serialization
+FastJSONResponse encodes with orjson (numpy scalars/arrays, datetimes and
+non-string keys handled natively). Routes that return it directly also skip
+FastAPI's jsonable_encoder pass over the payload.
+
+project_fields implements the `fields=` projection of prediction responses,
+cacheable_response the ETag / If-None-Match / Cache-Control handling.
+"""
+
+import hashlib
+from typing import Any, Dict, Iterable, Optional
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    """Types orjson does not know natively"""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "item"):  # numpy/pandas scalars not covered by OPT_SERIALIZE_NUMPY
+        return value.item()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serializes content the way FastJSONResponse does"""
+    return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (the app's default response class)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[list]:
+    """
+    Parses a `fields=` value ("statistics,ai_insight.reasoning").
+
+    Returns:
+        List of dotted paths, or None when no projection was requested
+    """
+    if not fields:
+        return None
+    paths = [path.strip() for path in fields.split(",") if path.strip()]
+    return paths or None
+
+
+def project_fields(payload: Dict[str, Any], paths: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """
+    Keeps only the given fields of a response. Each path is a top-level key
+    or a dotted path into nested objects; unknown paths are ignored.
+
+    Args:
+        payload (dict): Response to project
+        paths (list): Output of parse_fields (None returns payload unchanged)
+
+    Returns:
+        dict: New dict holding the selected fields
+    """
+    if paths is None:
+        return payload
+
+    projected: Dict[str, Any] = {}
+    for path in paths:
+        keys = path.split(".")
+        value = payload
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            target = projected
+            for key in keys[:-1]:
+                if not isinstance(target.get(key), dict):
+                    target[key] = {}
+                target = target[key]
+            target[keys[-1]] = value
+    return projected
+
+
+# Suffixes CompressionMiddleware adds to the ETag of an encoded representation
+_ENCODING_ETAG_SUFFIXES = ("-br", "-gzip")
+
+
+def compute_etag(payload: Dict[str, Any], exclude: Iterable[str] = ()) -> str:
+    """
+    Strong ETag of a response: digest of its content with sorted keys.
+
+    Args:
+        payload (dict): Response content
+        exclude (list): Top-level keys left out of the digest (per-request
+            diagnostics such as a fetch timestamp)
+
+    Returns:
+        str: Quoted entity tag
+    """
+    excluded = set(exclude)
+    content = {key: value for key, value in payload.items() if key not in excluded}
+    digest = hashlib.sha256(
+        orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS | orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match check (weak comparison, as RFC 9110 specifies for it).
+    Tags of compressed representations match their uncompressed tag.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        for suffix in _ENCODING_ETAG_SUFFIXES:
+            if candidate.endswith(f'{suffix}"'):
+                candidate = candidate[:-len(suffix) - 1] + '"'
+                break
+        if candidate == etag:
+            return True
+    return False
+
+
+def cacheable_response(
+    content: Dict[str, Any],
+    if_none_match: Optional[str],
+    cache_control: str,
+    etag_exclude: Iterable[str] = ()
+) -> Response:
+    """
+    Builds a response carrying an ETag and Cache-Control, or an empty 304
+    when the client already holds the same content.
+
+    Args:
+        content (dict): Response content
+        if_none_match (str): The request's If-None-Match header
+        cache_control (str): Cache-Control value for both 200 and 304; a
+            public one also gets Vary: Authorization, since these routes
+            require a bearer token
+        etag_exclude (list): See compute_etag
+
+    Returns:
+        FastJSONResponse or 304 Response
+    """
+    etag = compute_etag(content, etag_exclude)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if "public" in (directive.strip().lower() for directive in cache_control.split(",")):
+        # A shared cache must not hand one user's response to another
+        headers["Vary"] = "Authorization"
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(content, headers=headers)
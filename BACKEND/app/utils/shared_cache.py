@@ -0,0 +1,276 @@
+"""
+Cross-process cache shared by all worker processes on one host
+
+A SQLite file in WAL mode (readers never block the writer) holding pickled
+values per namespace, with per-entry expiry. TieredCache puts a per-process
+TTLCache in front of it, so hot keys never leave process memory while a
+value computed by one worker is a local read away for every other worker.
+Nothing tells a worker that another one replaced a value, so memory entries
+backed by the shared tier live at most SHARED_CACHE_MEMORY_TTL_SECONDS: an
+update (e.g. a refresh with a new NASA year) reaches every worker within that.
+
+Enabled by SHARED_CACHE_PATH (the production gunicorn profile sets it);
+without it every cache is process-local, as before. Code running on the
+event loop uses TieredCache.aget/aset/aget_many, which do the SQLite query
+and (un)pickling in a worker thread: a busy database must not stall the loop.
+"""
+
+import os
+import time
+import asyncio
+import pickle
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, Hashable, Iterable, Optional
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "")
+SHARED_CACHE_BUSY_TIMEOUT_SECONDS = float(os.getenv("SHARED_CACHE_BUSY_TIMEOUT_SECONDS", "2"))
+# Longest a worker serves a shared value from its own memory without re-reading it
+SHARED_CACHE_MEMORY_TTL_SECONDS = float(os.getenv("SHARED_CACHE_MEMORY_TTL_SECONDS", "30"))
+
+# Expired rows are deleted every this many writes
+_PRUNE_EVERY_WRITES = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+class SharedCache:
+    """
+    SQLite-backed key/value store for one namespace. Each process and thread
+    uses its own connection; errors are logged and treated as misses, since
+    every value can be recomputed or re-read from Firestore.
+    """
+
+    def __init__(self, path: str, namespace: str, ttl_seconds: float):
+        self.path = path
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork: reopen when the pid changes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=SHARED_CACHE_BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value, or default if missing, expired or unreadable"""
+        try:
+            row = self._connection().execute(
+                "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (self.namespace, str(key), time.time())
+            ).fetchone()
+            if row is None:
+                self._count("misses")
+                return default
+            value = pickle.loads(row[0])
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            logger.warning("Shared cache read failed (%s): %s", self.namespace, e)
+            self._count("errors")
+            return default
+        self._count("hits")
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, str(key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + ttl)
+            )
+            with self._lock:
+                self.writes += 1
+                prune = self.writes % _PRUNE_EVERY_WRITES == 0
+            if prune:
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        except (sqlite3.Error, pickle.PicklingError, TypeError) as e:
+            logger.warning("Shared cache write failed (%s): %s", self.namespace, e)
+            self._count("errors")
+
+    def delete(self, key: Hashable):
+        try:
+            self._connection().execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, str(key))
+            )
+        except sqlite3.Error as e:
+            logger.warning("Shared cache delete failed (%s): %s", self.namespace, e)
+            self._count("errors")
+
+    def clear(self):
+        try:
+            self._connection().execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+        except sqlite3.Error as e:
+            logger.warning("Shared cache clear failed (%s): %s", self.namespace, e)
+            self._count("errors")
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count of the namespace plus this process's hit/miss/write/error counters"""
+        try:
+            size = self._connection().execute(
+                "SELECT COUNT(*) FROM cache WHERE namespace = ? AND expires_at > ?",
+                (self.namespace, time.time())
+            ).fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        with self._lock:
+            return {
+                "path": self.path,
+                "size": size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "errors": self.errors,
+            }
+
+
+class TieredCache:
+    """
+    TTLCache-compatible cache: process memory first, then the shared cache
+    (when configured). Values found in the shared cache are promoted to memory.
+    With a shared tier, memory entries expire after at most memory_ttl_seconds
+    so values replaced by another process are picked up.
+    """
+
+    def __init__(
+        self,
+        memory: TTLCache,
+        shared: Optional[SharedCache] = None,
+        memory_ttl_seconds: Optional[float] = None
+    ):
+        self.memory = memory
+        self.shared = shared
+        self.memory_ttl_seconds = memory_ttl_seconds
+
+    @property
+    def ttl_seconds(self) -> float:
+        return self.shared.ttl_seconds if self.shared is not None else self.memory.ttl_seconds
+
+    def _memory_ttl(self, ttl_seconds: Optional[float]) -> Optional[float]:
+        if self.shared is None or self.memory_ttl_seconds is None:
+            return ttl_seconds
+        return min(self.ttl_seconds if ttl_seconds is None else ttl_seconds, self.memory_ttl_seconds)
+
+    def _promote(self, key: Hashable, value: Any):
+        self.memory.set(key, value, self._memory_ttl(None))
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self._promote(key, value)
+                return value
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        self.memory.set(key, value, self._memory_ttl(ttl_seconds))
+        if self.shared is not None:
+            self.shared.set(key, value, ttl_seconds)
+
+    async def aget(self, key: Hashable, default: Any = None) -> Any:
+        """get for the event loop: memory hits return at once, the shared tier is read in a thread"""
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.shared is not None:
+            value = await asyncio.to_thread(self.shared.get, key)
+            if value is not None:
+                self._promote(key, value)
+                return value
+        return default
+
+    async def aget_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """
+        Looks up many keys: memory first, then the rest from the shared tier
+        in a single worker thread.
+
+        Returns:
+            dict: key -> value, or None if not cached
+        """
+        found = {key: self.memory.get(key) for key in keys}
+        missing = [key for key, value in found.items() if value is None]
+        if missing and self.shared is not None:
+            shared_values = await asyncio.to_thread(lambda: {key: self.shared.get(key) for key in missing})
+            for key, value in shared_values.items():
+                if value is not None:
+                    self._promote(key, value)
+                    found[key] = value
+        return found
+
+    async def aset(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """set for the event loop: memory is updated at once, the shared tier is written in a thread"""
+        self.memory.set(key, value, self._memory_ttl(ttl_seconds))
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.set, key, value, ttl_seconds)
+
+    def delete(self, key: Hashable):
+        self.memory.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def __len__(self) -> int:
+        return len(self.memory)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        if self.shared is not None:
+            stats["shared"] = self.shared.stats()
+        return stats
+
+
+def tiered_cache(
+    namespace: str,
+    maxsize: int,
+    ttl_seconds: float,
+    path: Optional[str] = None,
+    memory_ttl_seconds: Optional[float] = None
+) -> TieredCache:
+    """
+    Process-local TTLCache backed by the shared cache namespace when
+    SHARED_CACHE_PATH (or path) is set.
+
+    Args:
+        memory_ttl_seconds: Cap on the memory tier's TTL when the shared tier
+            is used (SHARED_CACHE_MEMORY_TTL_SECONDS when not given)
+    """
+    path = SHARED_CACHE_PATH if path is None else path
+    shared = SharedCache(path, namespace, ttl_seconds) if path else None
+    memory_ttl = SHARED_CACHE_MEMORY_TTL_SECONDS if memory_ttl_seconds is None else memory_ttl_seconds
+    return TieredCache(TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds), shared, memory_ttl)
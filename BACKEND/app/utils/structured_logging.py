@@ -0,0 +1,215 @@
+"""
+Structured logging
+Application loggers (`logging.getLogger(__name__)` under `app.`) hand their
+records to a bounded in-memory queue; a background thread formats them
+(JSON lines by default) and writes them to stdout. The request path never
+waits on stdout: when the queue is full, records are dropped and counted.
+
+Records carry the request ID (app.utils.request_context), e-mail addresses
+are masked, and high-volume lines can be sampled:
+
+    logger.info("Memory cache hit %s", cache_key, extra=SAMPLED)
+
+keeps LOG_SAMPLE_RATE of those records (the rate is included in the output
+so counts can be scaled back up).
+"""
+
+import os
+import re
+import sys
+import orjson
+import queue
+import random
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+from app.utils.request_context import request_id_var
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json or text
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+# Pass as extra= to sample a high-volume line
+SAMPLED = {"sample_rate": LOG_SAMPLE_RATE}
+
+APP_LOGGER = "app"
+
+_EMAIL = re.compile(r"\b([A-Za-z0-9._%+-])[A-Za-z0-9._%+-]*@([A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+)\b")
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_stats = {"enqueued": 0, "dropped_queue_full": 0, "dropped_sampled": 0}
+_handler: Optional["NonBlockingQueueHandler"] = None
+_configure_lock = threading.Lock()
+
+
+def redact(text: str) -> str:
+    """Masks e-mail addresses: jane.doe@example.com -> j***@example.com"""
+    return _EMAIL.sub(r"\1***@\2", text) if "@" in text else text
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, request_id, extra fields, exc"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": redact(record.getMessage()),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in _extra_fields(record).items():
+            entry[key] = redact(value) if isinstance(value, str) else value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = redact(record.exc_text)
+        return orjson.dumps(entry, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development (LOG_FORMAT=text)"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id") or record.request_id is None:
+            record.request_id = "-"
+        return redact(super().format(record))
+
+
+class ContextFilter(logging.Filter):
+    """
+    Runs in the thread that logs: applies sampling before anything is queued
+    and stamps the request ID (the context variable is not visible to the
+    writer thread).
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        sample_rate = getattr(record, "sample_rate", None)
+        if sample_rate is not None and sample_rate < 1 and random.random() >= sample_rate:
+            _stats["dropped_sampled"] += 1
+            return False
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _FlushingQueueListener(QueueListener):
+    """Waits for room for its stop sentinel, so stopping flushes a full queue"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler with a bounded queue that drops instead of blocking, and
+    that restarts its writer thread in forked worker processes (threads do
+    not survive a fork, e.g. under gunicorn --preload).
+    """
+
+    def __init__(self, target: logging.Handler, maxsize: int = LOG_QUEUE_SIZE):
+        super().__init__(queue.Queue(maxsize))
+        self.target = target
+        self.maxsize = maxsize
+        self._listener: Optional[QueueListener] = None
+        self._pid = None
+        self.start()
+
+    def start(self):
+        self.queue = queue.Queue(self.maxsize)
+        self._listener = _FlushingQueueListener(self.queue, self.target, respect_handler_level=True)
+        self._listener.start()
+        self._pid = os.getpid()
+
+    def stop(self):
+        """Writes out queued records and stops the writer thread"""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+        self._listener = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve arguments and tracebacks now: they may change once the caller moves on.
+        # The record is not copied: this is the only handler of the `app` logger tree
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self._listener is None or self._pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+            _stats["enqueued"] += 1
+        except queue.Full:
+            _stats["dropped_queue_full"] += 1
+
+
+def configure_logging(
+    level: str = LOG_LEVEL,
+    fmt: str = LOG_FORMAT,
+    stream=None
+) -> logging.Logger:
+    """
+    Installs the queue handler on the `app` logger (idempotent).
+
+    Args:
+        level (str): Minimum level, e.g. "INFO"
+        fmt (str): "json" or "text"
+        stream: Output stream (stdout by default)
+
+    Returns:
+        logging.Logger: The configured `app` logger
+    """
+    global _handler
+    # Caller frame, thread, process and asyncio task lookups are not in the output
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logger = logging.getLogger(APP_LOGGER)
+    with _configure_lock:
+        if _handler is not None:
+            logger.removeHandler(_handler)
+            _handler.stop()
+
+        target = logging.StreamHandler(stream or sys.stdout)
+        target.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+
+        _handler = NonBlockingQueueHandler(target)
+        _handler.addFilter(ContextFilter())
+        logger.addHandler(_handler)
+        logger.setLevel(level)
+        logger.propagate = False
+    return logger
+
+
+def shutdown_logging():
+    """Flushes queued records (on shutdown)"""
+    if _handler is not None:
+        _handler.stop()
+
+
+def get_logging_stats() -> Dict[str, Any]:
+    """Records written through the queue and dropped by sampling or a full queue"""
+    stats = dict(_stats)
+    stats["queue_depth"] = _handler.queue.qsize() if _handler is not None else 0
+    return stats
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,377 @@
+"""
+Tracing
+Lightweight spans around the stages of a request, to explain individual
+slow requests (app.utils.metrics covers the aggregates):
+
+    with tracing.span("nasa.chunk", years="1986-1991") as chunk_span:
+        ...
+        chunk_span.set_attribute("bytes", len(body))
+
+Spans nest through a context variable, so stages running in asyncio tasks
+or worker threads started from a request belong to its trace. Finished
+traces are exported as OTLP/JSON (the OpenTelemetry protocol's JSON
+encoding) to TRACE_EXPORT_PATH (one export request per line) and/or an
+OTLP/HTTP collector at TRACE_EXPORT_ENDPOINT, from a background thread.
+Responses carry a Server-Timing header when SERVER_TIMING_ENABLED is set
+or the request asked for debug=timing.
+"""
+
+import os
+import re
+import json
+import time
+import queue
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+import httpx
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.request_context import request_id_var
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+TRACE_EXPORT_ENDPOINT = os.getenv("TRACE_EXPORT_ENDPOINT", "")  # e.g. http://localhost:4318/v1/traces
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_EXPORT_QUEUE_SIZE = int(os.getenv("TRACE_EXPORT_QUEUE_SIZE", "1000"))
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "will-it-rain-api")
+
+# W3C trace context of the caller, if any: version-traceid-parentid-flags
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_stats = {"exported_traces": 0, "dropped_traces": 0, "export_errors": 0}
+
+
+class Trace:
+    """Spans of one request (or background job), collected until its root span ends"""
+
+    __slots__ = ("trace_id", "remote_parent_id", "spans", "root", "server_timing", "_lock")
+
+    def __init__(self, trace_id: Optional[str] = None, remote_parent_id: Optional[str] = None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.remote_parent_id = remote_parent_id
+        self.spans: List["Span"] = []
+        self.root: Optional["Span"] = None
+        self.server_timing = SERVER_TIMING_ENABLED
+        self._lock = threading.Lock()
+
+    def add(self, span: "Span"):
+        with self._lock:
+            self.spans.append(span)
+
+
+class Span:
+    __slots__ = ("name", "trace", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace: Trace, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class _NoopSpan:
+    """Stands in for a span when tracing is disabled"""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def span(name: str, new_trace: bool = False, traceparent: Optional[str] = None, **attributes) -> Iterator[Span]:
+    """
+    Times the with-block as a child of the current span (or as the root of a
+    new trace when there is none, or new_trace=True).
+
+    Args:
+        name: Stage name, low-cardinality (put IDs and dates in attributes)
+        new_trace: Start a separate trace, e.g. for work outliving the request
+        traceparent: Caller's W3C traceparent header, continued by a new trace
+        **attributes: Span attributes
+    """
+    if not TRACING_ENABLED:
+        yield _NOOP_SPAN
+        return
+
+    parent = None if new_trace else _current_span.get()
+    if parent is None:
+        match = _TRACEPARENT.match(traceparent or "")
+        trace = Trace(*match.groups()) if match else Trace()
+        current = Span(name, trace, trace.remote_parent_id, attributes)
+        trace.root = current
+    else:
+        current = Span(name, parent.trace, parent.span_id, attributes)
+
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        current.trace.add(current)
+        if current.trace.root is current:
+            _finish(current.trace)
+
+
+def set_attribute(key: str, value: Any):
+    """Sets an attribute on the current span, if any"""
+    current = _current_span.get()
+    if current is not None:
+        current.set_attribute(key, value)
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace ID of the request being handled (to look it up in the exported spans)"""
+    current = _current_span.get()
+    return current.trace.trace_id if current is not None else None
+
+
+def request_server_timing():
+    """Adds a Server-Timing header to the current request's response (debug=timing)"""
+    current = _current_span.get()
+    if current is not None:
+        current.trace.server_timing = True
+
+
+def timing_breakdown() -> List[Dict[str, Any]]:
+    """
+    Finished spans of the current trace, in start order.
+
+    Returns:
+        list of dicts: name, start_ms (from the start of the trace), ms, and the span attributes
+    """
+    current = _current_span.get()
+    if current is None:
+        return []
+    trace = current.trace
+    origin = trace.root.start_ns
+    with trace._lock:
+        spans = sorted(trace.spans, key=lambda finished: finished.start_ns)
+    breakdown = []
+    for finished in spans:
+        entry = {
+            "name": finished.name,
+            "start_ms": round((finished.start_ns - origin) / 1e6, 2),
+            "ms": round(finished.duration_ms, 2),
+            **finished.attributes,
+        }
+        if finished.error:
+            entry["error"] = finished.error
+        breakdown.append(entry)
+    return breakdown
+
+
+def server_timing_header(trace: Trace) -> str:
+    """Server-Timing value: total duration per span name (and the call count when > 1)"""
+    totals: Dict[str, List[float]] = {}
+    with trace._lock:
+        spans = [finished for finished in trace.spans if finished is not trace.root]
+    for finished in spans:
+        total = totals.setdefault(finished.name, [0.0, 0])
+        total[0] += finished.duration_ms
+        total[1] += 1
+    parts = []
+    for name, (duration_ms, count) in totals.items():
+        part = f"{name};dur={duration_ms:.1f}"
+        if count > 1:
+            part += f';desc="{count} calls"'
+        parts.append(part)
+    if trace.root is not None:
+        parts.append(f"total;dur={trace.root.duration_ms:.1f}")
+    return ", ".join(parts)
+
+
+# --- OTLP/JSON export ---
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+def _otlp_span(finished: Span) -> Dict[str, Any]:
+    entry = {
+        "traceId": finished.trace.trace_id,
+        "spanId": finished.span_id,
+        "name": finished.name,
+        # SPAN_KIND_SERVER for the request span, SPAN_KIND_INTERNAL for stages
+        "kind": 2 if finished is finished.trace.root else 1,
+        "startTimeUnixNano": str(finished.start_ns),
+        "endTimeUnixNano": str(finished.end_ns),
+        "attributes": _otlp_attributes(finished.attributes),
+        # STATUS_CODE_ERROR / STATUS_CODE_UNSET
+        "status": {"code": 2, "message": finished.error} if finished.error else {"code": 0},
+    }
+    if finished.parent_id:
+        entry["parentSpanId"] = finished.parent_id
+    return entry
+
+
+def to_otlp(traces: List[Trace]) -> Dict[str, Any]:
+    """OTLP ExportTraceServiceRequest (JSON encoding) for finished traces"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+            "scopeSpans": [{
+                "scope": {"name": "app.utils.tracing"},
+                "spans": [_otlp_span(finished) for trace in traces for finished in trace.spans],
+            }],
+        }]
+    }
+
+
+class _Exporter:
+    """Background thread writing finished traces in batches; drops when its queue is full"""
+
+    def __init__(self, maxsize: int = TRACE_EXPORT_QUEUE_SIZE, batch_size: int = 256):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.queue: Optional[queue.Queue] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Threads do not survive a fork (gunicorn --preload): start one per process
+            self.queue = queue.Queue(self.maxsize)
+            threading.Thread(target=self._run, args=(self.queue,), name="trace-exporter", daemon=True).start()
+            self._pid = os.getpid()
+
+    def submit(self, trace: Trace):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(trace)
+        except queue.Full:
+            _stats["dropped_traces"] += 1
+
+    def _run(self, pending: queue.Queue):
+        client = httpx.Client(timeout=5) if TRACE_EXPORT_ENDPOINT else None
+        while True:
+            batch = [pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            self.export(batch, client)
+
+    def flush(self):
+        """Exports queued traces from the calling thread (on shutdown)"""
+        if self.queue is None or self._pid != os.getpid():
+            return
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            client = httpx.Client(timeout=5) if TRACE_EXPORT_ENDPOINT else None
+            try:
+                self.export(batch, client)
+            finally:
+                if client is not None:
+                    client.close()
+
+    def export(self, traces: List[Trace], client: Optional[httpx.Client] = None):
+        body = json.dumps(to_otlp(traces), separators=(",", ":"))
+        try:
+            if TRACE_EXPORT_PATH:
+                with open(TRACE_EXPORT_PATH, "a") as f:
+                    f.write(body + "\n")
+            if client is not None:
+                client.post(TRACE_EXPORT_ENDPOINT, content=body, headers={"Content-Type": "application/json"})
+            _stats["exported_traces"] += len(traces)
+        except (OSError, httpx.HTTPError) as e:
+            _stats["export_errors"] += 1
+            logger.warning("Trace export failed: %s", e)
+
+
+_exporter = _Exporter()
+
+
+def _finish(trace: Trace):
+    if (TRACE_EXPORT_PATH or TRACE_EXPORT_ENDPOINT) and random.random() < TRACE_SAMPLE_RATE:
+        _exporter.submit(trace)
+
+
+def flush_traces():
+    """Exports finished traces still queued (on shutdown)"""
+    _exporter.flush()
+
+
+def get_tracing_stats() -> Dict[str, Any]:
+    """Exported, dropped (queue full) and failed trace exports"""
+    return dict(_stats)
+
+
+class TracingMiddleware:
+    """
+    Root span per HTTP request, named after the route template. Adds the
+    Server-Timing header when enabled or requested (debug=timing).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        with span(scope["method"], new_trace=True, traceparent=headers.get("traceparent")) as root:
+            root.set_attribute("http.method", scope["method"])
+            root.set_attribute("request_id", request_id_var.get())
+            if QueryParams(scope.get("query_string", b"")).get("debug") == "timing":
+                root.trace.server_timing = True
+
+            async def send_with_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    root.set_attribute("http.status_code", message["status"])
+                    if root.trace.server_timing:
+                        MutableHeaders(scope=message)["Server-Timing"] = server_timing_header(root.trace)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                root.name = f"{scope['method']} {route or 'other'}"
+                root.set_attribute("http.route", route)
@@ -0,0 +1,284 @@
+"""
+Micro-benchmarks of the compute and parsing hot paths, checked against a stored baseline.
+
+Cases run on recorded payloads in benchmarks/fixtures:
+- power_daily_point_1986_1991.csv: a NASA POWER year-range response as served
+  by scripts/nasa_power_stub.py
+- verification_response*.txt: Gemini verification replies, fenced JSON and
+  JSON wrapped in prose
+- predict_response.json: a POST /predict response
+The statistics input is the bundled Bangalore history (data-source/).
+
+Each case is timed with timeit (best of --repeat runs of an auto-ranged
+loop) and divided by a calibration loop timed in alternation with it, so a baseline
+recorded on one machine carries over to another reasonably well. A case
+regresses when its normalized time exceeds the baseline by more than its
+threshold (default DEFAULT_THRESHOLD) and still does when re-timed; the
+script then exits with status 1. Comparisons and --save both use the median
+of --rounds runs.
+
+    python benchmarks/bench_hot_paths.py              # compare with benchmarks/baseline.json
+    python benchmarks/bench_hot_paths.py -k nasa jwt  # only cases whose name contains nasa or jwt
+    python benchmarks/bench_hot_paths.py --save       # record a new baseline
+"""
+
+import os
+import sys
+import copy
+import json
+import timeit
+import argparse
+import platform
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+import pandas as pd
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+HISTORY_PATH = os.path.join(BACKEND_DIR, 'data-source', 'bangalore_1980_2023_weather.csv')
+# Unchanged code measured between 0.68x and 1.23x of its baseline on a shared VM
+DEFAULT_THRESHOLD = 1.5
+
+TARGET_MONTH, TARGET_DAY = 6, 15
+
+# name -> (setup returning the zero-argument callable to time, regression threshold as a time ratio)
+CASES: Dict[str, tuple] = {}
+
+
+def benchmark(name: str, threshold: float = DEFAULT_THRESHOLD):
+    """Registers a setup function; it does the untimed preparation and returns the timed callable"""
+    def register(setup: Callable[[], Callable[[], object]]):
+        CASES[name] = (setup, threshold)
+        return setup
+    return register
+
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+@benchmark('statistics.calculate_statistics')
+def _calculate_statistics():
+    from app.core import statistical_engine
+    history = pd.read_csv(HISTORY_PATH)
+    doy = pd.Timestamp(2026, TARGET_MONTH, TARGET_DAY).dayofyear
+    rows = history[history['DOY'] == doy].reset_index(drop=True)
+    return lambda: statistical_engine.calculate_statistics(rows)
+
+
+@benchmark('nasa.parse_power_csv', threshold=1.75)
+def _parse_power_csv():
+    from app.core import nasa_data_handler
+    body = read_fixture('power_daily_point_1986_1991.csv')
+    return lambda: nasa_data_handler.parse_power_csv(body)
+
+
+@benchmark('nasa.select_target_day', threshold=1.75)
+def _select_target_day():
+    from app.core import nasa_data_handler
+    chunk = nasa_data_handler.parse_power_csv(read_fixture('power_daily_point_1986_1991.csv'))
+    return lambda: nasa_data_handler.select_target_day(chunk, TARGET_MONTH, TARGET_DAY)
+
+
+@benchmark('nasa.year_ranges')
+def _year_ranges():
+    from app.core import nasa_data_handler
+    # Missing years scattered over the history, as in an incremental refresh
+    years = [year for year in range(1986, 2026) if year % 7 != 3]
+    return lambda: nasa_data_handler._create_year_ranges_from_list(years)
+
+
+@benchmark('cache.generate_cache_key')
+def _generate_cache_key():
+    from app.services import firestore_service
+    return lambda: firestore_service.generate_cache_key(12.971599, 77.594566, TARGET_MONTH, TARGET_DAY)
+
+
+@benchmark('verification.parse_response')
+def _parse_verification_response():
+    from app.core.verification_agent import DataVerificationAgent
+    agent = DataVerificationAgent()
+    text = read_fixture('verification_response.txt')
+    return lambda: agent._parse_verification_response(text)
+
+
+@benchmark('verification.parse_response_prose')
+def _parse_verification_response_prose():
+    from app.core.verification_agent import DataVerificationAgent
+    agent = DataVerificationAgent()
+    text = read_fixture('verification_response_prose.txt')
+    return lambda: agent._parse_verification_response(text)
+
+
+@benchmark('auth.jwt_encode')
+def _jwt_encode():
+    from app.services import auth_service
+    claims = {'sub': 'user-1', 'email': 'user@example.com', 'name': 'User'}
+    return lambda: auth_service.create_access_token(claims)
+
+
+@benchmark('auth.jwt_decode')
+def _jwt_decode():
+    from app.services import auth_service
+    token = auth_service.create_access_token({'sub': 'user-1', 'email': 'user@example.com', 'name': 'User'})
+    return lambda: auth_service.decode_access_token(token)
+
+
+@benchmark('responses.dumps_prediction')
+def _dumps_prediction():
+    from app.utils.responses import dumps
+    prediction = json.loads(read_fixture('predict_response.json'))
+    return lambda: dumps(prediction)
+
+
+@benchmark('responses.dumps_batch', threshold=1.75)
+def _dumps_batch():
+    from app.utils.responses import dumps
+    prediction = json.loads(read_fixture('predict_response.json'))
+    batch = {"results": [{"index": index, "status": "ok", "prediction": copy.deepcopy(prediction)} for index in range(50)]}
+    return lambda: dumps(batch)
+
+
+@benchmark('responses.compute_etag')
+def _compute_etag():
+    from app.utils.responses import compute_etag
+    prediction = json.loads(read_fixture('predict_response.json'))
+    return lambda: compute_etag(prediction, exclude=("cache_status",))
+
+
+def _calibration():
+    # Interpreter-bound work of the same flavour as the cases (dicts, strings, floats)
+    values = [i * 0.5 for i in range(200)]
+    return {str(i): round(value, 2) for i, value in enumerate(values)}
+
+
+def _loop(function: Callable[[], object]) -> tuple:
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return timer, number
+
+
+def time_case(function: Callable[[], object], repeat: int) -> tuple:
+    """
+    Best time per call of a case and of the calibration loop, in nanoseconds.
+
+    The two are timed in alternation so that both see the same machine
+    conditions (CPU frequency, noisy neighbours) over the run.
+    """
+    case_timer, case_number = _loop(function)
+    calibration_timer, calibration_number = _loop(_calibration)
+    case_ns, calibration_ns = [], []
+    for _ in range(repeat):
+        calibration_ns.append(calibration_timer.timeit(calibration_number) / calibration_number * 1e9)
+        case_ns.append(case_timer.timeit(case_number) / case_number * 1e9)
+    return min(case_ns), min(calibration_ns)
+
+
+def run(names: List[str], repeat: int, rounds: int = 1, pick: str = 'median') -> dict:
+    """
+    Times the named cases `rounds` times each and keeps, per case, the
+    round with the median (or, with pick='best', the lowest) normalized time.
+    """
+    results, calibrations = {}, []
+    for name in names:
+        setup, _ = CASES[name]
+        function = setup()
+        samples = sorted((time_case(function, repeat) for _ in range(rounds)), key=lambda sample: sample[0] / sample[1])
+        ns, calibration_ns = samples[0] if pick == 'best' else samples[len(samples) // 2]
+        calibrations.append(calibration_ns)
+        results[name] = {"ns": round(ns, 1), "normalized": round(ns / calibration_ns, 4)}
+    return {"calibration_ns": round(min(calibrations), 1) if calibrations else None, "results": results}
+
+
+def load_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def find_regressions(results: dict, baseline: dict) -> List[str]:
+    """Names of cases slower than their baseline by more than their threshold"""
+    stored = baseline.get('results', {})
+    return [
+        name for name, result in results['results'].items()
+        if name in stored and result['normalized'] / stored[name]['normalized'] > _threshold(name)
+    ]
+
+
+def print_report(results: dict, baseline: dict):
+    stored = baseline.get('results', {})
+    print(f"{'case':<38} {'time':>11} {'baseline':>11} {'ratio':>7}")
+    for name, result in results['results'].items():
+        before = stored.get(name)
+        if before is None:
+            print(f"{name:<38} {_format_ns(result['ns']):>11} {'-':>11} {'-':>7}  new")
+            continue
+        ratio = result['normalized'] / before['normalized']
+        status = 'REGRESSION' if ratio > _threshold(name) else ('faster' if ratio < 1 / _threshold(name) else '')
+        # Baseline time rescaled to the calibration measured next to this case
+        expected_ns = before['normalized'] * result['ns'] / result['normalized']
+        print(f"{name:<38} {_format_ns(result['ns']):>11} {_format_ns(expected_ns):>11} {ratio:>6.2f}x  {status}")
+
+
+def _threshold(name: str) -> float:
+    return CASES[name][1] if name in CASES else DEFAULT_THRESHOLD
+
+
+def _format_ns(ns: float) -> str:
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} µs"
+    return f"{ns:.0f} ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-k', nargs='+', default=None, help="Only run cases whose name contains one of these")
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--rounds', type=int, default=3,
+                        help="Rounds per case (median kept; best kept when re-checking a regression)")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save', action='store_true', help="Write the results as the new baseline")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if not args.k or any(part in name for part in args.k)]
+    baseline = load_baseline(args.baseline)
+    results = run(names, args.repeat, rounds=args.rounds)
+    if not args.save:
+        suspects = find_regressions(results, baseline)
+        if suspects:
+            # A slowdown has to reproduce: keep the best of the first run and the re-runs
+            retried = run(suspects, args.repeat, rounds=args.rounds, pick='best')['results']
+            for name in suspects:
+                if retried[name]['normalized'] < results['results'][name]['normalized']:
+                    results['results'][name] = retried[name]
+    print_report(results, baseline)
+    regressions = find_regressions(results, baseline)
+
+    if args.save:
+        stored = baseline.get('results', {})
+        stored.update(results['results'])
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                "recorded_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "calibration_ns": results['calibration_ns'],
+                "results": stored,
+            }, f, indent=2)
+            f.write('\n')
+        print(f"\nBaseline written to {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
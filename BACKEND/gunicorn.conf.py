@@ -0,0 +1,83 @@
+"""
+Gunicorn production profile (SERVER_MODE=production in render_start.sh)
+
+Runs several Uvicorn workers behind one port. Workers share cached
+predictions, insights and rejected locations through a SQLite file
+(SHARED_CACHE_PATH), and only one of them - the holder of a file lock -
+runs the cache warm-up and the background refresher. Each worker writes its
+metrics to METRICS_DIR so /metrics reports totals across workers.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+"""
+
+import os
+import glob
+import fcntl
+import multiprocessing
+
+# Must be set before the app is imported (preload_app imports it in the master)
+os.environ.setdefault("SHARED_CACHE_PATH", "/tmp/will_it_rain_cache.sqlite3")
+os.environ.setdefault("METRICS_DIR", "/tmp/will_it_rain_metrics")
+
+LEADER_LOCK_PATH = os.getenv("GUNICORN_LEADER_LOCK_PATH", "/tmp/will_it_rain_leader.lock")
+# Created by the leader when warm-up is done; the other workers' /ready waits for it
+os.environ.setdefault("WARMUP_READY_PATH", LEADER_LOCK_PATH + ".ready")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or multiprocessing.cpu_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master so workers fork with it already loaded
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# Recycle workers periodically (jitter keeps them from restarting together)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# Cache misses wait on NASA POWER and Gemini, so allow slow requests
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    """
+    Drops metrics and the warm-up marker left by a previous run. Counters of
+    workers that exit during this run are archived (child_exit), so totals do
+    not go backwards when one is recycled.
+    """
+    for path in glob.glob(os.path.join(os.environ["METRICS_DIR"], "metrics-*.json")):
+        os.remove(path)
+    # A marker from the previous run would make the new workers ready before warm-up
+    if os.path.exists(os.environ["WARMUP_READY_PATH"]):
+        os.remove(os.environ["WARMUP_READY_PATH"])
+
+
+def post_fork(server, worker):
+    """
+    Elects the worker that runs the background jobs.
+
+    The lock is held for the worker's lifetime; when the leader exits (or is
+    recycled by max_requests) the OS releases it and its replacement takes over.
+    """
+    lock_file = open(LEADER_LOCK_PATH, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        if os.getenv("CACHE_WARMUP_ENABLED", "true").lower() == "true":
+            os.environ["CACHE_WARMUP_FOLLOW_LEADER"] = "true"
+        os.environ["CACHE_WARMUP_ENABLED"] = "false"
+        os.environ["CACHE_REFRESH_ENABLED"] = "false"
+        return
+    worker.leader_lock = lock_file
+    server.log.info("Worker %s runs the cache warm-up and refresher", worker.pid)
+
+
+def child_exit(server, worker):
+    """Folds an exited worker's counters into the metrics archive and deletes its file"""
+    from app.utils import metrics
+    metrics.archive_process(worker.pid)
@@ -6,5 +6,10 @@ export PORT=${PORT:-8000}
 
 echo "🚀 Starting Will It Rain API on port $PORT..."
 
+if [ "${SERVER_MODE:-development}" = "production" ]; then
+    # Multiple Uvicorn workers under Gunicorn (see gunicorn.conf.py)
+    exec gunicorn -c gunicorn.conf.py app.main:app
+fi
+
 # Start Uvicorn with dynamic port
 uvicorn app.main:app --host 0.0.0.0 --port $PORT
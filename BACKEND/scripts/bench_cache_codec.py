@@ -0,0 +1,102 @@
+"""
+Compares the legacy cache document layout with the packed layout.
+
+Reports estimated Firestore document size, JSON size and decode times using
+the bundled Bangalore history (data-source/bangalore_1980_2023_weather.csv).
+
+    python scripts/bench_cache_codec.py
+"""
+
+import os
+import sys
+import json
+import base64
+import timeit
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core import statistical_engine
+from app.services import cache_codec
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'data-source', 'bangalore_1980_2023_weather.csv')
+
+
+def firestore_size(value) -> int:
+    """Storage size rules from the Firestore documentation"""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode('utf-8')) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(k.encode('utf-8')) + 1 + firestore_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(firestore_size(v) for v in value)
+    raise TypeError(type(value))
+
+
+def build_documents():
+    df = pd.read_csv(CSV_PATH)
+    df = df[df['DOY'] == 166].reset_index(drop=True)  # mid June
+    statistics = statistical_engine.calculate_statistics(df)
+
+    common = {
+        "cache_key": "12.97_77.59_06-15",
+        "location": {"lat": 12.9716, "lon": 77.5946},
+        "target_date": "06-15",
+        "metadata": {
+            "years_analyzed": statistics['years_analyzed'],
+            "total_years": statistics['data_years_count'],
+            "latest_available_year": 2023,
+            "missing_years": [],
+            "last_updated": "2025-06-16T00:00:00",
+            "data_complete_until": "2023-12-31",
+        },
+        "confidence_score": 1.0,
+        "created_at": "2025-06-16T00:00:00",
+    }
+    legacy = {**common, "statistics": statistics}
+    compact = {**common, "packed": cache_codec.encode(df, include_series=False),
+               "schema_version": cache_codec.SCHEMA_VERSION}
+    with_series = {**compact, "packed": cache_codec.encode(df, include_series=True)}
+    return df, statistics, legacy, compact, with_series
+
+
+def main():
+    df, statistics, legacy, compact, with_series = build_documents()
+    blob = compact["packed"]
+    series_blob = with_series["packed"]
+    name_size = len("projects/p/databases/(default)/documents/weather_predictions/12.97_77.59_06-15") + 1
+
+    print(f"Years packed: {len(df)}")
+    print("\n=== Document size (numeric part only) ===")
+    print(f"legacy statistics map : {firestore_size({'statistics': statistics}):>6} bytes (Firestore estimate)")
+    print(f"packed bytes field    : {firestore_size({'packed': blob, 'schema_version': 1}):>6} bytes")
+    print(f"packed + series       : {firestore_size({'packed': series_blob, 'schema_version': 1}):>6} bytes "
+          f"(CACHE_PACK_SERIES, {len(df)} years of raw values)")
+
+    print("\n=== Whole document ===")
+    for label, doc in (("legacy", legacy), ("packed", compact), ("series", with_series)):
+        wire = json.dumps({k: (base64.b64encode(v).decode() if isinstance(v, bytes) else v) for k, v in doc.items()})
+        print(f"{label:<7} firestore={firestore_size(doc) + name_size + 32:>6} bytes  json={len(wire):>6} bytes")
+
+    number = 20000
+    print(f"\n=== Decode time (mean of {number} runs) ===")
+    cases = {
+        "packed -> statistics (lazy path)": lambda: cache_codec.decode_statistics(blob),
+        "packed -> per-year DataFrame": lambda: cache_codec.decode_series(series_blob),
+        "LazyPredictionDoc['statistics']": lambda: cache_codec.LazyPredictionDoc(compact)['statistics'],
+        "recompute from DataFrame": lambda: statistical_engine.calculate_statistics(df),
+    }
+    for label, fn in cases.items():
+        runs = number if 'DataFrame' not in label else number // 20
+        seconds = timeit.timeit(fn, number=runs)
+        print(f"{label:<36} {seconds / runs * 1e6:>9.2f} µs")
+
+
+if __name__ == '__main__':
+    main()
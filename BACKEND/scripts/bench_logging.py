@@ -0,0 +1,133 @@
+"""
+Logging overhead per request, before (print) and after (structured logger).
+
+Replays the lines a cache-hit /predict request used to print and their
+structured-logging equivalents, writing to a pipe drained by a reader thread
+(like a container's stdout). Reports the time spent in the request thread,
+once with a fast reader and once with a slow one (a log collector that falls
+behind, where print blocks on a full pipe).
+
+    python scripts/bench_logging.py --requests 20000 --slow-bytes-per-sec 2000000
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import structured_logging
+from app.utils.request_context import request_id_var
+from app.utils.structured_logging import SAMPLED
+
+CACHE_KEY = "12.97_77.59_06-15"
+USER = {"user_id": "u-123", "email": "dev@example.com", "name": "Dev"}
+
+
+def print_request():
+    print(f"📊 Prediction request from user: {USER['email']} ({USER['name']}) for activity: picnic")
+    print(f"🎯 Memory cache HIT for {CACHE_KEY}")
+    print("✅ Cache hit! Data is current. No update needed.")
+    print("🔍 Stage 1: Verifying statistical calculations...")
+    print(f"🧮 verification prompt: 412 tokens, response: 96 tokens")
+    print(f"✅ Data verification complete: {{'is_valid': True, 'confidence': 'high', 'anomalies': []}}")
+
+
+def log_request(logger: logging.Logger):
+    logger.info("Prediction request", extra={
+        "user_id": USER["user_id"], "lat": 12.97, "lon": 77.59, "date": "2026-06-15", "activity": "picnic"
+    })
+    logger.info("Memory cache hit %s", CACHE_KEY, extra=SAMPLED)
+    logger.info("Cache hit, data is current", extra=SAMPLED)
+    logger.debug("Stage 1: verifying statistical calculations")
+    logger.debug("%s prompt: %d tokens, response: %d tokens", "verification", 412, 96)
+    logger.debug("Data verification complete: %s", {'is_valid': True, 'confidence': 'high', 'anomalies': []})
+
+
+def drained_pipe(bytes_per_sec: float = 0):
+    """Write end of a pipe whose read end is consumed by a background thread (throttled if bytes_per_sec)"""
+    read_fd, write_fd = os.pipe()
+    chunk = 4096
+
+    def drain():
+        with os.fdopen(read_fd, 'rb', buffering=0) as reader:
+            while reader.read(chunk):
+                if bytes_per_sec:
+                    time.sleep(chunk / bytes_per_sec)
+
+    thread = threading.Thread(target=drain, daemon=True)
+    thread.start()
+    return os.fdopen(write_fd, 'w', buffering=1, encoding='utf-8'), thread
+
+
+def measure(fn, requests: int) -> float:
+    """Microseconds per request spent in the calling thread"""
+    started = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def run(requests: int, bytes_per_sec: float = 0) -> dict:
+    """Runs both variants against a fresh pipe each"""
+    pipe, reader = drained_pipe(bytes_per_sec)
+    stdout = sys.stdout
+    sys.stdout = pipe
+    try:
+        before_us = measure(print_request, requests)
+    finally:
+        sys.stdout = stdout
+    pipe.close()
+    reader.join()
+
+    pipe, reader = drained_pipe(bytes_per_sec)
+    stats_before = structured_logging.get_logging_stats()
+    structured_logging.configure_logging(level="INFO", fmt="json", stream=pipe)
+    logger = logging.getLogger("app.bench")
+    token = request_id_var.set("bench-request")
+    try:
+        after_us = measure(lambda: log_request(logger), requests)
+    finally:
+        request_id_var.reset(token)
+    flush_started = time.perf_counter()
+    structured_logging.shutdown_logging()
+    flush_ms = (time.perf_counter() - flush_started) * 1000
+    pipe.close()
+    reader.join()
+
+    stats = structured_logging.get_logging_stats()
+    return {
+        "before_us": before_us,
+        "after_us": after_us,
+        "flush_ms": flush_ms,
+        **{key: stats[key] - stats_before[key] for key in ("enqueued", "dropped_sampled", "dropped_queue_full")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging overhead per request")
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--slow-bytes-per-sec', type=float, default=2_000_000,
+                        help="Throughput of the slow reader")
+    args = parser.parse_args()
+
+    results = [
+        ("fast reader", run(args.requests)),
+        (f"slow reader ({args.slow_bytes_per_sec / 1e6:g} MB/s)", run(args.requests, args.slow_bytes_per_sec)),
+    ]
+
+    print(f"{'µs/request in the request thread':<34} {'print':>8} {'logger':>8} {'ratio':>6}")
+    for name, result in results:
+        print(f"{name:<34} {result['before_us']:>8.1f} {result['after_us']:>8.1f} "
+              f"{result['before_us'] / result['after_us']:>5.1f}x")
+    for name, result in results:
+        print(f"{name}: writer flush after the run {result['flush_ms']:.0f} ms; records: "
+              f"{result['enqueued']} written, {result['dropped_sampled']} sampled out, "
+              f"{result['dropped_queue_full']} dropped (queue full)")
+
+
+if __name__ == '__main__':
+    main()
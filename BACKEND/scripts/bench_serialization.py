@@ -0,0 +1,99 @@
+"""
+Compares the default FastAPI JSON path with the orjson response class, and
+the bytes sent for prediction payloads with compression and `fields=`.
+
+Payloads use statistics from the bundled Bangalore history
+(data-source/bangalore_1980_2023_weather.csv) plus an insight and a
+verification block of typical length.
+
+    python scripts/bench_serialization.py
+"""
+
+import os
+import sys
+import json
+import gzip
+import timeit
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.encoders import jsonable_encoder
+from app.core import statistical_engine
+from app.utils import compression
+from app.utils.responses import dumps, parse_fields, project_fields
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'data-source', 'bangalore_1980_2023_weather.csv')
+
+MOBILE_FIELDS = "query,statistics,confidence_score,ai_insight.reasoning"
+
+
+def build_prediction(doy: int) -> dict:
+    df = pd.read_csv(CSV_PATH)
+    df = df[df['DOY'] == doy].reset_index(drop=True)
+    date = (pd.Timestamp('2026-01-01') + pd.Timedelta(days=doy - 1)).strftime('%Y-%m-%d')
+    return {
+        "query": {"lat": 12.97, "lon": 77.59, "date": date, "place_name": "Bengaluru, India"},
+        "statistics": statistical_engine.calculate_statistics(df),
+        "confidence_score": 0.93,
+        "cache_status": "hit",
+        "missing_data_alert": None,
+        "server_already_passed": False,
+        "verification": {
+            "status": "verified",
+            "confidence": "high",
+            "summary": "Statistics are consistent with the regional climatology. " * 3,
+            "anomalies": [f"Year {1990 + i}: unusual precipitation spike compared to neighbours" for i in range(4)],
+            "notes": "Programmatic checks passed; anomalies are within the documented range. " * 4,
+        },
+        "ai_insight": {
+            "reasoning": "Mid-June in Bengaluru sits at the start of the south-west monsoon. " * 12,
+            "recommendation": "Plan for a short afternoon shower and keep a covered fallback. " * 3,
+            "summary": "Warm with a moderate chance of rain.",
+        },
+        "pipeline_status": {"verification": "ok", "insight": "ok"},
+    }
+
+
+def default_render(payload: dict) -> bytes:
+    """What FastAPI does for a returned dict: jsonable_encoder, then JSONResponse.render"""
+    return json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def time_us(fn, payload, number: int) -> float:
+    return timeit.timeit(lambda: fn(payload), number=number) / number * 1e6
+
+
+def main():
+    single = build_prediction(166)
+    batch = {"results": [{"index": i, "status": "ok", "prediction": build_prediction(150 + i)} for i in range(14)]}
+
+    print("Encode time (µs per response)")
+    print(f"{'payload':<22} {'default':>10} {'orjson':>10} {'speed-up':>9}")
+    for name, payload, number in (("single prediction", single, 2000), ("batch of 14", batch, 200)):
+        default_us = time_us(default_render, payload, number)
+        orjson_us = time_us(dumps, payload, number)
+        print(f"{name:<22} {default_us:>10.1f} {orjson_us:>10.1f} {default_us / orjson_us:>8.1f}x")
+
+    print()
+    print("Bytes on the wire (single prediction)")
+    mobile = project_fields(single, parse_fields(MOBILE_FIELDS))
+    encodings = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+    print(f"{'payload':<22}" + "".join(f"{encoding:>10}" for encoding in encodings))
+    for name, payload in (("full", single), (f"fields= (mobile)", mobile)):
+        body = dumps(payload)
+        sizes = [len(body)] + [len(compression.compress(body, encoding)) for encoding in encodings[1:]]
+        print(f"{name:<22}" + "".join(f"{size:>10}" for size in sizes))
+
+    body = dumps(single)
+    gzip_us = timeit.timeit(lambda: gzip.compress(body, compresslevel=compression.GZIP_LEVEL), number=500) / 500 * 1e6
+    print()
+    print(f"gzip level {compression.GZIP_LEVEL} on {len(body)} bytes: {gzip_us:.1f} µs")
+    if compression.brotli is None:
+        print("brotli not installed (pip install brotli) - br sizes skipped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Throughput of the API on a cache-hit workload as the worker count grows.
+
+Seeds the shared cache with one prediction (bundled Bangalore history),
+starts the server with 1..N workers (Gunicorn with gunicorn.conf.py when it
+is installed, otherwise `uvicorn --workers`), and fires POST /predict for
+that cell from concurrent clients. The fake LLM backend keeps Gemini out
+of the measurement.
+
+    python scripts/bench_workers.py --workers 1 2 4 --seconds 10 --concurrency 64
+"""
+
+import os
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+import httpx
+import pandas as pd
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+CSV_PATH = os.path.join(BACKEND_DIR, 'data-source', 'bangalore_1980_2023_weather.csv')
+
+LAT, LON = 12.97, 77.59
+
+
+def seed_shared_cache(path: str, date_str: str):
+    """Writes one prediction for (LAT, LON, date) into the shared cache file"""
+    os.environ['SHARED_CACHE_PATH'] = path
+    sys.path.insert(0, BACKEND_DIR)
+    from app.core import statistical_engine
+    from app.services import firestore_service
+
+    doy = pd.Timestamp(date_str).dayofyear
+    history = pd.read_csv(CSV_PATH)
+    history = history[history['DOY'] == doy].reset_index(drop=True)
+    stats = statistical_engine.calculate_statistics(history)
+
+    # Latest year = this year, so the request never goes back to NASA POWER for new years
+    firestore_service.save_prediction_to_cache(
+        LAT, LON, date_str, stats,
+        years_analyzed=stats['years_analyzed'],
+        total_years=stats['data_years_count'],
+        latest_year=pd.Timestamp.now().year,
+        missing_years=[],
+        confidence_score=0.9,
+        historical_data=history
+    )
+
+
+def server_command(workers: int, port: int) -> list:
+    if shutil.which('gunicorn'):
+        return ['gunicorn', '-c', 'gunicorn.conf.py', 'app.main:app']
+    print("⚠️ gunicorn not installed, falling back to uvicorn --workers")
+    return [sys.executable, '-m', 'uvicorn', 'app.main:app', '--host', '127.0.0.1',
+            '--port', str(port), '--workers', str(workers), '--log-level', 'warning']
+
+
+def wait_ready(base_url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Server at {base_url} did not become ready")
+
+
+async def run_load(base_url: str, token: str, body: dict, seconds: float, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    deadline = time.monotonic() + seconds
+    headers = {'Authorization': f'Bearer {token}'}
+
+    async def client_loop(client: httpx.AsyncClient):
+        nonlocal errors
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.post('/predict', json=body, headers=headers)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        # Let every worker promote the entry (and cache the insight) before timing
+        await asyncio.gather(*(client.post('/predict', json=body, headers=headers) for _ in range(concurrency)))
+        started = time.monotonic()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--date', default='2026-06-15')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='bench_workers_')
+    cache_path = os.path.join(tmp_dir, 'cache.sqlite3')
+    seed_shared_cache(cache_path, args.date)
+
+    from app.services import auth_service
+    token = auth_service.create_access_token({'sub': 'bench-user', 'email': 'bench@example.com', 'name': 'Bench'})
+    body = {'lat': LAT, 'lon': LON, 'date': args.date, 'activity': 'picnic', 'part_of_day': 'all_day'}
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    env = {
+        **os.environ,
+        'PORT': str(args.port),
+        'WEB_CONCURRENCY': '',
+        'SHARED_CACHE_PATH': cache_path,
+        'GUNICORN_LEADER_LOCK_PATH': os.path.join(tmp_dir, 'leader.lock'),
+        'LLM_BACKEND': 'fake',
+        'FAKE_LLM_LATENCY': 'fixed:0',
+        'CACHE_WARMUP_ENABLED': 'false',
+        'CACHE_REFRESH_ENABLED': 'false',
+        'POPULARITY_LOG_PATH': os.path.join(tmp_dir, 'popularity_log.json'),
+        'FIREBASE_CREDENTIALS': '',
+    }
+
+    print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for workers in args.workers:
+        env['WEB_CONCURRENCY'] = str(workers)
+        server = subprocess.Popen(server_command(workers, args.port), cwd=BACKEND_DIR, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_ready(base_url)
+            result = asyncio.run(run_load(base_url, token, body, args.seconds, args.concurrency))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        print(f"{workers:>7} {result['rps']:>9.1f} {result['p50_ms'] or 0:>8.1f} "
+              f"{result['p99_ms'] or 0:>8.1f} {result['errors']:>7}")
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
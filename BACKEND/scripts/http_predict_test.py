@@ -3,7 +3,7 @@ import sys
 import json
 import asyncio
 import requests
-sys.path.append(r'D:\will_it_rain\BACKEND')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from app.services import auth_service
 
 
@@ -0,0 +1,329 @@
+"""
+Load test of the API against local stand-ins for its upstreams.
+
+Starts scripts/nasa_power_stub.py (NASA POWER with injected latency and
+errors) and the API (uvicorn, fake LLM backend, SQLite shared cache in a
+temp dir, no Firestore), then runs closed-loop workloads from concurrent
+clients:
+
+    hot    POST /predict over a fixed set of cells with Zipf-skewed popularity
+    cold   POST /predict for a new cell every request (cache misses)
+    batch  POST /predict/batch of --batch-size items, mostly hot cells
+
+Each workload reports throughput, latency percentiles, errors by status and
+how requests were served (cache_status). Results are appended as one JSON
+line per run (with the git commit) to --results, and compared with the
+previous run of the same configuration:
+
+    python scripts/load_test.py --seconds 20 --concurrency 32
+    python scripts/load_test.py --workload cold --nasa-latency fixed:800 --nasa-error-rate 0.05
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+import httpx
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+DEFAULT_RESULTS_PATH = os.path.join(BACKEND_DIR, 'load_test_results.jsonl')
+JWT_SECRET = 'load-test-secret'
+WORKLOADS = ('hot', 'cold', 'batch')
+# Config keys that make two runs comparable (duration and labels do not)
+COMPARED_CONFIG = ('workers', 'concurrency', 'hot_cells', 'zipf', 'batch_size', 'date',
+                   'nasa_latency', 'nasa_error_rate', 'nasa_reject_rate', 'llm_latency')
+
+
+def percentile(sorted_values: list, fraction: float):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))]
+
+
+class CellPicker:
+    """Draws request cells: Zipf-skewed hot cells, or a fresh cell per call"""
+
+    def __init__(self, hot_cells: int, zipf: float, seed: int):
+        self.rng = random.Random(seed)
+        self.hot = [self._random_cell() for _ in range(hot_cells)]
+        weights = [1 / rank ** zipf for rank in range(1, hot_cells + 1)]
+        total = sum(weights)
+        self.cumulative, running = [], 0.0
+        for weight in weights:
+            running += weight / total
+            self.cumulative.append(running)
+
+    def _random_cell(self) -> tuple:
+        return round(self.rng.uniform(-45, 60), 2), round(self.rng.uniform(-170, 170), 2)
+
+    def hot_cell(self) -> tuple:
+        position = self.rng.random()
+        for index, bound in enumerate(self.cumulative):
+            if position <= bound:
+                return self.hot[index]
+        return self.hot[-1]
+
+    def cold_cell(self) -> tuple:
+        return self._random_cell()
+
+
+def start_process(command: list, env: dict, log_path: str) -> subprocess.Popen:
+    log = open(log_path, 'wb')
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process for {url} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} did not become ready")
+
+
+def stop_process(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def prime_hot_cells(base_url: str, token: str, picker: CellPicker, args):
+    """Requests every hot cell until it is served from cache, so hot and batch runs measure steady state"""
+    headers = {'Authorization': f'Bearer {token}'}
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def prime(client: httpx.AsyncClient, lat: float, lon: float):
+        body = {'lat': lat, 'lon': lon, 'date': args.date, 'activity': 'picnic', 'part_of_day': 'all_day'}
+        async with gate:
+            # A miss stores history up to the handler's END_YEAR; the next request adds the newer years
+            for _ in range(3):
+                try:
+                    response = await client.post('/predict', json=body, headers=headers)
+                except httpx.HTTPError:
+                    continue
+                if response.status_code == 200 and response.json()['cache_status'] == 'hit':
+                    return
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+        await asyncio.gather(*(prime(client, lat, lon) for lat, lon in picker.hot))
+
+
+async def run_workload(name: str, base_url: str, token: str, picker: CellPicker, args) -> dict:
+    latencies, errors, served = [], {}, {}
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def request_for_workload() -> tuple:
+        if name == 'batch':
+            items = []
+            for _ in range(args.batch_size):
+                lat, lon = picker.cold_cell() if picker.rng.random() < args.batch_cold_fraction else picker.hot_cell()
+                items.append({'lat': lat, 'lon': lon, 'date': args.date})
+            return '/predict/batch', {'items': items, 'activity': 'picnic', 'part_of_day': 'all_day'}
+        lat, lon = picker.hot_cell() if name == 'hot' else picker.cold_cell()
+        return '/predict', {'lat': lat, 'lon': lon, 'date': args.date, 'activity': 'picnic', 'part_of_day': 'all_day'}
+
+    def count_served(body: dict):
+        if name == 'batch':
+            for status, count in body['summary']['cache_status'].items():
+                served[status] = served.get(status, 0) + count
+            if body['summary']['errors']:
+                served['item_error'] = served.get('item_error', 0) + body['summary']['errors']
+        else:
+            served[body['cache_status']] = served.get(body['cache_status'], 0) + 1
+
+    async def client_loop(client: httpx.AsyncClient, deadline: float):
+        while time.monotonic() < deadline:
+            path, body = request_for_workload()
+            started = time.perf_counter()
+            try:
+                response = await client.post(path, json=body, headers=headers)
+                status = str(response.status_code)
+            except httpx.TimeoutException:
+                status = 'timeout'
+            except httpx.HTTPError:
+                status = 'connection_error'
+            if status == '200':
+                latencies.append(time.perf_counter() - started)
+                count_served(response.json())
+            else:
+                errors[status] = errors.get(status, 0) + 1
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        started = time.monotonic()
+        deadline = started + args.seconds
+        await asyncio.gather(*(client_loop(client, deadline) for _ in range(args.concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "requests": len(latencies) + sum(errors.values()),
+        "ok": len(latencies),
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p90_ms": ms(percentile(latencies, 0.90)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+        "errors": errors,
+        "cache_status": served,
+    }
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BACKEND_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f"{commit}-dirty" if dirty else commit
+
+
+def previous_run(path: str, config: dict):
+    """Latest recorded run with the same comparable configuration, or None"""
+    if not os.path.exists(path):
+        return None
+    previous = None
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if all(record.get('config', {}).get(key) == config.get(key) for key in COMPARED_CONFIG):
+                previous = record
+    return previous
+
+
+def print_report(results: dict, previous):
+    def delta(name: str, key: str, value) -> str:
+        before = ((previous or {}).get('results', {}).get(name) or {}).get(key)
+        if value is None or not before:
+            return ''
+        return f" ({(value - before) / before * 100:+.0f}%)"
+
+    if previous:
+        print(f"Compared with {previous['commit']} at {previous['timestamp']}")
+    for name, result in results.items():
+        print(f"\n{name}: {result['ok']}/{result['requests']} ok")
+        for key in ('rps', 'p50_ms', 'p90_ms', 'p95_ms', 'p99_ms', 'max_ms'):
+            print(f"  {key:>7} {result[key] if result[key] is not None else '-':>10}{delta(name, key, result[key])}")
+        print(f"  errors       {result['errors'] or '-'}")
+        print(f"  served       {result['cache_status'] or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workload', nargs='+', choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument('--seconds', type=float, default=20.0)
+    parser.add_argument('--no-prime', action='store_true', help="Skip caching the hot cells before hot/batch runs")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--timeout', type=float, default=30.0, help="Client timeout per request")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--hot-cells', type=int, default=50)
+    parser.add_argument('--zipf', type=float, default=1.1, help="Zipf exponent of hot cell popularity")
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--batch-cold-fraction', type=float, default=0.1)
+    parser.add_argument('--date', default='2026-06-15')
+    parser.add_argument('--nasa-latency', default='lognormal:400:0.5', help="Stand-in NASA POWER latency spec")
+    parser.add_argument('--nasa-error-rate', type=float, default=0.0)
+    parser.add_argument('--nasa-reject-rate', type=float, default=0.0)
+    parser.add_argument('--llm-latency', default='lognormal:800:0.4', help="FAKE_LLM_LATENCY for the API")
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--stub-port', type=int, default=8801)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--label', default='', help="Free-form note stored with the run")
+    parser.add_argument('--results', default=DEFAULT_RESULTS_PATH)
+    args = parser.parse_args()
+
+    os.environ['JWT_SECRET_KEY'] = JWT_SECRET
+    from app.services import auth_service
+    token = auth_service.create_access_token({'sub': 'load-test', 'email': 'load-test@example.com', 'name': 'Load Test'})
+
+    tmp_dir = tempfile.mkdtemp(prefix='load_test_')
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    base_url = f"http://127.0.0.1:{args.port}"
+    env = {
+        **os.environ,
+        'NASA_POWER_API_URL': f"{stub_url}/api/temporal/daily/point",
+        'LLM_BACKEND': 'fake',
+        'FAKE_LLM_LATENCY': args.llm_latency,
+        'FIREBASE_CREDENTIALS': '',
+        'SHARED_CACHE_PATH': os.path.join(tmp_dir, 'cache.sqlite3'),
+        'POPULARITY_LOG_PATH': os.path.join(tmp_dir, 'popularity_log.json'),
+        'CACHE_WARMUP_ENABLED': 'false',
+        'CACHE_REFRESH_ENABLED': 'false',
+        'LOG_LEVEL': 'WARNING',
+    }
+    stub_command = [sys.executable, os.path.join('scripts', 'nasa_power_stub.py'), '--port', str(args.stub_port),
+                    '--latency', args.nasa_latency, '--error-rate', str(args.nasa_error_rate),
+                    '--reject-rate', str(args.nasa_reject_rate), '--seed', str(args.seed)]
+    api_command = [sys.executable, '-m', 'uvicorn', 'app.main:app', '--host', '127.0.0.1', '--port', str(args.port),
+                   '--workers', str(args.workers), '--log-level', 'warning']
+
+    stub = start_process(stub_command, env, os.path.join(tmp_dir, 'stub.log'))
+    api = start_process(api_command, env, os.path.join(tmp_dir, 'api.log'))
+    results = {}
+    try:
+        wait_ready(f"{stub_url}/stats", stub)
+        wait_ready(f"{base_url}/ready", api)
+        for index, name in enumerate(args.workload):
+            picker = CellPicker(args.hot_cells, args.zipf, args.seed + index)
+            if name != 'cold' and not args.no_prime:
+                print(f"Priming {args.hot_cells} hot cells for {name}...")
+                asyncio.run(prime_hot_cells(base_url, token, picker, args))
+            print(f"Running {name} for {args.seconds:.0f}s at concurrency {args.concurrency}...")
+            results[name] = asyncio.run(run_workload(name, base_url, token, picker, args))
+        upstream = httpx.get(f"{stub_url}/stats").json()
+    except Exception:
+        print(f"Load test failed, server logs kept in {tmp_dir}")
+        raise
+    finally:
+        stop_process(api)
+        stop_process(stub)
+
+    config = {key: getattr(args, key) for key in COMPARED_CONFIG}
+    config.update(seconds=args.seconds, primed=not args.no_prime, workloads=args.workload)
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "commit": git_commit(),
+        "label": args.label,
+        "config": config,
+        "results": results,
+        "upstream": upstream,
+    }
+    previous = previous_run(args.results, config)
+    with open(args.results, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+    print_report(results, previous)
+    print(f"\nNASA POWER stand-in: {upstream}")
+    print(f"Appended to {args.results}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
+import os
 import sys
-sys.path.append(r'D:\will_it_rain\BACKEND')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from app.services import auth_service
 
 # Create a short-lived token for testing purposes
@@ -0,0 +1,243 @@
+"""
+Local stand-in for the NASA POWER daily point API, for load tests.
+
+Serves /api/temporal/daily/point as CSV (what the app requests) or JSON,
+with a NASA-style header and plausible values for any location: the bundled
+Bangalore history, shifted by latitude and perturbed per cell, with days
+not yet published reported as -999 like the real API. Latency and failures
+are injected:
+
+    python scripts/nasa_power_stub.py --port 8801 --latency lognormal:400:0.5 \\
+        --error-rate 0.02 --reject-rate 0.05 --slow-rate 0.01 --slow-ms 5000
+
+Point the API at it with
+NASA_POWER_API_URL=http://127.0.0.1:8801/api/temporal/daily/point.
+GET /stats reports requests, injected failures and bytes served.
+"""
+
+import os
+import sys
+import json
+import zlib
+import random
+import asyncio
+import argparse
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.core.llm_backends import parse_latency
+from app.core.nasa_data_handler import FILL_VALUE, PARAMETER_COLUMNS
+
+CSV_PATH = os.path.join(BACKEND_DIR, 'data-source', 'bangalore_1980_2023_weather.csv')
+BASE_LATITUDE = 12.97
+
+PARAMETER_INFO = {
+    "WS10M": ("Wind Speed at 10 Meters", "m/s"),
+    "RH2M": ("Relative Humidity at 2 Meters", "%"),
+    "T2M_MAX": ("Temperature at 2 Meters Maximum", "C"),
+    "T2M_MIN": ("Temperature at 2 Meters Minimum", "C"),
+    "PRECTOTCORR": ("Precipitation Corrected", "mm/day"),
+}
+
+
+def _load_base_years() -> dict:
+    """Bundled history as arrays by year, split by leap/non-leap so any year can borrow a same-length year"""
+    history = pd.read_csv(CSV_PATH)
+    years = {}
+    for year, frame in history.groupby('YEAR'):
+        if len(frame) == (366 if _is_leap(int(year)) else 365):
+            years[int(year)] = {name: frame[name].to_numpy(dtype=float) for name in PARAMETER_COLUMNS}
+    return {
+        "years": years,
+        "leap": sorted(year for year in years if _is_leap(year)),
+        "common": sorted(year for year in years if not _is_leap(year)),
+    }
+
+
+def _is_leap(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+_BASE = _load_base_years()
+
+
+def _cell_seed(lat: float, lon: float) -> int:
+    return zlib.crc32(f"{lat:.2f},{lon:.2f}".encode())
+
+
+def cell_series(lat: float, lon: float, start_year: int, end_year: int) -> dict:
+    """Deterministic daily series for a cell: YEAR, DOY and the parameter columns as arrays"""
+    rng = np.random.default_rng(_cell_seed(lat, lon))
+    # Cooler away from the tropics, plus a fixed per-cell offset and rain/wind climate
+    temperature_shift = -0.45 * max(0.0, abs(lat) - BASE_LATITUDE) + rng.normal(0, 1.5)
+    rain_scale = rng.uniform(0.3, 2.0)
+    wind_scale = rng.uniform(0.6, 1.6)
+    humidity_shift = rng.normal(0, 8)
+
+    last_published = date.today() - timedelta(days=3)
+    columns = {name: [] for name in ("YEAR", "DOY", *PARAMETER_COLUMNS)}
+    for year in range(start_year, end_year + 1):
+        pool = _BASE["leap"] if _is_leap(year) else _BASE["common"]
+        source = _BASE["years"][year if year in _BASE["years"] else pool[year % len(pool)]]
+        days = len(source["T2M_MAX"])
+        noise = rng.normal(0, 0.8, days)
+        values = {
+            "WS10M": source["WS10M"] * wind_scale,
+            "RH2M": np.clip(source["RH2M"] + humidity_shift, 5, 100),
+            "T2M_MAX": source["T2M_MAX"] + temperature_shift + noise,
+            "T2M_MIN": source["T2M_MIN"] + temperature_shift + noise * 0.7,
+            "PRECTOTCORR": source["PRECTOTCORR"] * rain_scale,
+        }
+        # Days NASA POWER has not published yet
+        if year >= last_published.year:
+            first_unpublished = 0 if year > last_published.year else last_published.timetuple().tm_yday
+            for name in PARAMETER_COLUMNS:
+                values[name][first_unpublished:] = FILL_VALUE
+        columns["YEAR"].append(np.full(days, year))
+        columns["DOY"].append(np.arange(1, days + 1))
+        for name in PARAMETER_COLUMNS:
+            columns[name].append(np.round(values[name], 2))
+    return {name: np.concatenate(parts) for name, parts in columns.items()}
+
+
+def _csv_body(lat: float, lon: float, start_year: int, end_year: int, series: dict) -> str:
+    header = [
+        "-BEGIN HEADER-",
+        "NASA/POWER CERES/MERRA2 Native Resolution Daily Data (local stand-in)",
+        f"Dates (month/day/year): 01/01/{start_year} through 12/31/{end_year}",
+        f"Location: Latitude  {lat}   Longitude {lon}",
+        "Elevation from MERRA-2: Average for 0.5 x 0.625 degree lat/lon region = 868.9 meters",
+        f"The value for missing source data that cannot be computed or is outside of the sources "
+        f"availability range: {FILL_VALUE}",
+        "Parameter(s):",
+        *(f"{name:<11} MERRA-2 {longname} ({units})" for name, (longname, units) in PARAMETER_INFO.items()),
+        "-END HEADER-",
+        ",".join(("YEAR", "DOY", *PARAMETER_COLUMNS)),
+    ]
+    rows = zip(*(series[name].tolist() for name in ("YEAR", "DOY", *PARAMETER_COLUMNS)))
+    return "\n".join(header) + "\n" + "\n".join(",".join(map(str, row)) for row in rows) + "\n"
+
+
+def _json_body(lat: float, lon: float, start_year: int, end_year: int, series: dict) -> str:
+    dates = [
+        (datetime(year, 1, 1) + timedelta(days=doy - 1)).strftime("%Y%m%d")
+        for year, doy in zip(series["YEAR"].tolist(), series["DOY"].tolist())
+    ]
+    return json.dumps({
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lon, lat, 868.9]},
+        "properties": {"parameter": {
+            name: dict(zip(dates, series[name].tolist())) for name in PARAMETER_COLUMNS
+        }},
+        "header": {
+            "title": "NASA/POWER CERES/MERRA2 Native Resolution Daily Data (local stand-in)",
+            "fill_value": FILL_VALUE,
+            "start": f"{start_year}0101",
+            "end": f"{end_year}1231",
+        },
+        "messages": [],
+        "parameters": {name: {"units": units, "longname": longname} for name, (longname, units) in PARAMETER_INFO.items()},
+    })
+
+
+@lru_cache(maxsize=2048)
+def render_body(lat: float, lon: float, start_year: int, end_year: int, fmt: str) -> str:
+    series = cell_series(lat, lon, start_year, end_year)
+    if fmt == "json":
+        return _json_body(lat, lon, start_year, end_year, series)
+    return _csv_body(lat, lon, start_year, end_year, series)
+
+
+def create_app(
+    latency: str = "lognormal:400:0.5",
+    error_rate: float = 0.0,
+    error_status: int = 503,
+    reject_rate: float = 0.0,
+    slow_rate: float = 0.0,
+    slow_ms: float = 5000,
+    seed: int = 7
+) -> Starlette:
+    """
+    Args:
+        latency: Per-request latency spec (as FAKE_LLM_LATENCY)
+        error_rate: Fraction of requests answered with error_status
+        error_status: Injected error status (503 by default; the app retries 429/5xx)
+        reject_rate: Fraction of cells answered with 400, like points NASA POWER has no data for
+        slow_rate: Fraction of requests that stall for an extra slow_ms (tail latency)
+        slow_ms: Extra latency of slow requests
+        seed: Seed of the latency and error draws
+    """
+    sample_latency = parse_latency(latency)
+    rng = random.Random(seed)
+    stats = {"requests": 0, "ok": 0, "errors_injected": 0, "rejected": 0, "slow": 0, "invalid": 0, "bytes": 0}
+
+    async def daily_point(request: Request) -> Response:
+        stats["requests"] += 1
+        params = request.query_params
+        try:
+            lat, lon = float(params["latitude"]), float(params["longitude"])
+            start, end = params["start"], params["end"]
+            start_year, end_year = int(start[:4]), int(end[:4])
+            fmt = params.get("format", "CSV").lower()
+        except (KeyError, ValueError):
+            stats["invalid"] += 1
+            return JSONResponse({"messages": ["Missing or invalid latitude, longitude, start or end"]}, status_code=422)
+
+        delay_ms = sample_latency(rng)
+        if rng.random() < slow_rate:
+            stats["slow"] += 1
+            delay_ms += slow_ms
+        await asyncio.sleep(delay_ms / 1000)
+
+        if _cell_seed(lat, lon) % 10000 < reject_rate * 10000:
+            stats["rejected"] += 1
+            return JSONResponse({"messages": [f"No data for latitude {lat}, longitude {lon}"]}, status_code=400)
+        if rng.random() < error_rate:
+            stats["errors_injected"] += 1
+            return JSONResponse({"messages": ["Service temporarily unavailable (injected)"]}, status_code=error_status)
+
+        body = await asyncio.to_thread(render_body, lat, lon, start_year, end_year, fmt)
+        stats["ok"] += 1
+        stats["bytes"] += len(body)
+        media_type = "application/json" if fmt == "json" else "text/csv"
+        return Response(body, media_type=media_type)
+
+    async def get_stats(request: Request) -> Response:
+        return JSONResponse(stats)
+
+    return Starlette(routes=[
+        Route("/api/temporal/daily/point", daily_point),
+        Route("/stats", get_stats),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local NASA POWER stand-in")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8801)
+    parser.add_argument('--latency', default='lognormal:400:0.5', help="Latency spec, as FAKE_LLM_LATENCY")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--reject-rate', type=float, default=0.0)
+    parser.add_argument('--slow-rate', type=float, default=0.0)
+    parser.add_argument('--slow-ms', type=float, default=5000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.error_rate, args.error_status, args.reject_rate,
+                     args.slow_rate, args.slow_ms, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
+import os
 import sys
 import asyncio
-sys.path.append(r'D:\will_it_rain\BACKEND')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app.api import routes
 from app.api.routes import PredictRequest
@@ -0,0 +1,54 @@
+import sys
+import os
+import json
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import bench_hot_paths
+
+
+def _run_case(name):
+    setup, _ = bench_hot_paths.CASES[name]
+    return setup()()
+
+
+def test_fixture_payloads_still_exercise_the_real_code_paths():
+    chunk = _run_case('nasa.parse_power_csv')
+    assert list(chunk.columns) == ['YEAR', 'DOY', 'WS10M', 'RH2M', 'T2M_MAX', 'T2M_MIN', 'PRECTOTCORR']
+    assert len(chunk) == 6 * 365 + 1  # 1988 is the only leap year
+
+    target_rows, neighbour_rows = _run_case('nasa.select_target_day')
+    assert len(target_rows) == 6 and len(neighbour_rows) == 6 * 14
+
+    assert _run_case('statistics.calculate_statistics')['data_years_count'] > 30
+    assert _run_case('nasa.year_ranges')[:2] == [(1986, 1990), (1992, 1997)]
+    assert _run_case('cache.generate_cache_key') == '12.97_77.59_06-15'
+
+    # Fenced JSON parses directly; prose falls back to extracting the embedded object
+    assert _run_case('verification.parse_response')['status'] == 'verified'
+    assert _run_case('verification.parse_response_prose')['confidence'] == 'medium'
+
+    assert _run_case('auth.jwt_decode')['email'] == 'user@example.com'
+    assert json.loads(_run_case('responses.dumps_prediction'))['query']['place_name']
+    assert len(json.loads(_run_case('responses.dumps_batch'))['results']) == 50
+    assert _run_case('responses.compute_etag').startswith('"')
+
+
+def test_every_case_has_a_stored_baseline():
+    baseline = bench_hot_paths.load_baseline(bench_hot_paths.BASELINE_PATH)
+    assert set(bench_hot_paths.CASES) <= set(baseline['results'])
+
+
+def test_only_slowdowns_beyond_the_threshold_are_regressions():
+    baseline = {'results': {
+        'cache.generate_cache_key': {'ns': 2000.0, 'normalized': 0.2},
+        'nasa.parse_power_csv': {'ns': 2000.0, 'normalized': 0.2},
+    }}
+    results = {'calibration_ns': 10000.0, 'results': {
+        # Default threshold 1.5 vs the 1.75 allowed for CSV parsing
+        'cache.generate_cache_key': {'ns': 3200.0, 'normalized': 0.32},
+        'nasa.parse_power_csv': {'ns': 3200.0, 'normalized': 0.32},
+        'auth.jwt_encode': {'ns': 20000.0, 'normalized': 2.0},
+    }}
+    assert bench_hot_paths.find_regressions(results, baseline) == ['cache.generate_cache_key']
@@ -0,0 +1,46 @@
+import sys
+import os
+import pandas as pd
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core import statistical_engine
+from app.services import cache_codec
+
+
+def _history():
+    return pd.DataFrame({
+        'YEAR': [2003, 2001, 2002],
+        'DOY': [166, 166, 166],
+        'WS10M': [3.1, 4.25, 2.9],
+        'RH2M': [70.5, 81.0, 65.25],
+        'T2M_MAX': [28.1, 26.4, 30.2],
+        'T2M_MIN': [19.9, 18.7, 21.05],
+        'PRECTOTCORR': [0.0, 5.6, 1.2],
+    })
+
+
+def test_packed_statistics_match_engine():
+    df = _history()
+    blob = cache_codec.encode(df, include_series=False)
+
+    assert cache_codec.decode_statistics(blob) == statistical_engine.calculate_statistics(df)
+    assert not cache_codec.has_series(blob)
+
+
+def test_series_round_trip():
+    blob = cache_codec.encode(_history(), include_series=True)
+    series = cache_codec.decode_series(blob)
+
+    assert series['YEAR'].tolist() == [2001, 2002, 2003]
+    assert series['PRECTOTCORR'].round(2).tolist() == [5.6, 1.2, 0.0]
+
+
+def test_lazy_document_decodes_on_access():
+    doc = cache_codec.LazyPredictionDoc({'packed': cache_codec.encode(_history()), 'confidence_score': 0.9})
+
+    assert 'statistics' in doc
+    assert doc['statistics']['data_years_count'] == 3
+    assert doc.get('statistics')['years_analyzed'] == '2001-2003'
+    assert doc.get('ai_insight') is None
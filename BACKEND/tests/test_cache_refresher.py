@@ -0,0 +1,49 @@
+import sys
+import os
+from datetime import datetime
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import cache_refresher, firestore_service
+
+
+def _entry(target_date, latest_year, last_updated):
+    return {
+        'location': {'lat': 12.97, 'lon': 77.59},
+        'target_date': target_date,
+        'metadata': {'latest_available_year': latest_year, 'last_updated': last_updated},
+    }
+
+
+def test_find_stale_entries(monkeypatch):
+    entries = [
+        # Month-day passed after the last update -> stale
+        ('a', _entry('03-10', 2024, '2025-01-01T00:00:00')),
+        # Updated after the month-day passed, retry interval not reached -> fresh
+        ('b', _entry('03-10', 2024, '2025-03-12T00:00:00')),
+        # Month-day not reached yet this year -> fresh
+        ('c', _entry('06-01', 2024, '2025-01-01T00:00:00')),
+        ('d', {'target_date': 'garbage'}),
+    ]
+    monkeypatch.setattr(firestore_service, 'stream_cache_metadata', lambda: iter(entries))
+    monkeypatch.setattr(firestore_service, 'datetime', _FrozenDatetime)
+
+    stale = cache_refresher.find_stale_entries(now=datetime(2025, 3, 15))
+
+    assert [e['cache_key'] for e in stale] == ['a']
+    assert stale[0]['date'] == '2025-03-10'
+    assert stale[0]['years_to_fetch'] == [2025]
+
+
+def test_is_off_peak_wraps_midnight(monkeypatch):
+    monkeypatch.setattr(cache_refresher, 'OFFPEAK_HOURS', '22-4')
+    assert cache_refresher.is_off_peak(datetime(2025, 1, 1, 23))
+    assert cache_refresher.is_off_peak(datetime(2025, 1, 1, 3))
+    assert not cache_refresher.is_off_peak(datetime(2025, 1, 1, 12))
+
+
+class _FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2025, 3, 15)
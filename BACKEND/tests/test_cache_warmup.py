@@ -0,0 +1,44 @@
+import sys
+import os
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import cache_warmup
+
+
+def _reset(monkeypatch, ready_path):
+    monkeypatch.setattr(cache_warmup, 'WARMUP_READY_PATH', ready_path)
+    monkeypatch.setattr(cache_warmup, '_follows_leader', False)
+    monkeypatch.setattr(cache_warmup, '_ready', cache_warmup.threading.Event())
+    monkeypatch.setitem(cache_warmup._warmup_status, 'ready', False)
+
+
+def test_follower_workers_wait_for_the_leaders_warm_up(tmp_path, monkeypatch):
+    marker = tmp_path / 'leader.lock.ready'
+    _reset(monkeypatch, str(marker))
+
+    cache_warmup.follow_leader()
+    assert not cache_warmup.is_ready()
+    assert cache_warmup.get_warmup_status()['ready'] is False
+
+    # The leader (another process) finishes warm-up
+    marker.touch()
+    assert cache_warmup.is_ready()
+    assert cache_warmup.get_warmup_status()['ready'] is True
+
+
+def test_leader_publishes_warm_up_completion(tmp_path, monkeypatch):
+    marker = tmp_path / 'leader.lock.ready'
+    _reset(monkeypatch, str(marker))
+    monkeypatch.setattr(cache_warmup.popularity_log, 'top_entries', lambda top_n: [])
+
+    cache_warmup.warm_up(top_n=5)
+    assert cache_warmup.is_ready()
+    assert marker.exists()
+
+
+def test_single_process_without_a_marker_path_is_ready_at_once(monkeypatch):
+    _reset(monkeypatch, '')
+    cache_warmup.follow_leader()
+    assert cache_warmup.is_ready()
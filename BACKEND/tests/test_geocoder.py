@@ -0,0 +1,41 @@
+import sys
+import os
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core import geocoder
+
+
+def test_resolves_nearest_place():
+    place = geocoder.resolve_place(12.9716, 77.5946)
+    assert place['name'] == 'Bengaluru'
+    assert place['country'] == 'India'
+    assert place['distance_km'] < 5
+    assert place['label'] == 'Bengaluru, India'
+
+
+def test_far_from_a_place_is_labelled_near():
+    # Between Bengaluru and Mysuru, more than PLACE_NEAR_DISTANCE_KM from both
+    label = geocoder.resolve_place_name(12.55, 76.9)
+    assert label.startswith('near ')
+
+
+def test_open_ocean_has_no_name():
+    assert geocoder.resolve_place(-40.0, -120.0) is None
+
+
+def test_antimeridian_wraps():
+    # Suva, Fiji sits at 178.44E; a point just across the antimeridian still finds it
+    gazetteer = geocoder.get_gazetteer()
+    index, distance_km = gazetteer.nearest(-18.14, -179.9, max_distance_km=300)
+    assert gazetteer.names[index] == 'Suva'
+    assert distance_km < 300
+
+
+def test_lookups_are_cached_per_snapped_cell():
+    geocoder._resolve_cell.cache_clear()
+    geocoder.resolve_place(28.6139, 77.2090)
+    geocoder.resolve_place(28.6141, 77.2088)
+    info = geocoder._resolve_cell.cache_info()
+    assert info.misses == 1 and info.hits == 1
@@ -0,0 +1,63 @@
+import sys
+import os
+import asyncio
+import pytest
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.llm_backends import FakeModel, FakeLLMError, FAKE_INSIGHT_TEXT
+from app.core.llm_client import LLMClient
+from app.core.verification_agent import DataVerificationAgent
+
+
+def _model(**overrides):
+    settings = dict(latency="uniform:1:5", error_rate=0.0, chunk_chars=16, chunk_delay_ms=0, seed=7)
+    settings.update(overrides)
+    return FakeModel("test-model", **settings)
+
+
+def test_latencies_are_deterministic_for_a_seed():
+    first, second = _model(), _model()
+    draws = [first._next_call() for _ in range(5)]
+    assert draws == [second._next_call() for _ in range(5)]
+    assert all(0.001 <= latency <= 0.005 for latency, _ in draws)
+
+
+def test_streaming_chunks_rebuild_the_text():
+    async def run():
+        stream = await _model().generate_content_async("insight prompt", stream=True)
+        return [chunk.text async for chunk in stream]
+
+    chunks = asyncio.run(run())
+    assert len(chunks) > 1 and all(len(chunk) <= 16 for chunk in chunks)
+    assert "".join(chunks) == FAKE_INSIGHT_TEXT
+
+
+def test_error_rate_injects_failures():
+    model = _model(error_rate=1.0)
+    with pytest.raises(FakeLLMError):
+        model.generate_content("prompt")
+
+
+def test_canned_verification_payload_goes_through_the_agent():
+    agent = DataVerificationAgent()
+    agent.enabled = True
+    agent.model = _model(verification_json='{"is_valid": false, "confidence": "high", '
+                                           '"anomalies": ["humidity impossible"], "validation_notes": "bad"}')
+    agent.llm = LLMClient(max_concurrency=2, max_queue=2, queue_timeout=1, call_timeout=1)
+
+    stats = {
+        'precipitation_probability_percent': 40.0,
+        'average_precipitation_mm': 1.2,
+        'average_temperature_celsius': 21.5,
+        'max_temperature_celsius': 25.0,
+        'min_temperature_celsius': 18.0,
+        'average_wind_speed_mps': 3.5,
+        'average_humidity_percent': 130.0,
+    }
+    result = asyncio.run(agent.verify_statistics_async(stats, {'lat': 12.97, 'lon': 77.59}, '2025-06-01'))
+
+    assert result['verified_by'] == 'gemini'
+    assert result['status'] == 'invalid'
+    assert result['anomalies'] == ['humidity impossible']
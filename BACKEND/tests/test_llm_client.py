@@ -0,0 +1,67 @@
+import sys
+import os
+import asyncio
+import pytest
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.llm_client import LLMClient, LLMOverloadedError
+
+
+class SlowModel:
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            return prompt.upper()
+        finally:
+            self.active -= 1
+
+
+def test_concurrency_is_limited():
+    client = LLMClient(max_concurrency=2, max_queue=10, queue_timeout=5, call_timeout=5)
+    model = SlowModel(0.02)
+
+    async def run():
+        return await asyncio.gather(*(client.generate(model, f"p{i}") for i in range(6)))
+
+    assert asyncio.run(run()) == [f"P{i}" for i in range(6)]
+    assert model.peak == 2
+    metrics = client.get_metrics()
+    assert metrics['completed'] == 6
+    assert metrics['in_flight'] == 0 and metrics['queued'] == 0
+    assert metrics['peak_in_flight'] == 2
+
+
+def test_full_queue_sheds_load():
+    client = LLMClient(max_concurrency=1, max_queue=1, queue_timeout=5, call_timeout=5)
+    model = SlowModel(0.1)
+
+    async def run():
+        return await asyncio.gather(*(client.generate(model, "p") for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert sum(isinstance(result, LLMOverloadedError) for result in results) == 1
+    assert client.get_metrics()['shed'] == 1
+
+
+def test_timeout_cancels_call_and_frees_slot():
+    client = LLMClient(max_concurrency=1, max_queue=5, queue_timeout=5, call_timeout=0.05)
+    model = SlowModel(1)
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await client.generate(model, "slow")
+        model.delay = 0
+        return await client.generate(model, "fast")
+
+    assert asyncio.run(run()) == "FAST"
+    assert model.active == 0
+    assert client.get_metrics()['timeouts'] == 1
@@ -0,0 +1,99 @@
+import sys
+import os
+import json
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import metrics
+
+
+def _registry():
+    registry = metrics.Registry()
+    requests = registry.register(metrics.Counter('requests_total', 'Requests', ['route', 'status']))
+    latency = registry.register(metrics.Histogram('latency_seconds', 'Latency', ['route'], buckets=(0.1, 1.0)))
+    return registry, requests, latency
+
+
+def test_counters_and_histograms_render_in_prometheus_text_format():
+    registry, requests, latency = _registry()
+    requests.labels('/predict', 200).inc()
+    requests.labels('/predict', '200').inc(2)
+    requests.labels('/a "quoted"\\path', '404').inc()
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.labels('/predict').observe(value)
+
+    text = metrics.render_snapshot(registry.snapshot())
+
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{route="/predict",status="200"} 3.0' in text
+    assert 'requests_total{route="/a \\"quoted\\"\\\\path",status="404"} 1.0' in text
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{route="/predict",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/predict",le="1.0"} 3' in text
+    assert 'latency_seconds_bucket{route="/predict",le="+Inf"} 4' in text
+    assert 'latency_seconds_sum{route="/predict"} 4.05' in text
+    assert 'latency_seconds_count{route="/predict"} 4' in text
+
+
+def test_registering_a_name_twice_returns_the_same_metric():
+    registry, requests, _ = _registry()
+    assert registry.register(metrics.Counter('requests_total', 'Requests', ['route', 'status'])) is requests
+
+
+def test_collectors_report_values_kept_elsewhere():
+    registry, _, _ = _registry()
+    registry.register_collector(lambda: [('queue_depth', 'gauge', 'Queued calls', {}, 7)])
+    assert 'queue_depth 7' in metrics.render_snapshot(registry.snapshot())
+
+
+def test_render_adds_up_other_worker_processes(tmp_path, monkeypatch):
+    registry, requests, latency = _registry()
+    requests.labels('/predict', '200').inc()
+    latency.labels('/predict').observe(0.5)
+    other = registry.snapshot()
+
+    monkeypatch.setattr(metrics, 'METRICS_DIR', str(tmp_path))
+    (tmp_path / 'metrics-1.json').write_text(json.dumps(other))
+    (tmp_path / 'metrics-2.json').write_text(json.dumps(other))
+    (tmp_path / 'metrics-3.json').write_text('{truncated')
+
+    merged = metrics.render_snapshot(metrics.merge_snapshots([other, *metrics._other_process_snapshots()]))
+    assert 'requests_total{route="/predict",status="200"} 3.0' in merged
+    assert 'latency_seconds_count{route="/predict"} 3' in merged
+
+    # This process's own file is replaced by its live samples
+    assert metrics.write_snapshot()
+    assert os.path.exists(tmp_path / f'metrics-{os.getpid()}.json')
+    assert len(metrics._other_process_snapshots()) == 2
+
+
+def test_exited_workers_keep_counters_but_not_gauges(tmp_path, monkeypatch):
+    registry, requests, _ = _registry()
+    requests.labels('/predict', '200').inc()
+    registry.register_collector(lambda: [('llm_in_flight', 'gauge', 'Calls in flight', {}, 2)])
+    worker = registry.snapshot()
+
+    monkeypatch.setattr(metrics, 'METRICS_DIR', str(tmp_path))
+    live_pid = os.getppid()
+    dead_pid = 2 ** 22 + 1  # above the default pid_max, so never a running process
+    (tmp_path / f'metrics-{live_pid}.json').write_text(json.dumps(worker))
+    (tmp_path / f'metrics-{dead_pid}.json').write_text(json.dumps(worker))
+
+    def merged():
+        return metrics.render_snapshot(metrics.merge_snapshots(metrics._other_process_snapshots()))
+
+    assert 'requests_total{route="/predict",status="200"} 2.0' in merged()
+    assert 'llm_in_flight 2' in merged()
+
+    # child_exit folds the dead worker into the archive and removes its file
+    assert metrics.archive_process(dead_pid)
+    assert not os.path.exists(tmp_path / f'metrics-{dead_pid}.json')
+    assert 'requests_total{route="/predict",status="200"} 2.0' in merged()
+    assert 'llm_in_flight 2' in merged()
+
+    # A second recycled worker adds to the same archive
+    (tmp_path / f'metrics-{dead_pid + 1}.json').write_text(json.dumps(worker))
+    assert metrics.archive_process(dead_pid + 1)
+    assert {path.name for path in tmp_path.iterdir()} == {'metrics-archive.json', f'metrics-{live_pid}.json'}
+    assert 'requests_total{route="/predict",status="200"} 3.0' in merged()
@@ -0,0 +1,153 @@
+import sys
+import os
+import asyncio
+import httpx
+import pytest
+import requests
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core import nasa_data_handler
+
+
+class _RejectedResponse:
+    status_code = 400
+
+    def raise_for_status(self):
+        raise requests.exceptions.HTTPError(response=self)
+
+
+def test_rejected_location_is_negatively_cached(monkeypatch):
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(params)
+        return _RejectedResponse()
+
+    monkeypatch.setattr(nasa_data_handler.requests, 'get', fake_get)
+    nasa_data_handler._negative_cache.clear()
+    before = nasa_data_handler.get_negative_cache_metrics()
+
+    with pytest.raises(ValueError):
+        nasa_data_handler.get_historical_data(-30.001, -140.002, '2024-06-15')
+    # Same snapped cell: answered without any network I/O
+    with pytest.raises(ValueError, match='Invalid location'):
+        nasa_data_handler.get_historical_data(-30.0, -140.0, '2024-07-01')
+
+    after = nasa_data_handler.get_negative_cache_metrics()
+    assert len(calls) == 1
+    assert after['short_circuited_requests'] - before['short_circuited_requests'] == 1
+    assert after['avoided_upstream_calls'] - before['avoided_upstream_calls'] == len(nasa_data_handler.YEAR_RANGES)
+
+
+def _power_csv(start_year, end_year):
+    rows = ["-BEGIN HEADER-", "NASA/POWER test payload", "-END HEADER-", "YEAR,DOY,WS10M,RH2M,T2M_MAX,T2M_MIN,PRECTOTCORR"]
+    for year in range(start_year, end_year + 1):
+        for doy in range(150, 181):
+            rows.append(f"{year},{doy},3.0,70.0,28.0,19.0,1.5")
+    return "\n".join(rows)
+
+
+def test_neighbour_window_wraps_across_the_year_boundary():
+    import pandas as pd
+    days = pd.date_range('2000-01-01', '2002-12-31')
+    chunk = pd.DataFrame({
+        'YEAR': days.year, 'DOY': days.dayofyear,
+        **{name: 1.0 for name in nasa_data_handler.PARAMETER_COLUMNS},
+    })
+    window = nasa_data_handler.NEIGHBOUR_WINDOW_DAYS
+
+    target_rows, neighbour_rows = nasa_data_handler.select_target_day(chunk, 12, 31)
+    assert list(target_rows['YEAR']) == [2000, 2001, 2002]
+    # Early-January rows are the following days of the previous year's 31 December
+    january = neighbour_rows[neighbour_rows['DOY'] <= window]
+    assert sorted(set(january['YEAR'])) == [2000, 2001, 2002]
+    assert set(january['OFFSET']) == set(range(1, window + 1))
+    # Both sides of the window in every year, not just the days before 31 December
+    assert (neighbour_rows['OFFSET'] < 0).sum() == (neighbour_rows['OFFSET'] > 0).sum() == 3 * window
+
+    _, neighbour_rows = nasa_data_handler.select_target_day(chunk, 1, 1)
+    assert set(neighbour_rows['OFFSET']) == set(range(-window, 0)) | set(range(1, window + 1))
+
+
+def test_async_fetch_downloads_ranges_concurrently(monkeypatch):
+    active, peak = [0], [0]
+
+    async def handler(request):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(0.05)
+        active[0] -= 1
+        start, end = int(request.url.params['start'][:4]), int(request.url.params['end'][:4])
+        return httpx.Response(200, text=_power_csv(start, end))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(nasa_data_handler, 'get_async_http_client', lambda: client)
+            return await nasa_data_handler.get_historical_data_async(12.97, 77.59, '2024-06-15')
+
+    nasa_data_handler._negative_cache.clear()
+    history = asyncio.run(run())
+
+    assert sorted(history['YEAR']) == list(range(nasa_data_handler.START_YEAR, nasa_data_handler.END_YEAR + 1))
+    assert 'neighbour_climatology' in history.attrs
+    assert 1 < peak[0] <= nasa_data_handler.NASA_MAX_CONCURRENT_REQUESTS
+
+
+def test_async_fetch_caches_rejections(monkeypatch):
+
+    async def run():
+        transport = httpx.MockTransport(lambda request: httpx.Response(404))
+        async with httpx.AsyncClient(transport=transport) as client:
+            monkeypatch.setattr(nasa_data_handler, 'get_async_http_client', lambda: client)
+            with pytest.raises(nasa_data_handler.LocationRejected, match='No data available'):
+                await nasa_data_handler.get_historical_data_async(-45.0, -120.0, '2024-06-15')
+
+    nasa_data_handler._negative_cache.clear()
+    asyncio.run(run())
+    with pytest.raises(nasa_data_handler.LocationRejected, match='No data available'):
+        nasa_data_handler.get_historical_data(-45.0, -120.0, '2024-06-15')
+
+
+def test_async_fetch_reports_timeouts_of_every_range_as_upstream_failure(monkeypatch):
+
+    def handler(request):
+        raise httpx.ReadTimeout('timed out', request=request)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(nasa_data_handler, 'get_async_http_client', lambda: client)
+            with pytest.raises(nasa_data_handler.UpstreamUnavailable):
+                await nasa_data_handler.get_historical_data_async(-46.0, -121.0, '2024-06-15')
+
+    nasa_data_handler._negative_cache.clear()
+    asyncio.run(run())
+    # Not a rejection: the location is not remembered as bad
+    assert nasa_data_handler._negative_cache.get(nasa_data_handler._snap_cell(-46.0, -121.0)) is None
+
+
+def test_async_fetch_retries_transient_errors(monkeypatch):
+    attempts = {}
+
+    async def handler(request):
+        start, end = int(request.url.params['start'][:4]), int(request.url.params['end'][:4])
+        attempts[start] = attempts.get(start, 0) + 1
+        if start == 1992 and attempts[start] == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, text=_power_csv(start, end))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(nasa_data_handler, 'get_async_http_client', lambda: client)
+            return await nasa_data_handler.get_historical_data_async(12.97, 77.59, '2024-06-15')
+
+    monkeypatch.setattr(nasa_data_handler, 'NASA_RETRY_BACKOFF_SECONDS', 0)
+    nasa_data_handler._negative_cache.clear()
+    retries = nasa_data_handler.CHUNK_RETRIES.labels('503')
+    before = retries.value
+    history = asyncio.run(run())
+
+    assert 1992 in set(history['YEAR'])
+    assert attempts[1992] == 2 and attempts[1986] == 1
+    assert retries.value - before == 1
@@ -0,0 +1,56 @@
+import sys
+import os
+import json
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import popularity_log
+
+
+def _new_worker(monkeypatch, path):
+    """Resets the module to the state of a freshly started worker process"""
+    monkeypatch.setattr(popularity_log, 'POPULARITY_LOG_PATH', path)
+    monkeypatch.setattr(popularity_log, '_entries', {})
+    monkeypatch.setattr(popularity_log, '_pending', {})
+    monkeypatch.setattr(popularity_log, '_loaded', False)
+    monkeypatch.setattr(popularity_log.firestore_service, 'get_db', lambda: None)
+
+
+def test_flushes_from_several_workers_add_up(tmp_path, monkeypatch):
+    path = str(tmp_path / 'popularity_log.json')
+    _new_worker(monkeypatch, path)
+    popularity_log.flush()  # loads the (empty) totals, as a worker does at start-up
+    worker_a = (popularity_log._entries, popularity_log._pending)
+
+    # Worker B starts, loads the same totals and counts its own traffic
+    _new_worker(monkeypatch, path)
+    for _ in range(3):
+        popularity_log.record_hit(12.97, 77.59, '2026-06-15')
+    popularity_log.record_hit(28.61, 77.21, '2026-06-15')
+    assert popularity_log.flush()
+    assert not popularity_log.flush()  # nothing new counted
+
+    # Worker A flushes its own hits afterwards; B's counts must survive
+    monkeypatch.setattr(popularity_log, '_entries', worker_a[0])
+    monkeypatch.setattr(popularity_log, '_pending', worker_a[1])
+    monkeypatch.setattr(popularity_log, '_loaded', True)
+    for _ in range(2):
+        popularity_log.record_hit(12.97, 77.59, '2026-06-15')
+    assert popularity_log.flush()
+
+    with open(path) as f:
+        persisted = json.load(f)
+    assert {key: entry['hits'] for key, entry in persisted.items()} == {
+        '12.97_77.59_06-15': 5,
+        '28.61_77.21_06-15': 1,
+    }
+    assert popularity_log.top_entries(1)[0]['hits'] == 5
+
+
+def test_hits_are_kept_when_nothing_could_be_written(tmp_path, monkeypatch):
+    _new_worker(monkeypatch, str(tmp_path / 'missing-dir' / 'popularity_log.json'))
+    popularity_log.record_hit(12.97, 77.59, '2026-06-15')
+
+    assert not popularity_log.flush()
+    assert popularity_log._pending['12.97_77.59_06-15']['hits'] == 1
@@ -0,0 +1,610 @@
+import sys
+import os
+import pandas as pd
+from datetime import datetime
+from fastapi.testclient import TestClient
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.main import app
+from app.api.auth_routes import get_current_user
+from app.core import nasa_data_handler
+from app.services import firestore_service, insight_cache, prediction_service
+
+
+def _history(lat, lon, date_str, specific_years=None):
+    years = specific_years or list(range(1990, datetime.now().year + 1))
+    return pd.DataFrame({
+        'YEAR': years,
+        'DOY': [166] * len(years),
+        'WS10M': [3.0] * len(years),
+        'RH2M': [70.0] * len(years),
+        'T2M_MAX': [28.0] * len(years),
+        'T2M_MIN': [19.0] * len(years),
+        'PRECTOTCORR': [2.0 if year % 2 else 0.5 for year in years],
+    })
+
+
+async def _history_async(*args, **kwargs):
+    return _history(*args, **kwargs)
+
+
+def _client(monkeypatch):
+    fetches = []
+
+    async def fake_fetch(*args, **kwargs):
+        fetches.append(args)
+        return _history(*args, **kwargs)
+
+    monkeypatch.setattr(nasa_data_handler, 'get_historical_data_async', fake_fetch)
+    monkeypatch.setattr(firestore_service, 'get_db', lambda: None)
+    monkeypatch.setattr(prediction_service.reasoning_agent, 'enabled', False)
+    firestore_service._memory_cache.clear()
+    insight_cache._memory_cache.clear()
+    app.dependency_overrides[get_current_user] = lambda: {'email': 'dev@example.com', 'name': 'Dev'}
+    return TestClient(app), fetches
+
+
+def test_get_and_post_share_the_cache(monkeypatch):
+    client, fetches = _client(monkeypatch)
+    try:
+        miss = client.get('/predict', params={'lat': 12.97, 'lon': 77.59, 'date': '2019-06-15'})
+        assert miss.status_code == 200
+        assert miss.json()['cache_status'] == 'miss'
+        assert miss.json()['server_already_passed'] is True
+        assert miss.json()['query']['place_name'] == 'Bengaluru, India'
+
+        hit = client.post('/predict', json={
+            'date': '2019-06-15',
+            'location': {'lat': 12.971, 'lon': 77.591},
+            'timezone': 'Asia/Kolkata',
+        })
+        assert hit.status_code == 200
+        assert hit.json()['cache_status'] == 'hit'
+        assert hit.json()['statistics'] == miss.json()['statistics']
+        assert len(fetches) == 1
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_new_years_alone_do_not_provide_the_neighbour_climatology(monkeypatch):
+    import asyncio
+
+    async def fetch_new_years(lat, lon, date_str, specific_years=None):
+        history = _history(lat, lon, date_str, specific_years)
+        history.attrs['neighbour_climatology'] = {'average_precipitation_mm': {'mean': 9.0, 'std': 0.1, 'days': 14}}
+        return history
+
+    monkeypatch.setattr(nasa_data_handler, 'get_historical_data_async', fetch_new_years)
+    decoded = _history(12.97, 77.59, '2024-06-15', list(range(1990, 2024)))  # cache series: no attrs
+
+    combined = asyncio.run(prediction_service.fetch_history_with_new_years(
+        12.97, 77.59, '2024-06-15', [2024], cached_series=decoded
+    ))
+    assert sorted(combined['YEAR']) == list(range(1990, 2025))
+    assert 'neighbour_climatology' not in combined.attrs
+
+
+def test_compute_already_passed():
+    assert prediction_service.compute_already_passed('2000-01-01', 'Asia/Kolkata') is True
+    assert prediction_service.compute_already_passed('2999-01-01', 'Not/AZone', 'night') is False
+    assert prediction_service.compute_already_passed('garbage', client_value=True) is True
+
+
+def test_llm_stages_run_concurrently_under_deadline():
+    import asyncio
+
+    async def stage(delay, value):
+        await asyncio.sleep(delay)
+        return value
+
+    async def run():
+        return await prediction_service.run_llm_stages({
+            'verification': stage(0.05, {'status': 'verified'}),
+            'insight': stage(5, {'reasoning': 'too late'}),
+        }, deadline_seconds=0.2)
+
+    results, report = asyncio.run(run())
+
+    assert results == {'verification': {'status': 'verified'}, 'insight': None}
+    assert report['verification']['status'] == 'ok'
+    assert report['insight']['status'] == 'timeout'
+
+
+def test_insights_are_cached_per_prompt_context(monkeypatch):
+    client, _ = _client(monkeypatch)
+    prompts = []
+
+    async def fake_insight(lat, lon, date_str, statistics, confidence_score, missing_data_alert,
+                           activity=None, part_of_day=None, already_passed=None, place_name=None):
+        prompts.append((activity, part_of_day, already_passed))
+        return {'reasoning': f'{activity} {part_of_day} {already_passed}', 'generated_by': 'test'}
+
+    monkeypatch.setattr(prediction_service.reasoning_agent, 'generate_insight_async', fake_insight)
+    try:
+        def predict(**params):
+            params = {'lat': 12.97, 'lon': 77.59, 'date': '2019-06-15', **params}
+            return client.get('/predict', params=params).json()['ai_insight']['reasoning']
+
+        picnic = predict(activity='picnic')
+        assert predict(activity='  Picnic ') == picnic
+        assert predict(activity='trekking') != picnic
+        assert predict(activity='picnic', part_of_day='night') != picnic
+
+        assert len(prompts) == 3
+    finally:
+        app.dependency_overrides.clear()
+
+
+def _sse_events(body):
+    import json
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_stream_sends_statistics_then_tokens_then_done(monkeypatch):
+    client, _ = _client(monkeypatch)
+
+    async def fake_stream(*args, **kwargs):
+        for chunk in ['Bring ', 'an ', 'umbrella.']:
+            yield chunk
+
+    monkeypatch.setattr(prediction_service.reasoning_agent, 'generate_insight_stream_async', fake_stream)
+    try:
+        params = {'lat': 12.97, 'lon': 77.59, 'date': '2019-06-15', 'activity': 'picnic'}
+        first = client.get('/predict/stream', params=params)
+        assert first.status_code == 200
+        assert first.headers['content-type'].startswith('text/event-stream')
+
+        events = _sse_events(first.text)
+        names = [name for name, _ in events]
+        assert names == ['statistics', 'insight_token', 'insight_token', 'insight_token', 'done']
+        assert events[0][1]['cache_status'] == 'miss'
+        assert events[-1][1]['verification']['status'] == 'verified'
+        assert events[-1][1]['pipeline_status'] == 'complete'
+
+        # The streamed insight was cached: the next request gets it in one event
+        events = _sse_events(client.get('/predict/stream', params=params).text)
+        assert [name for name, _ in events] == ['statistics', 'insight', 'done']
+        assert events[0][1]['cache_status'] == 'hit'
+        assert events[1][1]['reasoning'] == 'Bring an umbrella.'
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_stream_closed_after_statistics_still_caches_them(monkeypatch):
+    import asyncio
+    monkeypatch.setattr(nasa_data_handler, 'get_historical_data_async', _history_async)
+    monkeypatch.setattr(firestore_service, 'get_db', lambda: None)
+    firestore_service._memory_cache.clear()
+    saved = []
+    save = firestore_service.save_prediction_to_cache_async
+
+    async def recording_save(*args, **kwargs):
+        saved.append(args[:3])
+        return await save(*args, **kwargs)
+
+    monkeypatch.setattr(firestore_service, 'save_prediction_to_cache_async', recording_save)
+
+    async def run():
+        resolved = await prediction_service.resolve_statistics(12.97, 77.59, '2019-06-15')
+        assert resolved['cache_status'] == 'miss'
+        events = prediction_service.stream_prediction(resolved, 12.97, 77.59, '2019-06-15')
+        name, _ = await events.__anext__()
+        assert name == 'statistics'
+        # The client disconnects right after the first event
+        await events.aclose()
+
+    asyncio.run(run())
+    assert saved == [(12.97, 77.59, '2019-06-15')]
+    assert firestore_service.get_prediction_from_cache(12.97, 77.59, '2019-06-15') is not None
+
+
+def test_deferred_insight_is_fetched_with_its_token(monkeypatch):
+    import asyncio
+    monkeypatch.setattr(nasa_data_handler, 'get_historical_data_async', _history_async)
+    monkeypatch.setattr(firestore_service, 'get_db', lambda: None)
+    monkeypatch.setattr(prediction_service.reasoning_agent, 'enabled', True)
+    firestore_service._memory_cache.clear()
+    insight_cache._memory_cache.clear()
+
+    async def slow_insight(*args, **kwargs):
+        await asyncio.sleep(0.1)
+        return {'reasoning': 'Clear skies.', 'generated_by': 'test'}
+
+    monkeypatch.setattr(prediction_service.reasoning_agent, 'generate_insight_async', slow_insight)
+
+    async def run():
+        response = await prediction_service.run_prediction(12.97, 77.59, '2019-06-15', defer_insight=True)
+        token = response['insight_pending']
+        assert 'ai_insight' not in response
+        assert (await prediction_service.get_deferred_insight(token))['status'] == 'pending'
+
+        ready = await prediction_service.get_deferred_insight(token, wait=2)
+        assert ready == {'status': 'ready', 'ai_insight': {'reasoning': 'Clear skies.', 'generated_by': 'test'}}
+
+        # Later requests for the same context get the insight inline
+        again = await prediction_service.run_prediction(12.97, 77.59, '2019-06-15', defer_insight=True)
+        assert again['ai_insight']['reasoning'] == 'Clear skies.'
+        assert (await prediction_service.get_deferred_insight('0' * 64))['status'] == 'unknown'
+
+    asyncio.run(run())
+
+
+def test_deferred_insight_polls_work_on_any_worker(tmp_path, monkeypatch):
+    import asyncio
+    import time
+    from app.utils.shared_cache import tiered_cache
+
+    path = str(tmp_path / 'cache.sqlite3')
+    # This process plays the worker that receives the polls; worker A generated the token
+    monkeypatch.setattr(insight_cache, '_memory_cache', tiered_cache('insights', 64, 3600, path=path))
+    monkeypatch.setattr(insight_cache, '_status_cache', tiered_cache('insight_status', 64, 600, path=path, memory_ttl_seconds=0))
+    monkeypatch.setattr(firestore_service, 'get_async_db', lambda: None)
+    worker_a_insights = tiered_cache('insights', 64, 3600, path=path)
+    worker_a_status = tiered_cache('insight_status', 64, 600, path=path, memory_ttl_seconds=0)
+    token, failed_token = 'a' * 64, 'b' * 64
+
+    async def worker_a_finishes():
+        await asyncio.sleep(0.3)
+        worker_a_insights.set(token, {'reasoning': 'Clear skies.', 'generated_by': 'test'})
+
+    async def run():
+        assert (await prediction_service.get_deferred_insight(token))['status'] == 'unknown'
+        worker_a_status.set(token, 'pending', ttl_seconds=120)
+        assert (await prediction_service.get_deferred_insight(token))['status'] == 'pending'
+
+        generation = asyncio.create_task(worker_a_finishes())
+        started = time.perf_counter()
+        ready = await prediction_service.get_deferred_insight(token, wait=5)
+        await generation
+        assert ready['status'] == 'ready' and ready['ai_insight']['reasoning'] == 'Clear skies.'
+        assert time.perf_counter() - started < 2
+
+        worker_a_status.set(failed_token, 'failed')
+        assert (await prediction_service.get_deferred_insight(failed_token, wait=5))['status'] == 'failed'
+
+    asyncio.run(run())
+
+
+def test_range_prediction_batches_insights(monkeypatch):
+    client, fetches = _client(monkeypatch)
+    batches = []
+
+    async def fake_batch(lat, lon, items, activity=None, part_of_day=None, place_name=None):
+        batches.append([item['date_str'] for item in items])
+        return [{'reasoning': f"insight {item['date_str']}", 'generated_by': 'test'} for item in items]
+
+    monkeypatch.setattr(prediction_service.reasoning_agent, 'generate_insights_batch', fake_batch)
+    try:
+        body = {'lat': 12.97, 'lon': 77.59, 'start_date': '2019-06-14', 'end_date': '2019-06-16'}
+        response = client.post('/predict/range', json=body)
+        assert response.status_code == 200
+        days = response.json()['days']
+        assert [day['query']['date'] for day in days] == ['2019-06-14', '2019-06-15', '2019-06-16']
+        assert days[1]['ai_insight']['reasoning'] == 'insight 2019-06-15'
+        assert batches == [['2019-06-14', '2019-06-15', '2019-06-16']]
+
+        # Everything is cached now: no new batch
+        client.post('/predict/range', json=body)
+        assert len(batches) == 1
+        assert len(fetches) == 3
+
+        too_long = client.post('/predict/range', json=dict(body, end_date='2019-08-01'))
+        assert too_long.status_code == 400
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_range_prediction_fetches_cold_dates_concurrently(monkeypatch):
+    import asyncio
+
+    client, _ = _client(monkeypatch)
+    in_flight, peak = [0], [0]
+
+    async def slow_history(*args, **kwargs):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.05)
+        in_flight[0] -= 1
+        return _history(*args, **kwargs)
+
+    monkeypatch.setattr(nasa_data_handler, 'get_historical_data_async', slow_history)
+    try:
+        response = client.post('/predict/range', json={
+            'lat': 12.97, 'lon': 77.59, 'start_date': '2019-06-01', 'end_date': '2019-06-14'
+        })
+        assert response.status_code == 200
+        assert len(response.json()['days']) == 14
+        assert peak[0] == 14
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_cache_hits_stay_fast_while_misses_are_in_flight(monkeypatch):
+    import asyncio
+    import time
+
+    async def slow_history(*args, **kwargs):
+        # A cold NASA fetch: seconds of network I/O
+        await asyncio.sleep(1.0)
+        return _history(*args, **kwargs)
+
+    monkeypatch.setattr(nasa_data_handler, 'get_historical_data_async', _history_async)
+    monkeypatch.setattr(firestore_service, 'get_db', lambda: None)
+    monkeypatch.setattr(prediction_service.reasoning_agent, 'enabled', False)
+    firestore_service._memory_cache.clear()
+    insight_cache._memory_cache.clear()
+
+    async def run():
+        await prediction_service.run_prediction(12.97, 77.59, '2019-06-15')
+        monkeypatch.setattr(nasa_data_handler, 'get_historical_data_async', slow_history)
+
+        misses = [
+            asyncio.create_task(prediction_service.run_prediction(10.0 + i, 70.0, '2019-06-15'))
+            for i in range(8)
+        ]
+        await asyncio.sleep(0)
+
+        latencies = []
+        for _ in range(100):
+            started = time.perf_counter()
+            hit = await prediction_service.run_prediction(12.97, 77.59, '2019-06-15')
+            latencies.append(time.perf_counter() - started)
+            assert hit['cache_status'] == 'hit'
+
+        assert not any(task.done() for task in misses)
+        results = await asyncio.gather(*misses)
+        return sorted(latencies), results
+
+    latencies, misses = asyncio.run(run())
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    assert p99 < 0.1
+    assert all(result['cache_status'] == 'miss' for result in misses)
+
+
+def test_batch_dedupes_items_and_reports_errors_per_item(monkeypatch):
+    client, fetches = _client(monkeypatch)
+    fetch = nasa_data_handler.get_historical_data_async
+
+    async def fetch_or_reject(lat, lon, date_str, specific_years=None):
+        if lat < -60:
+            raise nasa_data_handler.LocationRejected(f"No data available for location ({lat}, {lon}).")
+        return await fetch(lat, lon, date_str, specific_years)
+
+    monkeypatch.setattr(nasa_data_handler, 'get_historical_data_async', fetch_or_reject)
+    monkeypatch.setattr(prediction_service.reasoning_agent, 'enabled', True)
+
+    async def no_insight(*args, **kwargs):
+        raise AssertionError('skip_llm must not generate insights')
+
+    monkeypatch.setattr(prediction_service.reasoning_agent, 'generate_insight_async', no_insight)
+    try:
+        client.get('/predict', params={'lat': 48.85, 'lon': 2.35, 'date': '2019-07-01'})
+        fetches.clear()
+
+        response = client.post('/predict/batch', json={
+            'skip_llm': True,
+            'items': [
+                {'lat': 12.97, 'lon': 77.59, 'date': '2019-06-15'},
+                {'lat': 12.971, 'lon': 77.591, 'date': '2019-06-15'},
+                {'lat': 12.97, 'lon': 77.59, 'date': '2020-06-15'},
+                {'lat': 48.85, 'lon': 2.35, 'date': '2019-07-01'},
+                {'lat': 95.0, 'lon': 0.0, 'date': '2019-06-15'},
+                {'lat': -70.0, 'lon': 10.0, 'date': '2019-06-15'},
+            ],
+        })
+        assert response.status_code == 200
+        body = response.json()
+        results = body['results']
+
+        assert [result['index'] for result in results] == list(range(6))
+        assert results[0]['prediction']['cache_status'] == 'miss'
+        assert results[1]['prediction'] == results[0]['prediction']
+        assert results[2]['prediction']['query']['date'] == '2020-06-15'
+        assert results[3]['prediction']['cache_status'] == 'hit'
+        assert results[4]['error']['code'] == 'invalid_request'
+        assert results[5]['error'] == {
+            'status_code': 400,
+            'code': 'location_rejected',
+            'detail': 'No data available for location (-70.0, 10.0).',
+        }
+        # One fetch per snapped cell and month-day: the 2019 and 2020 items share it
+        assert len(fetches) == 1
+        assert body['summary']['items'] == 6
+        assert body['summary']['unique'] == 4
+        assert body['summary']['errors'] == 2
+        assert all('ai_insight' not in result.get('prediction', {}) for result in results)
+
+        too_many = client.post('/predict/batch', json={
+            'items': [{'lat': 1.0, 'lon': 1.0, 'date': '2019-06-15'}] * (prediction_service.BATCH_MAX_ITEMS + 1)
+        })
+        assert too_many.status_code == 400
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_batch_verifies_statistics_once_per_cell_and_month_day(monkeypatch):
+    client, fetches = _client(monkeypatch)
+    verify = prediction_service.verification_agent_instance.verify_statistics_async
+    verified_dates = []
+
+    async def counting_verify(**kwargs):
+        verified_dates.append(kwargs['date'])
+        return await verify(**kwargs)
+
+    monkeypatch.setattr(prediction_service.verification_agent_instance, 'verify_statistics_async', counting_verify)
+    try:
+        response = client.post('/predict/batch', json={
+            'skip_llm': True,
+            'items': [{'lat': 12.97, 'lon': 77.59, 'date': f'{year}-06-15'} for year in (2019, 2020, 2021)],
+        })
+        results = response.json()['results']
+        assert [result['status'] for result in results] == ['ok', 'ok', 'ok']
+        assert verified_dates == ['2019-06-15']
+        assert len(fetches) == 1
+        # Every date still gets the shared verification block
+        verification = results[0]['prediction']['verification']
+        assert all(result['prediction']['verification'] == verification for result in results)
+        assert [result['prediction']['query']['date'] for result in results] == ['2019-06-15', '2020-06-15', '2021-06-15']
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_fields_projection_and_compression(monkeypatch):
+    from app.utils import compression
+    monkeypatch.setattr(compression, 'COMPRESSION_MIN_SIZE', 200)
+    client, _ = _client(monkeypatch)
+    try:
+        params = {'lat': 12.97, 'lon': 77.59, 'date': '2019-06-15'}
+        full = client.get('/predict', params=params, headers={'Accept-Encoding': 'gzip'})
+        assert full.status_code == 200
+        assert full.headers['content-encoding'] == 'gzip'
+        assert 'verification' in full.json()
+
+        mobile = client.get('/predict', params={**params, 'fields': 'statistics,query.place_name'})
+        assert set(mobile.json()) == {'statistics', 'query'}
+        assert mobile.json()['query'] == {'place_name': 'Bengaluru, India'}
+        assert mobile.json()['statistics'] == full.json()['statistics']
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_predict_etag_revalidation(monkeypatch):
+    from app.utils import compression
+    monkeypatch.setattr(compression, 'COMPRESSION_MIN_SIZE', 200)
+    client, fetches = _client(monkeypatch)
+    try:
+        params = {'lat': 12.97, 'lon': 77.59, 'date': '2019-06-15'}
+        first = client.get('/predict', params=params, headers={'Accept-Encoding': 'identity'})
+        etag = first.headers['etag']
+        assert first.headers['cache-control'].startswith('private, max-age=')
+        assert 'Authorization' not in first.headers['vary']
+
+        # The second request is a cache hit, but the content (and ETag) is the same
+        again = client.get('/predict', params=params, headers={'If-None-Match': etag, 'Accept-Encoding': 'identity'})
+        assert again.status_code == 304
+        assert again.content == b''
+        assert again.headers['etag'] == etag
+        assert 'Accept-Encoding' in again.headers['vary']
+
+        # A 304 for the gzip representation repeats that representation's validators
+        zipped = client.get('/predict', params=params, headers={'Accept-Encoding': 'gzip'})
+        assert zipped.headers['content-encoding'] == 'gzip'
+        assert zipped.headers['etag'] == etag[:-1] + '-gzip"'
+        revalidated = client.get('/predict', params=params,
+                                 headers={'If-None-Match': zipped.headers['etag'], 'Accept-Encoding': 'gzip'})
+        assert revalidated.status_code == 304
+        assert revalidated.headers['etag'] == zipped.headers['etag']
+        assert 'Accept-Encoding' in revalidated.headers['vary']
+
+        posted = client.post('/predict', json={'date': '2019-06-15', 'lat': 12.97, 'lon': 77.59},
+                             headers={'If-None-Match': etag})
+        assert posted.status_code == 304
+
+        other_day = client.get('/predict', params={**params, 'date': '2019-06-16'}, headers={'If-None-Match': etag})
+        assert other_day.status_code == 200
+
+        timed = client.get('/predict', params={**params, 'debug': 'timing'}, headers={'If-None-Match': etag})
+        assert timed.status_code == 200
+        assert timed.headers['cache-control'] == 'no-store'
+        assert len(fetches) == 2
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_current_weather_etag_ignores_fetch_timestamp(monkeypatch):
+    from app.api import routes
+    calls = []
+
+    async def fake_current_weather(lat, lon):
+        calls.append((lat, lon))
+        return {'location': {'lat': lat, 'lon': lon}, 'timestamp': f'2026-10-19T12:00:0{len(calls)}', 'condition': 'sunny'}
+
+    monkeypatch.setattr(routes.CurrentWeatherService, 'get_current_weather_async', fake_current_weather)
+    app.dependency_overrides[get_current_user] = lambda: {'email': 'dev@example.com', 'name': 'Dev'}
+    client = TestClient(app)
+    try:
+        first = client.get('/weather/current', params={'lat': 12.97, 'lon': 77.59})
+        assert first.headers['cache-control'] == routes.WEATHER_CACHE_CONTROL
+        assert first.headers['cache-control'].startswith('private')
+        again = client.get('/weather/current', params={'lat': 12.97, 'lon': 77.59},
+                           headers={'If-None-Match': first.headers['etag']})
+        assert again.status_code == 304
+        assert len(calls) == 2
+    finally:
+        app.dependency_overrides.clear()
+
+
+def _metric(text, sample):
+    for line in text.splitlines():
+        if line.startswith(sample + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+
+def test_metrics_endpoint_reports_requests_cache_outcomes_and_stage_timings(monkeypatch):
+    client, _ = _client(monkeypatch)
+    miss = 'willitrain_cache_requests_total{cache="prediction",status="miss"}'
+    hit = 'willitrain_cache_requests_total{cache="prediction",status="hit"}'
+    requests_ok = 'willitrain_http_requests_total{method="GET",route="/predict",status="200"}'
+    stats = 'willitrain_statistics_duration_seconds_count'
+    try:
+        before = client.get('/metrics').text
+        params = {'lat': 12.97, 'lon': 77.59, 'date': '2019-06-15'}
+        assert client.get('/predict', params=params).status_code == 200
+        assert client.get('/predict', params=params).status_code == 200
+
+        response = client.get('/metrics')
+        assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+        after = response.text
+        assert _metric(after, miss) - _metric(before, miss) == 1
+        assert _metric(after, hit) - _metric(before, hit) == 1
+        assert _metric(after, requests_ok) - _metric(before, requests_ok) == 2
+        assert _metric(after, stats) - _metric(before, stats) == 1
+        assert 'willitrain_http_request_duration_seconds_bucket{method="GET",route="/predict",le="+Inf"}' in after
+        assert 'willitrain_cache_lookup_duration_seconds_count{source="memory"}' in after
+        assert 'willitrain_llm_in_flight' in after
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_debug_timing_returns_the_stage_breakdown(monkeypatch):
+    client, _ = _client(monkeypatch)
+    try:
+        params = {'lat': 12.97, 'lon': 77.59, 'date': '2019-06-15'}
+        plain = client.get('/predict', params=params)
+        assert 'server-timing' not in plain.headers
+
+        response = client.get('/predict', params={**params, 'debug': 'timing'})
+        stages = [stage['name'] for stage in response.json()['debug']['stages']]
+        assert 'cache.read' in stages
+        assert len(response.json()['debug']['trace_id']) == 32
+        assert 'cache.read;dur=' in response.headers['server-timing']
+        assert 'total;dur=' in response.headers['server-timing']
+
+        # POST carries debug in the body
+        posted = client.post('/predict', json={
+            'date': '2019-06-16', 'location': {'lat': 12.97, 'lon': 77.59}, 'debug': 'timing'
+        })
+        stages = [stage['name'] for stage in posted.json()['debug']['stages']]
+        assert {'cache.read', 'statistics', 'verification', 'cache.write'} <= set(stages)
+        assert 'statistics;dur=' in posted.headers['server-timing']
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_batch_error_codes_separate_rejected_locations_from_upstream_failures():
+    def code(error):
+        result = prediction_service.batch_error(error)
+        return result['status_code'], result['code']
+
+    assert code(nasa_data_handler.LocationRejected('No data available')) == (400, 'location_rejected')
+    # Every range timed out: transient, so clients should retry rather than drop the location
+    assert code(nasa_data_handler.UpstreamUnavailable('No historical data found')) == (502, 'upstream_error')
+    assert code(LookupError('no years')) == (404, 'no_data')
+    assert code(ValueError('bad date')) == (400, 'invalid_request')
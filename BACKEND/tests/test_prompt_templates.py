@@ -0,0 +1,90 @@
+import sys
+import os
+import pytest
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core import prompt_templates
+from app.core.prompt_templates import PromptTemplate, PromptBudgetExceeded, estimate_tokens, record_usage
+from app.core.reasoning_agent import ReasoningAgent, INSIGHT_PROMPT
+from app.core.verification_agent import DataVerificationAgent
+
+
+STATS = {
+    'data_years_count': 40,
+    'precipitation_probability_percent': 40.0,
+    'average_precipitation_mm': 1.2,
+    'average_temperature_celsius': 21.5,
+    'max_temperature_celsius': 25.0,
+    'min_temperature_celsius': 18.0,
+    'average_wind_speed_mps': 3.5,
+    'average_humidity_percent': 70.0,
+}
+
+
+def test_render_interpolates_fields_after_static_preamble():
+    template = PromptTemplate("t", preamble="  Static rules.\n", body="Rain: {rain:.1f}% at {place}")
+    prompt = template.render(rain=12.345, place="Pune")
+    assert prompt == "Static rules.\n\nRain: 12.3% at Pune"
+    assert template.fields == {"rain", "place"}
+
+
+def test_optional_fields_are_dropped_to_fit_budget():
+    template = PromptTemplate("t", preamble="Rules.", body="{core}{extra}", optional=("extra",), budget=20)
+    prompt = template.render(core="x" * 40, extra="y" * 200)
+    assert "y" not in prompt
+    assert estimate_tokens(prompt) <= 20
+
+    with pytest.raises(PromptBudgetExceeded):
+        template.render(core="x" * 400, extra="")
+
+
+def test_fingerprint_tracks_template_text():
+    a = PromptTemplate("t", preamble="Rules.", body="{x}")
+    b = PromptTemplate("t", preamble="Rules.", body="{x}")
+    c = PromptTemplate("t", preamble="Other rules.", body="{x}")
+    assert a.fingerprint == b.fingerprint
+    assert a.fingerprint != c.fingerprint
+
+
+def test_record_usage_prefers_sdk_counts():
+    class Usage:
+        prompt_token_count = 321
+        candidates_token_count = 54
+
+    class Response:
+        usage_metadata = Usage()
+
+    template = PromptTemplate("usage_test", preamble="Rules.", body="{x}")
+    assert record_usage(template, "p" * 40, "r" * 8, Response()) == {"prompt_tokens": 321, "response_tokens": 54}
+    assert record_usage(template, "p" * 40, "r" * 8) == {"prompt_tokens": 10, "response_tokens": 2}
+
+    stats = prompt_templates.get_prompt_stats()["usage_test"]
+    assert stats["calls"] == 2
+    assert stats["prompt_tokens"] == 331
+    assert stats["max_prompt_tokens"] == 321
+
+
+def test_insight_prompt_uses_wind_speed_and_place():
+    agent = ReasoningAgent.__new__(ReasoningAgent)
+    prompt = agent._build_prompt(12.97, 77.59, '2025-06-15', STATS, 0.9, activity='picnic',
+                                 already_passed=True, place_name='Bengaluru, India')
+
+    assert prompt.startswith(INSIGHT_PROMPT.preamble)
+    assert "Wind Speed: 3.5 m/s" in prompt
+    assert "Bengaluru, India (Latitude 12.97, Longitude 77.59)" in prompt
+    assert "**Planned Activity**: Picnic" in prompt
+    assert "ALREADY_PASSED: True" in prompt
+    assert "June 15" in prompt
+
+
+def test_verification_prompt_keeps_static_instructions_first():
+    agent = DataVerificationAgent.__new__(DataVerificationAgent)
+    rule_check = {"needs_review": True, "violations": [], "outliers": ["Rain z-score 5.0"]}
+    prompt = agent._build_verification_prompt(STATS, {'lat': 1.0, 'lon': 2.0}, '2025-06-15', rule_check)
+
+    assert prompt.index("RESPOND IN THIS EXACT JSON FORMAT") < prompt.index("STATISTICS TO VERIFY")
+    assert "- Wind Speed: 3.5 m/s" in prompt
+    assert "FLAGGED BY AUTOMATED CHECKS" in prompt
+    assert "- Rain z-score 5.0" in prompt
@@ -0,0 +1,78 @@
+import sys
+import os
+import asyncio
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.reasoning_agent import ReasoningAgent
+from app.core.llm_client import LLMClient
+
+
+STATS = {
+    'data_years_count': 40,
+    'precipitation_probability_percent': 40.0,
+    'average_precipitation_mm': 1.2,
+    'average_temperature_celsius': 21.5,
+    'max_temperature_celsius': 25.0,
+    'min_temperature_celsius': 18.0,
+    'average_wind_speed_mps': 3.5,
+    'average_humidity_percent': 70.0,
+}
+
+
+class Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class ScriptedModel:
+    """Answers batched prompts with a fixed text and single prompts with their date"""
+
+    def __init__(self, batch_text):
+        self.batch_text = batch_text
+        self.prompts = []
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        if 'JSON ARRAY' in prompt:
+            return Response(self.batch_text)
+        return Response('single insight')
+
+
+def _agent(model):
+    agent = ReasoningAgent()
+    agent.enabled = True
+    agent.model = model
+    agent.llm = LLMClient(max_concurrency=4, max_queue=10, queue_timeout=5, call_timeout=5)
+    return agent
+
+
+def _items(*dates):
+    return [{'date_str': date, 'statistics': STATS, 'confidence_score': 0.9} for date in dates]
+
+
+def test_batch_uses_one_call():
+    model = ScriptedModel('```json\n[{"date": "2025-06-01", "insight": "Sunny."}, '
+                          '{"date": "2025-06-02", "insight": "Showers."}]\n```')
+    agent = _agent(model)
+
+    results = asyncio.run(agent.generate_insights_batch(12.97, 77.59, _items('2025-06-01', '2025-06-02')))
+
+    assert [result['reasoning'] for result in results] == ['Sunny.', 'Showers.']
+    assert len(model.prompts) == 1
+
+
+def test_batch_falls_back_per_item_for_unparsed_dates():
+    model = ScriptedModel('[{"date": "2025-06-01", "insight": "Sunny."}]')
+    agent = _agent(model)
+
+    results = asyncio.run(agent.generate_insights_batch(12.97, 77.59, _items('2025-06-01', '2025-06-02')))
+    assert [result['reasoning'] for result in results] == ['Sunny.', 'single insight']
+    assert len(model.prompts) == 2
+
+    model = ScriptedModel('Sorry, here are your insights in prose.')
+    agent = _agent(model)
+    results = asyncio.run(agent.generate_insights_batch(12.97, 77.59, _items('2025-06-01', '2025-06-02')))
+    assert [result['reasoning'] for result in results] == ['single insight', 'single insight']
+    assert len(model.prompts) == 3
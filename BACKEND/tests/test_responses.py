@@ -0,0 +1,133 @@
+import sys
+import os
+import gzip
+import numpy as np
+from fastapi import FastAPI, Header
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import compression
+from app.utils.compression import CompressionMiddleware, negotiate_encoding
+from app.utils.responses import (
+    FastJSONResponse, cacheable_response, compute_etag, dumps, etag_matches, parse_fields, project_fields
+)
+
+
+def test_dumps_handles_numpy_and_nan():
+    payload = {'mean': np.float64(1.5), 'count': np.int64(3), 'values': np.array([1, 2]), 'missing': float('nan')}
+    assert dumps(payload) == b'{"mean":1.5,"count":3,"values":[1,2],"missing":null}'
+
+
+def test_project_fields_keeps_selected_paths_only():
+    payload = {'query': {'lat': 1, 'place_name': 'X'}, 'statistics': {'a': 1}, 'verification': {'notes': '...'}}
+
+    assert project_fields(payload, None) is payload
+    assert project_fields(payload, parse_fields('statistics, query.place_name,unknown,query.nope')) == {
+        'statistics': {'a': 1},
+        'query': {'place_name': 'X'},
+    }
+    assert parse_fields(' , ') is None
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding('') is None
+    assert negotiate_encoding('gzip;q=0') is None
+    assert negotiate_encoding('deflate, gzip;q=0.5') == 'gzip'
+    expected = 'br' if compression.brotli is not None else 'gzip'
+    assert negotiate_encoding('gzip;q=0.8, br') == expected
+    assert negotiate_encoding('*') == expected
+
+
+def _app():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get('/big')
+    async def big():
+        return {'text': 'rain ' * 200}
+
+    @app.get('/small')
+    async def small():
+        return {'ok': True}
+
+    @app.get('/stream')
+    async def stream():
+        async def events():
+            for i in range(3):
+                yield f"data: {'x' * 200}{i}\n\n"
+        return StreamingResponse(events(), media_type='text/event-stream')
+
+    return TestClient(app)
+
+
+def test_middleware_compresses_large_complete_responses_only():
+    client = _app()
+    headers = {'Accept-Encoding': 'gzip'}
+
+    big = client.get('/big', headers=headers)
+    assert big.headers['content-encoding'] == 'gzip'
+    assert 'Accept-Encoding' in big.headers['vary']
+    assert int(big.headers['content-length']) < 1000
+    assert big.json() == {'text': 'rain ' * 200}
+
+    small = client.get('/small', headers=headers)
+    assert 'content-encoding' not in small.headers and 'vary' not in small.headers
+    plain = client.get('/big', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in plain.headers
+    # Sent as is to this client, but compressible: caches must key on Accept-Encoding
+    assert plain.headers['vary'] == 'Accept-Encoding'
+
+    stream = client.get('/stream', headers=headers)
+    assert 'content-encoding' not in stream.headers and 'vary' not in stream.headers
+    assert stream.text.count('data: ') == 3
+
+
+def test_gzip_body_round_trips():
+    body = dumps({'text': 'sun ' * 100})
+    assert gzip.decompress(compression.compress(body, 'gzip')) == body
+
+
+def test_etag_ignores_excluded_keys_and_key_order():
+    a = compute_etag({'x': 1, 'y': {'b': 2, 'a': 1}, 'timestamp': 'now'}, exclude=('timestamp',))
+    b = compute_etag({'y': {'a': 1, 'b': 2}, 'x': 1, 'timestamp': 'later'}, exclude=('timestamp',))
+    assert a == b
+    assert a != compute_etag({'x': 2, 'y': {'a': 1, 'b': 2}})
+
+
+def test_etag_matches_weak_compressed_and_listed_tags():
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"zzz", "abc-gzip"', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"abcd"', etag)
+
+
+def test_compressed_response_gets_a_distinct_strong_etag():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=10)
+
+    @app.get('/cached')
+    async def cached(if_none_match: str = Header(None)):
+        return cacheable_response({'text': 'fog ' * 50}, if_none_match, 'max-age=60')
+
+    client = TestClient(app)
+    plain = client.get('/cached', headers={'Accept-Encoding': 'identity'})
+    zipped = client.get('/cached', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['etag'] == plain.headers['etag'][:-1] + '-gzip"'
+    assert etag_matches(zipped.headers['etag'], plain.headers['etag'])
+
+
+def test_public_cache_control_varies_on_authorization():
+    private = cacheable_response({'x': 1}, None, 'private, max-age=60')
+    assert 'vary' not in private.headers
+
+    public = cacheable_response({'x': 1}, None, 'public, max-age=60, s-maxage=600')
+    assert public.headers['vary'] == 'Authorization'
+    not_modified = cacheable_response({'x': 1}, public.headers['etag'], 'Public, max-age=60')
+    assert not_modified.status_code == 304
+    assert not_modified.headers['vary'] == 'Authorization'
@@ -0,0 +1,87 @@
+import sys
+import os
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+
+from app.core import nasa_data_handler, rule_validator, statistical_engine
+
+
+VALID_STATS = {
+    'data_years_count': 40,
+    'precipitation_probability_percent': 40.0,
+    'average_precipitation_mm': 1.2,
+    'average_temperature_celsius': 21.5,
+    'max_temperature_celsius': 25.0,
+    'min_temperature_celsius': 18.0,
+    'average_wind_speed_mps': 3.5,
+    'average_humidity_percent': 70.0,
+    'years_analyzed': '1984-2023',
+}
+
+
+def test_valid_statistics_pass():
+    check = rule_validator.validate_statistics(VALID_STATS)
+    assert check['is_valid'] is True
+    assert check['needs_review'] is False
+
+
+def test_bounds_and_consistency_violations():
+    stats = dict(VALID_STATS, average_humidity_percent=130.0, min_temperature_celsius=27.0)
+    check = rule_validator.validate_statistics(stats)
+    assert check['is_valid'] is False
+    assert any('average_humidity_percent' in v for v in check['violations'])
+    assert any('above max temperature' in v for v in check['violations'])
+
+    stats = dict(VALID_STATS, precipitation_probability_percent=80.0, average_precipitation_mm=0.2)
+    assert not rule_validator.validate_statistics(stats)['is_valid']
+
+    stats = dict(VALID_STATS, data_years_count=60)
+    assert not rule_validator.validate_statistics(stats)['is_valid']
+
+
+def test_climatology_outlier_is_flagged_but_not_invalid():
+    climatology = {
+        'average_temperature_celsius': {'mean': 8.0, 'std': 1.5, 'days': 14},
+        'average_humidity_percent': {'mean': 69.0, 'std': 0.5, 'days': 14},
+    }
+    check = rule_validator.validate_statistics(VALID_STATS, climatology)
+    assert check['is_valid'] is True
+    assert check['needs_review'] is True
+    assert len(check['outliers']) == 1
+    # The std floor keeps a 1% humidity difference from being an outlier
+    assert abs(check['z_scores']['average_humidity_percent']) < 1
+
+
+def _daily_frame(years):
+    rows = []
+    for year in years:
+        for day in pd.date_range(f"{year}-01-01", f"{year}-12-31"):
+            rows.append({'YEAR': year, 'DOY': day.dayofyear, 'WS10M': 3.0, 'RH2M': 60.0,
+                         'T2M_MAX': 25.0 + day.dayofyear / 100, 'T2M_MIN': 15.0, 'PRECTOTCORR': 0.0})
+    return pd.DataFrame(rows)
+
+
+def test_select_target_day_handles_leap_years():
+    df = _daily_frame([2019, 2020])
+
+    target, neighbours = nasa_data_handler.select_target_day(df, 3, 1)
+    # 03-01 is DOY 60 in 2019 and DOY 61 in 2020
+    assert target.set_index('YEAR')['DOY'].to_dict() == {2019: 60, 2020: 61}
+    assert sorted(neighbours['OFFSET'].unique()) == [o for o in range(-7, 8) if o != 0]
+
+    target, _ = nasa_data_handler.select_target_day(df, 2, 29)
+    assert target['YEAR'].tolist() == [2020]
+
+
+def test_neighbour_climatology():
+    df = _daily_frame([2019, 2020])
+    _, neighbours = nasa_data_handler.select_target_day(df, 6, 15)
+    climatology = statistical_engine.calculate_neighbour_climatology(neighbours)
+
+    assert climatology['average_humidity_percent'] == {'mean': 60.0, 'std': 0.0, 'days': 14}
+    assert np.isclose(climatology['min_temperature_celsius']['mean'], 15.0)
+    assert statistical_engine.calculate_neighbour_climatology(neighbours.iloc[0:0]) == {}
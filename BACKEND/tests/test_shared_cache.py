@@ -0,0 +1,137 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.shared_cache import SharedCache, tiered_cache
+from app.services import cache_codec
+
+
+def _write_from_child(path):
+    SharedCache(path, 'predictions', ttl_seconds=60).set('12.97_77.59_06-15', {'written_by': os.getpid()})
+
+
+def _update_from_child(path, key, value):
+    tiered_cache('predictions', maxsize=8, ttl_seconds=3600, path=path).set(key, value)
+
+
+def test_get_set_delete_and_expiry(tmp_path):
+    cache = SharedCache(str(tmp_path / 'cache.sqlite3'), 'predictions', ttl_seconds=60)
+
+    assert cache.get('missing', 'default') == 'default'
+    cache.set('a', {'value': 1})
+    cache.set('short', 'gone soon', ttl_seconds=0.05)
+    assert cache.get('a') == {'value': 1}
+    time.sleep(0.1)
+    assert cache.get('short') is None
+
+    cache.delete('a')
+    assert cache.get('a') is None
+    assert cache.stats()['hits'] == 1
+
+
+def test_namespaces_are_isolated(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    predictions = SharedCache(path, 'predictions', ttl_seconds=60)
+    insights = SharedCache(path, 'insights', ttl_seconds=60)
+
+    predictions.set('key', 'prediction')
+    insights.set('key', 'insight')
+    insights.clear()
+
+    assert predictions.get('key') == 'prediction'
+    assert insights.get('key') is None
+
+
+def test_values_written_by_another_process_are_visible(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    child = multiprocessing.get_context('spawn').Process(target=_write_from_child, args=(path,))
+    child.start()
+    child.join(timeout=30)
+
+    value = SharedCache(path, 'predictions', ttl_seconds=60).get('12.97_77.59_06-15')
+    assert value == {'written_by': child.pid}
+
+
+def test_updates_by_another_process_replace_stale_memory_entries(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    worker = tiered_cache('predictions', maxsize=8, ttl_seconds=3600, path=path, memory_ttl_seconds=0.3)
+    worker.set('12.97_77.59_06-15', {'latest_available_year': 2023})
+    assert worker.get('12.97_77.59_06-15') == {'latest_available_year': 2023}
+
+    # Another worker refreshes the entry with a new NASA year
+    child = multiprocessing.get_context('spawn').Process(
+        target=_update_from_child, args=(path, '12.97_77.59_06-15', {'latest_available_year': 2024})
+    )
+    child.start()
+    child.join(timeout=30)
+    assert child.exitcode == 0
+
+    # The memory copy expires after the capped memory TTL, not the hour-long entry TTL
+    time.sleep(0.4)
+    assert worker.get('12.97_77.59_06-15') == {'latest_available_year': 2024}
+    assert worker.ttl_seconds == 3600
+
+
+def test_tiered_cache_promotes_shared_hits(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    worker_a = tiered_cache('predictions', maxsize=8, ttl_seconds=60, path=path)
+    worker_b = tiered_cache('predictions', maxsize=8, ttl_seconds=60, path=path)
+
+    doc = cache_codec.LazyPredictionDoc({'cache_key': 'k'}, statistics={'temperature': {}})
+    worker_a.set('k', doc)
+    assert len(worker_b) == 0
+
+    assert worker_b.get('k') == doc
+    assert isinstance(worker_b.get('k'), cache_codec.LazyPredictionDoc)
+    assert len(worker_b) == 1
+    assert worker_b.stats()['shared']['hits'] == 1
+
+
+def test_tiered_cache_without_path_is_process_local():
+    cache = tiered_cache('predictions', maxsize=8, ttl_seconds=60, path='')
+    cache.set('k', 'v')
+    assert cache.shared is None
+    assert cache.get('k') == 'v'
+    assert 'shared' not in cache.stats()
+
+
+def test_async_access_uses_the_shared_tier_from_a_worker_thread(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = tiered_cache('predictions', maxsize=10, ttl_seconds=60, path=path)
+    other_worker = tiered_cache('predictions', maxsize=10, ttl_seconds=60, path=path)
+    shared_threads = []
+    shared_get, shared_set = cache.shared.get, cache.shared.set
+
+    def recording_get(*args):
+        shared_threads.append(threading.get_ident())
+        return shared_get(*args)
+
+    def recording_set(*args):
+        shared_threads.append(threading.get_ident())
+        return shared_set(*args)
+
+    cache.shared.get, cache.shared.set = recording_get, recording_set
+    other_worker.set('b', 'from another worker')
+
+    async def run():
+        loop_thread = threading.get_ident()
+        await cache.aset('a', 'written on the loop')
+        assert await cache.aget('a') == 'written on the loop'  # memory hit, no shared read
+        found = await cache.aget_many(['a', 'b', 'c'])
+        assert await cache.aget('c', 'default') == 'default'
+        return loop_thread, found
+
+    loop_thread, found = asyncio.run(run())
+
+    assert found == {'a': 'written on the loop', 'b': 'from another worker', 'c': None}
+    assert other_worker.shared.get('a') == 'written on the loop'
+    assert cache.memory.get('b') == 'from another worker'
+    # One write, the batched read of b and c, and the lone read of c
+    assert len(shared_threads) == 4 and loop_thread not in shared_threads
+
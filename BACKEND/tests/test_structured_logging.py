@@ -0,0 +1,120 @@
+import sys
+import os
+import io
+import json
+import time
+import logging
+import threading
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import structured_logging
+from app.utils.request_context import RequestContextMiddleware, get_request_id, request_id_var
+
+
+def _capture(fmt='json'):
+    stream = io.StringIO()
+    structured_logging.configure_logging(level='DEBUG', fmt=fmt, stream=stream)
+    return stream
+
+
+def _lines(stream):
+    structured_logging.shutdown_logging()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def teardown_function():
+    structured_logging.configure_logging()
+
+
+def test_json_records_carry_request_id_extras_and_redacted_emails():
+    stream = _capture()
+    logger = logging.getLogger('app.tests')
+
+    token = request_id_var.set('req-1')
+    try:
+        logger.info("Login for %s", "jane.doe@example.com", extra={"user_id": "u1", "contact": "ops@example.org"})
+    finally:
+        request_id_var.reset(token)
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        logger.exception("Failed")
+
+    first, second = _lines(stream)
+    assert first['msg'] == 'Login for j***@example.com'
+    assert first['request_id'] == 'req-1'
+    assert first['user_id'] == 'u1'
+    assert first['contact'] == 'o***@example.org'
+    assert second['level'] == 'ERROR'
+    assert 'request_id' not in second
+    assert 'RuntimeError: boom' in second['exc']
+
+
+def test_sampled_records_are_dropped_before_queueing():
+    stream = _capture()
+    logger = logging.getLogger('app.tests')
+    before = structured_logging.get_logging_stats()
+
+    for _ in range(50):
+        logger.info("hot line", extra={"sample_rate": 0.0})
+    logger.info("kept", extra={"sample_rate": 1.0})
+
+    lines = _lines(stream)
+    assert [line['msg'] for line in lines] == ['kept']
+    assert lines[0]['sample_rate'] == 1.0
+    assert structured_logging.get_logging_stats()['dropped_sampled'] - before['dropped_sampled'] == 50
+
+
+def test_full_queue_drops_instead_of_blocking():
+    release = threading.Event()
+
+    class BlockedHandler(logging.Handler):
+        def emit(self, record):
+            release.wait(5)
+
+    handler = structured_logging.NonBlockingQueueHandler(BlockedHandler(), maxsize=2)
+    logger = logging.getLogger('app.tests.blocked')
+    logger.addHandler(handler)
+    logger.propagate = False
+    before = structured_logging.get_logging_stats()['dropped_queue_full']
+    try:
+        started = time.perf_counter()
+        for i in range(20):
+            logger.warning("line %d", i)
+        assert time.perf_counter() - started < 0.1
+        # One record is held by the blocked writer, two fit in the queue
+        assert structured_logging.get_logging_stats()['dropped_queue_full'] - before >= 17
+    finally:
+        release.set()
+        handler.stop()
+        logger.removeHandler(handler)
+
+
+def test_text_format():
+    stream = _capture(fmt='text')
+    logging.getLogger('app.tests').warning("Cache refresh failed for %s", "k1")
+    structured_logging.shutdown_logging()
+    assert 'WARNING app.tests [-] Cache refresh failed for k1' in stream.getvalue()
+
+
+def test_request_id_middleware_echoes_or_generates_ids():
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get('/id')
+    async def current_id():
+        return {'request_id': get_request_id()}
+
+    client = TestClient(app)
+    echoed = client.get('/id', headers={'X-Request-ID': 'client-42'})
+    assert echoed.json() == {'request_id': 'client-42'}
+    assert echoed.headers['x-request-id'] == 'client-42'
+
+    generated = client.get('/id', headers={'X-Request-ID': 'has spaces; ' * 10})
+    assert generated.json()['request_id'] == generated.headers['x-request-id'] != 'client-42'
+    assert len(generated.json()['request_id']) == 16
+    assert get_request_id() is None
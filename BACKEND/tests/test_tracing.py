@@ -0,0 +1,91 @@
+import sys
+import os
+import json
+import time
+import asyncio
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import tracing
+
+
+def test_spans_nest_across_tasks_and_threads():
+    async def stage(name):
+        with tracing.span(name):
+            await asyncio.sleep(0.01)
+
+    def parse():
+        with tracing.span('parse'):
+            time.sleep(0.005)
+
+    async def request():
+        with tracing.span('GET /predict') as root:
+            with tracing.span('cache.read', source='memory'):
+                pass
+            await asyncio.gather(asyncio.create_task(stage('verification')), asyncio.create_task(stage('insight')))
+            await asyncio.to_thread(parse)
+            return root, tracing.timing_breakdown(), tracing.current_trace_id()
+
+    root, breakdown, trace_id = asyncio.run(request())
+
+    assert trace_id == root.trace.trace_id
+    names = [entry['name'] for entry in breakdown]
+    assert names[0] == 'cache.read' and names[-1] == 'parse'
+    assert set(names[1:3]) == {'verification', 'insight'}
+    assert breakdown[0]['source'] == 'memory'
+    assert all(span.parent_id == root.span_id for span in root.trace.spans if span is not root)
+    assert len(root.trace.spans) == 5
+    assert root.parent_id is None
+
+
+def test_server_timing_sums_repeated_stages():
+    with tracing.span('POST /predict') as root:
+        for _ in range(3):
+            with tracing.span('nasa.chunk'):
+                pass
+        with tracing.span('statistics'):
+            pass
+
+    header = tracing.server_timing_header(root.trace)
+    assert 'nasa.chunk;dur=' in header and 'desc="3 calls"' in header
+    assert 'statistics;dur=' in header
+    assert header.endswith(f'total;dur={root.duration_ms:.1f}')
+
+
+def test_traceparent_is_continued():
+    traceparent = '00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01'
+    with tracing.span('GET /predict', new_trace=True, traceparent=traceparent) as root:
+        pass
+    assert root.trace.trace_id == '0af7651916cd43dd8448eb211c80319c'
+    assert root.parent_id == 'b7ad6b7169203331'
+
+
+def test_errors_are_recorded_and_traces_exported_as_otlp_json(tmp_path, monkeypatch):
+    export_path = tmp_path / 'traces.jsonl'
+    monkeypatch.setattr(tracing, 'TRACE_EXPORT_PATH', str(export_path))
+    monkeypatch.setattr(tracing, 'TRACE_SAMPLE_RATE', 1.0)
+
+    try:
+        with tracing.span('GET /predict', new_trace=True, route='/predict') as root:
+            with tracing.span('nasa.chunk', years='1986-1991', bytes=1024):
+                raise ValueError('rejected')
+    except ValueError:
+        pass
+
+    deadline = time.time() + 5
+    while not export_path.exists() and time.time() < deadline:
+        time.sleep(0.01)
+    tracing.flush_traces()
+
+    request = json.loads(export_path.read_text().splitlines()[0])
+    resource = request['resourceSpans'][0]
+    assert resource['resource']['attributes'][0] == {'key': 'service.name', 'value': {'stringValue': tracing.SERVICE_NAME}}
+    spans = {span['name']: span for span in resource['scopeSpans'][0]['spans']}
+    chunk, request_span = spans['nasa.chunk'], spans['GET /predict']
+    assert chunk['traceId'] == request_span['traceId'] == root.trace.trace_id
+    assert chunk['parentSpanId'] == request_span['spanId']
+    assert 'parentSpanId' not in request_span
+    assert chunk['status'] == {'code': 2, 'message': 'ValueError: rejected'}
+    assert {'key': 'bytes', 'value': {'intValue': '1024'}} in chunk['attributes']
+    assert int(chunk['endTimeUnixNano']) >= int(chunk['startTimeUnixNano'])
@@ -0,0 +1,34 @@
+import sys
+import os
+
+# Ensure BACKEND is on sys.path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import ttl_cache
+from app.utils.ttl_cache import TTLCache
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl_seconds=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'a' becomes most recently used
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, 'monotonic', lambda: now[0])
+    cache = TTLCache(maxsize=10, ttl_seconds=5)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl_seconds=60)
+
+    now[0] += 10
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+    assert len(cache) == 1
@@ -78,9 +78,10 @@ def test_gemini_mocked_response():
 
     agent.model = DummyModel(gemini_json)
 
+    # Only statistics the rule-based checks flag are sent to Gemini
     stats = {
         'precipitation_probability_percent': 40.0,
-        'average_precipitation_mm': 1.2,
+        'average_precipitation_mm': 0.1,
         'average_temperature_celsius': 22.0,
         'max_temperature_celsius': 25.0,
         'min_temperature_celsius': 18.0,
@@ -95,3 +96,31 @@ def test_gemini_mocked_response():
     assert 'verification_prediction' in res
     assert 'comparison_score' in res
     assert res['preferred_source'] in ('statistical', 'verification')
+
+
+def test_rule_based_fast_path_skips_gemini():
+    if DataVerificationAgent is None:
+        import pytest
+        pytest.skip('verification_agent module not present')
+    agent = DataVerificationAgent()
+    agent.enabled = True
+
+    class FailingModel:
+        def generate(self, prompt):
+            raise AssertionError('Gemini should not be called for valid statistics')
+
+    agent.model = FailingModel()
+    stats = {
+        'precipitation_probability_percent': 40.0,
+        'average_precipitation_mm': 1.2,
+        'average_temperature_celsius': 21.5,
+        'max_temperature_celsius': 25.0,
+        'min_temperature_celsius': 18.0,
+        'average_wind_speed_mps': 3.5,
+        'average_humidity_percent': 70.0,
+    }
+    res = agent.verify_statistics(stats, {'lat': 12.97, 'lon': 77.59}, '2025-10-05')
+
+    assert res['verified_by'] == 'programmatic'
+    assert res['status'] == 'verified'
+    assert res['is_valid'] is True